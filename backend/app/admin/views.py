@@ -19,6 +19,7 @@ from app.models.db_models.enums import (
 )
 from markupsafe import Markup
 from app.core.security import get_password_hash
+from app.core.user_cache import user_auth_cache
 from datetime import datetime, timezone
 from sqlalchemy import Select, select
 from sqlalchemy.orm import selectinload
@@ -168,6 +169,15 @@ class UserAdmin(ModelView, model=User):
             del data["password"]
         await super().on_model_change(data, model, is_created, request)
 
+    async def after_model_change(
+        self, data: dict[str, Any], model: User, is_created: bool, request: Request
+    ) -> None:
+        if not is_created:
+            await user_auth_cache.invalidate(model.id)
+
+    async def after_model_delete(self, model: User, request: Request) -> None:
+        await user_auth_cache.invalidate(model.id)
+
     def list_query(self, request: Request) -> Select[tuple[User]]:
         return select(User).options(
             selectinload(User.chats).selectinload(Chat.messages)
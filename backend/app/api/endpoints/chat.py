@@ -15,6 +15,7 @@ from sse_starlette.sse import EventSourceResponse
 from app.constants import (
     REDIS_KEY_CHAT_CANCEL,
     REDIS_KEY_CHAT_REVOKED,
+    REDIS_KEY_CHAT_STATE,
     REDIS_KEY_CHAT_STREAM,
     REDIS_KEY_CHAT_TASK,
     REDIS_KEY_PERMISSION_RESPONSE,
@@ -37,11 +38,15 @@ from app.models.schemas import (
     PaginatedMessages,
     PaginationParams,
     PermissionRespondResponse,
+    RestorePreviewResponse,
     RestoreRequest,
+    ToolResultResponse,
 )
 from app.services.chat import ChatService
 from app.services.exceptions import ChatException, ClaudeAgentException
 from app.services.permission_manager import PermissionManager
+from app.services.streaming.snapshot import load_stream_snapshot
+from app.services.streaming.state import ACTIVE_STREAM_STATES, is_heartbeat_fresh
 from app.utils.redis import redis_connection, redis_pubsub
 from app.models.schemas.errors import HTTPErrorResponse
 
@@ -91,6 +96,46 @@ async def _monitor_stream_cancellation(
         )
 
 
+def _parse_stream_id(entry_id: str) -> tuple[int, int] | None:
+    try:
+        ms, _, seq = entry_id.partition("-")
+        return int(ms), int(seq or 0)
+    except ValueError:
+        return None
+
+
+async def _load_replay_snapshot(
+    redis: "Redis[str]", chat_id: UUID, last_event_id: str | None
+) -> dict[str, Any] | None:
+    # The worker periodically stores a compacted copy of the in-progress
+    # message. It replaces the backlog only when the client is further behind
+    # than the snapshot; the client swaps its message content for it.
+    try:
+        snapshot = await load_stream_snapshot(redis, str(chat_id))
+    except Exception as e:
+        logger.warning("Failed to load stream snapshot for chat %s: %s", chat_id, e)
+        return None
+    if not snapshot:
+        return None
+
+    snapshot_id, events = snapshot
+    if last_event_id:
+        client_position = _parse_stream_id(last_event_id)
+        snapshot_position = _parse_stream_id(snapshot_id)
+        if (
+            client_position is None
+            or snapshot_position is None
+            or client_position >= snapshot_position
+        ):
+            return None
+
+    return {
+        "id": snapshot_id,
+        "event": "snapshot",
+        "data": '{"events":' + events + "}",
+    }
+
+
 async def _replay_stream_backlog(
     redis: "Redis[str]", stream_name: str, min_id: str
 ) -> AsyncIterator[dict[str, Any]]:
@@ -187,6 +232,12 @@ async def _create_event_stream(
             min_id = f"({last_event_id})" if last_event_id else "-"
             last_id = last_event_id
 
+            snapshot = await _load_replay_snapshot(redis, chat_id, last_event_id)
+            if snapshot:
+                yield snapshot
+                last_id = snapshot["id"]
+                min_id = f"({last_id}"
+
             async for item in _replay_stream_backlog(redis, stream_name, min_id):
                 yield item
                 last_id = item["id"]
@@ -304,7 +355,8 @@ async def enhance_prompt(
     current_user: User = Depends(get_current_user),
 ) -> dict[str, str]:
     try:
-        enhanced_prompt = await chat_service.ai_service.enhance_prompt(
+        ai_service = await chat_service.get_ai_service()
+        enhanced_prompt = await ai_service.enhance_prompt(
             prompt, model_id, current_user
         )
         return {"enhanced_prompt": enhanced_prompt}
@@ -445,6 +497,40 @@ async def restore_chat(
         )
 
 
+@router.post("/chats/{chat_id}/restore/preview", response_model=RestorePreviewResponse)
+async def preview_restore_chat(
+    chat_id: UUID,
+    request: RestoreRequest,
+    current_user: User = Depends(get_current_user),
+    chat_service: ChatService = Depends(get_chat_service),
+) -> RestorePreviewResponse:
+    try:
+        diff = await chat_service.preview_restore(
+            chat_id, request.message_id, current_user
+        )
+    except ChatException as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return RestorePreviewResponse(
+        added=diff.added, changed=diff.changed, removed=diff.removed
+    )
+
+
+@router.get(
+    "/chats/{chat_id}/tool-results/{tool_use_id}", response_model=ToolResultResponse
+)
+async def get_tool_result(
+    chat_id: UUID,
+    tool_use_id: str,
+    current_user: User = Depends(get_current_user),
+    chat_service: ChatService = Depends(get_chat_service),
+) -> ToolResultResponse:
+    try:
+        result = await chat_service.get_tool_result(chat_id, tool_use_id, current_user)
+    except ChatException as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return ToolResultResponse(tool_use_id=tool_use_id, result=result)
+
+
 @router.get("/chats/{chat_id}/stream")
 async def stream_events(
     chat_id: UUID,
@@ -468,6 +554,67 @@ async def stream_events(
     )
 
 
+async def _get_stream_status_from_task(
+    chat_id: UUID, chat_service: ChatService
+) -> dict[str, Any]:
+    latest_assistant_message = (
+        await chat_service.message_service.get_latest_assistant_message(chat_id)
+    )
+
+    task_key = REDIS_KEY_CHAT_TASK.format(chat_id=chat_id)
+    revoked_key = REDIS_KEY_CHAT_REVOKED.format(chat_id=chat_id)
+    stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+
+    if latest_assistant_message:
+        if latest_assistant_message.stream_status in [
+            MessageStreamStatus.COMPLETED,
+            MessageStreamStatus.FAILED,
+            MessageStreamStatus.INTERRUPTED,
+        ]:
+            async with redis_connection() as redis:
+                await redis.delete(task_key)
+            return INACTIVE_TASK_RESPONSE.copy()
+
+    async with redis_connection() as redis:
+        task_id = await redis.get(task_key)
+
+        if not task_id:
+            return INACTIVE_TASK_RESPONSE.copy()
+
+        revoked = await redis.get(revoked_key)
+        if revoked:
+            await redis.delete(task_key)
+            return INACTIVE_TASK_RESPONSE.copy()
+
+        try:
+            task_result = celery_app.AsyncResult(task_id)
+            task_state = task_result.state
+        except NotRegistered:
+            await redis.delete(task_key)
+            return INACTIVE_TASK_RESPONSE.copy()
+
+        is_active = task_state in ["PENDING", "STARTED", "PROGRESS"]
+
+        if not is_active:
+            await redis.delete(task_key)
+            return INACTIVE_TASK_RESPONSE.copy()
+
+        try:
+            # XREVRANGE reads stream in reverse (newest first). count=1 gets the latest entry.
+            latest_entry = await redis.xrevrange(stream_key, count=1)
+            last_event_id = latest_entry[0][0] if latest_entry else None
+        except RedisError:
+            last_event_id = None
+
+        return {
+            "has_active_task": True,
+            "message_id": latest_assistant_message.id
+            if latest_assistant_message
+            else None,
+            "last_event_id": last_event_id,
+        }
+
+
 @router.get("/chats/{chat_id}/status", response_model=ChatStatusResponse)
 async def get_stream_status(
     chat_id: UUID,
@@ -477,62 +624,22 @@ async def get_stream_status(
     await _ensure_chat_access(chat_id, chat_service, current_user)
 
     try:
-        latest_assistant_message = (
-            await chat_service.message_service.get_latest_assistant_message(chat_id)
-        )
-
-        task_key = REDIS_KEY_CHAT_TASK.format(chat_id=chat_id)
-        revoked_key = REDIS_KEY_CHAT_REVOKED.format(chat_id=chat_id)
-        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
-
-        if latest_assistant_message:
-            if latest_assistant_message.stream_status in [
-                MessageStreamStatus.COMPLETED,
-                MessageStreamStatus.FAILED,
-                MessageStreamStatus.INTERRUPTED,
-            ]:
-                async with redis_connection() as redis:
-                    await redis.delete(task_key)
-                return INACTIVE_TASK_RESPONSE.copy()
-
         async with redis_connection() as redis:
-            task_id = await redis.get(task_key)
-
-            if not task_id:
-                return INACTIVE_TASK_RESPONSE.copy()
-
-            revoked = await redis.get(revoked_key)
-            if revoked:
-                await redis.delete(task_key)
-                return INACTIVE_TASK_RESPONSE.copy()
-
-            try:
-                task_result = celery_app.AsyncResult(task_id)
-                task_state = task_result.state
-            except NotRegistered:
-                await redis.delete(task_key)
-                return INACTIVE_TASK_RESPONSE.copy()
-
-            is_active = task_state in ["PENDING", "STARTED", "PROGRESS"]
+            state = await redis.hgetall(REDIS_KEY_CHAT_STATE.format(chat_id=chat_id))
 
-            if not is_active:
-                await redis.delete(task_key)
+        if state.get("status"):
+            if state["status"] not in ACTIVE_STREAM_STATES:
                 return INACTIVE_TASK_RESPONSE.copy()
-
-            try:
-                # XREVRANGE reads stream in reverse (newest first). count=1 gets the latest entry.
-                latest_entry = await redis.xrevrange(stream_key, count=1)
-                last_event_id = latest_entry[0][0] if latest_entry else None
-            except RedisError:
-                last_event_id = None
-
-            return {
-                "has_active_task": True,
-                "message_id": latest_assistant_message.id
-                if latest_assistant_message
-                else None,
-                "last_event_id": last_event_id,
-            }
+            if is_heartbeat_fresh(state):
+                return {
+                    "has_active_task": True,
+                    "message_id": state.get("message_id") or None,
+                    "last_event_id": state.get("last_event_id") or None,
+                }
+
+        # No state for this chat (written by an older worker) or its heartbeat
+        # went stale: ask Celery whether the task is still alive.
+        return await _get_stream_status_from_task(chat_id, chat_service)
     except RedisError as e:
         logger.error(
             "Redis error checking chat status %s: %s", chat_id, e, exc_info=True
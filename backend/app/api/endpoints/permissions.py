@@ -88,11 +88,7 @@ async def create_permission_request(
             )
 
             publisher = SSEEventPublisher(redis)
-            await publisher.publish_content(
-                chat_id,
-                permission_event_payload,
-                event_id=f"{chat_id}_permission_{request_id[:8]}",
-            )
+            await publisher.publish_content(chat_id, permission_event_payload)
 
         except Exception as exc:
             await redis.delete(request_key)
@@ -1,8 +1,10 @@
+import mimetypes
 from collections.abc import Awaitable, Callable
 from functools import wraps
 from typing import ParamSpec, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.core.deps import (
     SandboxContext,
@@ -11,6 +13,7 @@ from app.core.deps import (
 )
 from app.models.schemas import (
     AddSecretRequest,
+    FileChange,
     FileContentResponse,
     FileMetadata,
     IDEUrlResponse,
@@ -27,6 +30,11 @@ from app.models.schemas import (
 )
 from app.services.exceptions import SandboxException
 from app.services.sandbox import SandboxService
+from app.utils.http_cache import (
+    file_cache_headers,
+    is_not_modified,
+    parse_byte_range,
+)
 
 
 router = APIRouter()
@@ -84,11 +92,19 @@ async def get_ide_url(
     response_model=SandboxFilesMetadataResponse,
 )
 async def get_files_metadata(
+    since: str | None = None,
     context: SandboxContext = Depends(get_sandbox_context),
     sandbox_service: SandboxService = Depends(get_sandbox_service_for_context),
 ) -> SandboxFilesMetadataResponse:
-    files = await sandbox_service.get_files_metadata(context.sandbox_id)
-    return SandboxFilesMetadataResponse(files=[FileMetadata(**f) for f in files])
+    # Pass the `version` from a previous response as `since` to receive only
+    # what changed after it; `full` tells the client which form it got.
+    result = await sandbox_service.get_files_metadata(context.sandbox_id, since)
+    return SandboxFilesMetadataResponse(
+        files=[FileMetadata(**f) for f in result["files"]],
+        version=result["version"],
+        full=result["full"],
+        changes=[FileChange(**c) for c in result["changes"]],
+    )
 
 
 @router.get(
@@ -96,13 +112,25 @@ async def get_files_metadata(
 )
 async def get_file_content(
     file_path: str,
+    request: Request,
+    response: Response,
+    offset: int | None = Query(None, ge=0),
+    length: int | None = Query(None, gt=0),
     context: SandboxContext = Depends(get_sandbox_context),
     sandbox_service: SandboxService = Depends(get_sandbox_service_for_context),
-) -> FileContentResponse:
+) -> FileContentResponse | Response:
+    # offset/length return a slice of the file (capped per request) so large
+    # files can be paged in. Revalidating an unchanged file only costs a stat.
     try:
+        stat = await sandbox_service.stat_file(context.sandbox_id, file_path)
+        headers = file_cache_headers(stat["etag"], stat["modified"])
+        if is_not_modified(request.headers, stat["etag"], stat["modified"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
         file_data = await sandbox_service.get_file_content(
-            context.sandbox_id, file_path
+            context.sandbox_id, file_path, offset=offset, length=length
         )
+        response.headers.update(headers)
         return FileContentResponse(**file_data)
     except SandboxException as e:
         raise HTTPException(
@@ -116,6 +144,56 @@ async def get_file_content(
         )
 
 
+@router.get("/{sandbox_id}/files/raw/{file_path:path}")
+async def get_file_raw(
+    file_path: str,
+    request: Request,
+    context: SandboxContext = Depends(get_sandbox_context),
+    sandbox_service: SandboxService = Depends(get_sandbox_service_for_context),
+) -> Response:
+    # Streams the file bytes as-is, with single byte-range support, instead
+    # of base64 inside JSON.
+    try:
+        stat = await sandbox_service.stat_file(context.sandbox_id, file_path)
+    except SandboxException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    size = stat["size"]
+    headers = {
+        **file_cache_headers(stat["etag"], stat["modified"]),
+        "Accept-Ranges": "bytes",
+    }
+    if is_not_modified(request.headers, stat["etag"], stat["modified"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != stat["etag"]:
+        range_header = None
+    try:
+        byte_range = parse_byte_range(range_header, size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{size}"},
+        )
+
+    status_code = status.HTTP_200_OK
+    start, end = 0, size - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        sandbox_service.iter_file_range(context.sandbox_id, file_path, start, end),
+        status_code=status_code,
+        media_type=mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+        headers=headers,
+    )
+
+
 @router.put("/{sandbox_id}/files", response_model=UpdateFileResponse)
 @handle_sandbox_errors("update file")
 async def update_file_in_sandbox(
@@ -9,10 +9,38 @@ REDIS_KEY_CHAT_TASK: Final[str] = "chat:{chat_id}:task"
 REDIS_KEY_CHAT_STREAM: Final[str] = "chat:{chat_id}:stream"
 REDIS_KEY_CHAT_REVOKED: Final[str] = "chat:{chat_id}:revoked"
 REDIS_KEY_CHAT_CANCEL: Final[str] = "chat:{chat_id}:cancel"
+REDIS_KEY_CHAT_STATE: Final[str] = "chat:{chat_id}:state"
+REDIS_KEY_CHAT_SNAPSHOT: Final[str] = "chat:{chat_id}:snapshot"
+REDIS_KEY_CHAT_CHECKPOINTS: Final[str] = "chat:{chat_id}:checkpoints"
+REDIS_KEY_CHAT_CHECKPOINTS_LOCK: Final[str] = "chat:{chat_id}:checkpoints:lock"
+REDIS_KEY_CHECKPOINTS_PENDING: Final[str] = "checkpoints:pending"
 REDIS_KEY_PERMISSION_REQUEST: Final[str] = "permission_request:{request_id}"
 REDIS_KEY_PERMISSION_RESPONSE: Final[str] = "permission_response:{request_id}"
 REDIS_KEY_USER_SETTINGS: Final[str] = "user_settings:{user_id}"
+REDIS_KEY_USER_AUTH: Final[str] = "user_auth:{user_id}"
+REDIS_KEY_USER_AUTH_EPOCH: Final[str] = "user_auth:{user_id}:epoch"
 REDIS_KEY_MODELS_LIST: Final[str] = "models:list:{active_only}"
+REDIS_KEY_TASK_CONTEXT: Final[str] = "task_context:{context_hash}"
+REDIS_KEY_TASK_PROMPT: Final[str] = "task_context:prompt:{prompt_hash}"
+REDIS_KEY_USER_ACTIVE_TURNS: Final[str] = "user:{user_id}:active_turns"
+REDIS_KEY_SANDBOX_ACTIVITY: Final[str] = "sandbox:activity"
+REDIS_KEY_SANDBOX_RESUME: Final[str] = "sandbox:{sandbox_id}:resume"
+REDIS_KEY_FILE_INDEX: Final[str] = "sandbox:{sandbox_id}:file_index"
+REDIS_KEY_FILE_INDEX_META: Final[str] = "sandbox:{sandbox_id}:file_index:meta"
+REDIS_KEY_FILE_INDEX_JOURNAL: Final[str] = "sandbox:{sandbox_id}:file_index:journal"
+REDIS_KEY_FILE_INDEX_LOCK: Final[str] = "sandbox:{sandbox_id}:file_index:lock"
+REDIS_KEY_KEY_FAMILY_STATS: Final[str] = "redis:key_family_stats"
+
+CELERY_QUEUE_INTERACTIVE: Final[str] = "interactive"
+CELERY_QUEUE_SCHEDULED: Final[str] = "scheduled"
+CELERY_QUEUE_MAINTENANCE: Final[str] = "maintenance"
+# Workers poll queues in this order, so interactive turns are always taken
+# before background work when a worker consumes more than one queue.
+CELERY_QUEUES: Final[list[str]] = [
+    CELERY_QUEUE_INTERACTIVE,
+    CELERY_QUEUE_SCHEDULED,
+    CELERY_QUEUE_MAINTENANCE,
+]
 
 SANDBOX_AUTO_PAUSE_TIMEOUT: Final[int] = 3000
 SANDBOX_DEFAULT_COMMAND_TIMEOUT: Final[int] = 120
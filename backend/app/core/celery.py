@@ -1,12 +1,18 @@
-import json
 import logging
+import time
 from typing import Any
 
 from celery import Celery
+from celery.signals import before_task_publish
 from redis.asyncio import Redis
 
-from app.constants import REDIS_KEY_CHAT_STREAM
+from app.constants import (
+    CELERY_QUEUE_INTERACTIVE,
+    CELERY_QUEUE_MAINTENANCE,
+    CELERY_QUEUE_SCHEDULED,
+)
 from app.core.config import get_settings
+from app.services.streaming.state import append_stream_event
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -15,7 +21,13 @@ celery_app = Celery(
     "claudex",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["app.tasks.chat_processor", "app.tasks.scheduler"],
+    include=[
+        "app.tasks.chat_processor",
+        "app.tasks.scheduler",
+        "app.tasks.sandbox_lifecycle",
+        "app.tasks.redis_retention",
+        "app.tasks.checkpoints",
+    ],
 )
 
 celery_app.conf.update(
@@ -25,7 +37,19 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
-    task_default_queue="default",
+    task_default_queue=CELERY_QUEUE_MAINTENANCE,
+    task_routes={
+        "app.tasks.chat_processor.process_chat": {"queue": CELERY_QUEUE_INTERACTIVE},
+        "execute_scheduled_task": {"queue": CELERY_QUEUE_SCHEDULED},
+        "check_scheduled_tasks": {"queue": CELERY_QUEUE_MAINTENANCE},
+        "cleanup_expired_refresh_tokens": {"queue": CELERY_QUEUE_MAINTENANCE},
+        "reap_idle_sandboxes": {"queue": CELERY_QUEUE_MAINTENANCE},
+        "delete_sandboxes": {"queue": CELERY_QUEUE_MAINTENANCE},
+        "sweep_redis_retention": {"queue": CELERY_QUEUE_MAINTENANCE},
+        "create_chat_checkpoints": {"queue": CELERY_QUEUE_MAINTENANCE},
+        "sweep_pending_checkpoints": {"queue": CELERY_QUEUE_MAINTENANCE},
+    },
+    broker_transport_options={"queue_order_strategy": "priority"},
     worker_prefetch_multiplier=1,
     task_acks_late=True,
     worker_max_tasks_per_child=1000,
@@ -43,59 +67,48 @@ celery_app.conf.beat_schedule = {
         "task": "cleanup_expired_refresh_tokens",
         "schedule": 86400.0,
     },
+    "reap-idle-sandboxes": {
+        "task": "reap_idle_sandboxes",
+        "schedule": float(settings.SANDBOX_IDLE_CHECK_INTERVAL_SECONDS),
+    },
+    "sweep-redis-retention": {
+        "task": "sweep_redis_retention",
+        "schedule": float(settings.REDIS_RETENTION_SWEEP_INTERVAL_SECONDS),
+    },
+    "sweep-pending-checkpoints": {
+        "task": "sweep_pending_checkpoints",
+        "schedule": float(settings.CHECKPOINT_QUEUE_SWEEP_INTERVAL_SECONDS),
+    },
 }
 
 
+@before_task_publish.connect
+def _stamp_enqueue_time(headers: dict[str, Any], **kwargs: Any) -> None:
+    # Read back from the broker by app.core.metrics to report queue wait time.
+    headers.setdefault("enqueued_at", time.time())
+
+
 class SSEEventPublisher:
+    # SSE consumers only read the chat stream (live XREAD and replay both), so
+    # one append is the whole publish. Errors propagate so callers can roll
+    # back whatever the event announced.
     def __init__(self, redis_client: "Redis[str]"):
         self.redis = redis_client
         self._stream_max_len = 10_000
 
-    async def _publish_event(
-        self, chat_id: str, event_type: str, data: str, event_id: str | None = None
-    ) -> None:
-        event: dict[str, Any] = {
-            "type": event_type,
-            "data": data,
-        }
-        if event_id:
-            event["id"] = event_id
-
-        channel = f"chat:{chat_id}"
-        await self.redis.publish(channel, json.dumps(event))
-
-        if event_id:
-            await self.redis.setex(
-                f"event:{chat_id}:{event_id}",
-                settings.CELERY_RESULT_EXPIRES_SECONDS,
-                json.dumps(event),
-            )
-        try:
-            fields: dict[str, str | int | float] = {"kind": event_type}
-            if data:
-                fields["payload"] = data
-            # XADD appends to Redis stream. maxlen caps size; approximate=True allows
-            # slight overage for better performance (avoids trimming on every write).
-            await self.redis.xadd(
-                REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id),
-                fields,
-                maxlen=self._stream_max_len,
-                approximate=True,
-            )
-        except Exception as exc:
-            logger.warning(
-                f"Failed to append SSE event to stream for chat {chat_id}: {exc}"
-            )
+    async def _publish_event(self, chat_id: str, event_type: str, data: str) -> str:
+        fields: dict[str, str] = {"kind": event_type}
+        if data:
+            fields["payload"] = data
+        return await append_stream_event(
+            self.redis, chat_id, fields, maxlen=self._stream_max_len
+        )
 
-    async def publish_content(
-        self, chat_id: str, content: str, event_id: str | None = None
-    ) -> None:
-        await self._publish_event(chat_id, "content", content, event_id)
+    async def publish_content(self, chat_id: str, content: str) -> str:
+        return await self._publish_event(chat_id, "content", content)
 
-    async def publish_error(
-        self, chat_id: str, error: str, event_id: str | None = None
-    ) -> None:
-        await self._publish_event(chat_id, "error", error, event_id)
+    async def publish_error(self, chat_id: str, error: str) -> str:
+        return await self._publish_event(chat_id, "error", error)
 
-    async def publish_complete(self, chat_id: str, event_id: str | None = None) -> None:
-        await self._publish_event(chat_id, "complete", "", event_id)
+    async def publish_complete(self, chat_id: str) -> str:
+        return await self._publish_event(chat_id, "complete", "")
@@ -2,7 +2,7 @@ import logging
 import sys
 from datetime import datetime, timezone
 from functools import lru_cache
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import ValidationInfo, field_validator
 from pydantic_settings import BaseSettings
@@ -135,6 +135,48 @@ class Settings(BaseSettings):
     DOCKER_HOST: str | None = None
     DOCKER_PREVIEW_BASE_URL: str = "http://192.168.1.44"
 
+    # Idle sandbox lifecycle (Docker only, E2B pauses itself)
+    SANDBOX_IDLE_TIMEOUT_SECONDS: int = 1800
+    SANDBOX_IDLE_ACTION: str = "pause"  # "pause" or "stop"
+    SANDBOX_IDLE_CHECK_INTERVAL_SECONDS: int = 300
+    SANDBOX_ACTIVITY_WRITE_INTERVAL_SECONDS: int = 30
+    SANDBOX_RESUME_DEDUP_SECONDS: int = 30
+    # Sandbox teardown after chats are deleted runs on a maintenance worker
+    SANDBOX_DELETE_CONCURRENCY: int = 8
+    SANDBOX_DELETE_MAX_ATTEMPTS: int = 3
+    SANDBOX_DELETE_RETRY_DELAY_SECONDS: float = 2.0
+
+    # File explorer index: rescan for changes at most this often per sandbox
+    FILE_INDEX_REFRESH_INTERVAL_SECONDS: float = 2.0
+    FILE_INDEX_JOURNAL_MAX_LEN: int = 5000
+    FILE_INDEX_TTL_SECONDS: int = 3600
+    # Largest slice read from a sandbox file per command, for ranged reads
+    # and each chunk of a streamed download
+    SANDBOX_FILE_READ_CHUNK_BYTES: int = 1024 * 1024
+
+    # Keep each chat's agent CLI running in its sandbox between turns instead
+    # of starting and resuming a new one per message. Needs sandbox images
+    # whose permission_server.py reads CHAT_TOKEN_FILE; older ones deny every
+    # permission request in this mode
+    AGENT_RESIDENT_PROCESS_ENABLED: bool = False
+    AGENT_RESIDENT_IDLE_TIMEOUT_SECONDS: int = 600
+    AGENT_RESIDENT_MAX_AGE_SECONDS: int = 14400
+    # Run npx MCP servers from a per-sandbox install instead of resolving the
+    # package on every start; unpinned packages are refreshed in the background
+    MCP_RUNTIME_CACHE_ENABLED: bool = True
+    MCP_RUNTIME_REFRESH_INTERVAL_SECONDS: int = 86400
+    # Take workspace checkpoints on a maintenance worker after the turn has
+    # completed; restores wait up to their timeout for pending ones, the
+    # chat's next turn drains them itself after a short wait, and chats left
+    # pending past the stale age (lost dispatch or dead worker) are dispatched
+    # again by the sweep
+    CHECKPOINT_QUEUE_ENABLED: bool = True
+    CHECKPOINT_QUEUE_LOCK_SECONDS: int = 600
+    CHECKPOINT_RESTORE_WAIT_SECONDS: float = 60.0
+    CHECKPOINT_TURN_WAIT_SECONDS: float = 10.0
+    CHECKPOINT_QUEUE_STALE_SECONDS: int = 300
+    CHECKPOINT_QUEUE_SWEEP_INTERVAL_SECONDS: int = 300
+
     # Security Headers Configuration
     ENABLE_SECURITY_HEADERS: bool = True
     HSTS_MAX_AGE: int = 31536000
@@ -148,13 +190,25 @@ class Settings(BaseSettings):
 
     # TTL Configuration (in seconds)
     TASK_TTL_SECONDS: int = 3600
+    TASK_CONTEXT_TTL_SECONDS: int = 21600
+    MAX_CONCURRENT_CHAT_TURNS_PER_USER: int = 3
     REVOCATION_POLL_INTERVAL_SECONDS: float = 0.5
+    CHAT_STREAM_HEARTBEAT_INTERVAL_SECONDS: float = 5.0
+    CHAT_STREAM_HEARTBEAT_TIMEOUT_SECONDS: int = 30
+    CHAT_STREAM_SNAPSHOT_INTERVAL_EVENTS: int = 50
+    CHAT_STREAM_RETENTION_SECONDS: int = 600
+    REDIS_RETENTION_SWEEP_INTERVAL_SECONDS: int = 300
+    # "auto" and "orjson" use orjson; "json" forces the stdlib encoder
+    JSON_CODEC: Literal["auto", "orjson", "json"] = "auto"
+    TOOL_RESULT_MAX_CHARS: int = 200_000
+    TOOL_RESULT_MAX_DEPTH: int = 32
     DISPOSABLE_DOMAINS_CACHE_TTL_SECONDS: int = 3600
     PERMISSION_REQUEST_TTL_SECONDS: int = 300
     CHAT_SCOPED_TOKEN_EXPIRE_MINUTES: int = 10
     CELERY_RESULT_EXPIRES_SECONDS: int = 3600
     CHAT_REVOKED_KEY_TTL_SECONDS: int = 3600
     USER_SETTINGS_CACHE_TTL_SECONDS: int = 300
+    USER_AUTH_CACHE_TTL_SECONDS: int = 60
     MODELS_CACHE_TTL_SECONDS: int = 3600
 
     class Config:
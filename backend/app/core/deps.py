@@ -1,4 +1,5 @@
 from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
 from dataclasses import dataclass
 
 from fastapi import Depends, HTTPException, status
@@ -14,18 +15,14 @@ from app.services.ai_model import AIModelService
 from app.services.chat import ChatService
 from app.services.claude_agent import ClaudeAgentService
 from app.services.command import CommandService
-from app.services.exceptions import UserException
 from app.services.message import MessageService
 from app.services.refresh_token import RefreshTokenService
 from app.services.sandbox import SandboxService
-from app.services.sandbox_providers import (
-    SandboxProviderType,
-    create_sandbox_provider,
-)
 from app.services.scheduler import SchedulerService
 from app.services.skill import SkillService
 from app.services.storage import StorageService
 from app.services.user import UserService
+from app.utils.lazy import Lazy
 
 settings = get_settings()
 
@@ -67,15 +64,7 @@ async def get_sandbox_service(
     db: AsyncSession = Depends(get_db),
     user_service: UserService = Depends(get_user_service),
 ) -> AsyncIterator[SandboxService]:
-    try:
-        user_settings = await user_service.get_user_settings(current_user.id, db=db)
-        api_key = user_settings.e2b_api_key
-        provider_type_str = user_settings.sandbox_provider
-    except UserException:
-        api_key = None
-        provider_type_str = "docker"
-
-    provider = create_sandbox_provider(provider_type_str, api_key)
+    provider = await user_service.create_sandbox_provider(current_user.id, db=db)
     try:
         yield SandboxService(provider)
     finally:
@@ -123,19 +112,9 @@ async def get_sandbox_service_for_context(
     user_service: UserService = Depends(get_user_service),
     db: AsyncSession = Depends(get_db),
 ) -> AsyncIterator[SandboxService]:
-    try:
-        user_settings = await user_service.get_user_settings(current_user.id, db=db)
-        default_provider = user_settings.sandbox_provider
-        api_key = user_settings.e2b_api_key
-    except UserException:
-        default_provider = "docker"
-        api_key = None
-
-    provider_type = context.sandbox_provider or default_provider
-    if provider_type != SandboxProviderType.E2B.value:
-        api_key = None
-
-    provider = create_sandbox_provider(provider_type, api_key=api_key)
+    provider = await user_service.create_sandbox_provider(
+        current_user.id, db=db, provider_type=context.sandbox_provider
+    )
     try:
         yield SandboxService(provider)
     finally:
@@ -143,15 +122,35 @@ async def get_sandbox_service_for_context(
 
 
 async def get_chat_service(
-    file_service: StorageService = Depends(get_storage_service),
-    sandbox_service: SandboxService = Depends(get_sandbox_service),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
     user_service: UserService = Depends(get_user_service),
 ) -> AsyncIterator[ChatService]:
-    async with ClaudeAgentService(session_factory=SessionLocal) as ai_service:
+    # Listing chats, reading messages and most other chat endpoints never
+    # reach a sandbox or the agent, so those are built on first use and only
+    # what was built is torn down at the end of the request.
+    async with AsyncExitStack() as stack:
+
+        async def build_sandbox_service() -> SandboxService:
+            provider = await user_service.create_sandbox_provider(
+                current_user.id, db=db
+            )
+            stack.push_async_callback(provider.cleanup)
+            return SandboxService(provider)
+
+        async def build_storage_service() -> StorageService:
+            return StorageService(await sandbox_service.get())
+
+        async def build_ai_service() -> ClaudeAgentService:
+            return await stack.enter_async_context(
+                ClaudeAgentService(session_factory=SessionLocal)
+            )
+
+        sandbox_service = Lazy(build_sandbox_service)
         yield ChatService(
-            file_service,
+            Lazy(build_storage_service),
             sandbox_service,
-            ai_service,
+            Lazy(build_ai_service),
             user_service,
             session_factory=SessionLocal,
         )
@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+from collections.abc import Iterator
+
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from redis import Redis
+
+from app.constants import (
+    CELERY_QUEUES,
+    REDIS_KEY_CHECKPOINTS_PENDING,
+    REDIS_KEY_KEY_FAMILY_STATS,
+)
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class CeleryQueueCollector(Collector):
+    # Reads queue state straight from the Redis broker at scrape time. The
+    # broker pushes new messages to the head of each list and workers pop from
+    # the tail, so the tail is the message that has been waiting longest.
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        depth = GaugeMetricFamily(
+            "celery_queue_depth",
+            "Messages waiting in a Celery queue",
+            labels=["queue"],
+        )
+        oldest_wait = GaugeMetricFamily(
+            "celery_queue_oldest_wait_seconds",
+            "Time the oldest waiting message has spent in a Celery queue",
+            labels=["queue"],
+        )
+
+        try:
+            with Redis.from_url(
+                settings.REDIS_URL, decode_responses=True, socket_timeout=1
+            ) as redis:
+                pipe = redis.pipeline(transaction=False)
+                for queue in CELERY_QUEUES:
+                    pipe.llen(queue)
+                    pipe.lindex(queue, -1)
+                results = pipe.execute()
+        except Exception as e:
+            logger.warning("Failed to read Celery queue metrics: %s", e)
+            return
+
+        now = time.time()
+        for index, queue in enumerate(CELERY_QUEUES):
+            length, oldest = results[index * 2], results[index * 2 + 1]
+            depth.add_metric([queue], length)
+            oldest_wait.add_metric([queue], self._message_age(oldest, now))
+
+        yield depth
+        yield oldest_wait
+
+    @staticmethod
+    def _message_age(message: str | None, now: float) -> float:
+        if not message:
+            return 0.0
+        try:
+            enqueued_at = json.loads(message)["headers"]["enqueued_at"]
+        except (ValueError, KeyError, TypeError):
+            return 0.0
+        return max(0.0, now - float(enqueued_at))
+
+
+class RedisKeyFamilyCollector(Collector):
+    # Walking the keyspace is too slow for a scrape, so this exports the
+    # totals the periodic retention sweep stores in Redis.
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        keys = GaugeMetricFamily(
+            "redis_key_family_keys",
+            "Keys in Redis per key family",
+            labels=["family"],
+        )
+        memory = GaugeMetricFamily(
+            "redis_key_family_memory_bytes",
+            "Approximate Redis memory used per key family",
+            labels=["family"],
+        )
+        age = GaugeMetricFamily(
+            "redis_key_family_stats_age_seconds",
+            "Time since Redis key family sizes were last measured",
+        )
+
+        try:
+            with Redis.from_url(
+                settings.REDIS_URL, decode_responses=True, socket_timeout=1
+            ) as redis:
+                raw = redis.get(REDIS_KEY_KEY_FAMILY_STATS)
+            stats = json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning("Failed to read Redis key family metrics: %s", e)
+            return
+
+        if not stats:
+            return
+
+        for family, sizes in stats["families"].items():
+            keys.add_metric([family], sizes["keys"])
+            memory.add_metric([family], sizes["bytes"])
+        age.add_metric([], max(0.0, time.time() - stats["updated_at"]))
+
+        yield keys
+        yield memory
+        yield age
+
+
+class CheckpointQueueCollector(Collector):
+    # The pending set holds one member per chat with queued checkpoints,
+    # scored by the enqueue time of that chat's oldest one.
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        chats = GaugeMetricFamily(
+            "checkpoint_queue_pending_chats",
+            "Chats with workspace checkpoints waiting to be taken",
+        )
+        lag = GaugeMetricFamily(
+            "checkpoint_queue_lag_seconds",
+            "Time the oldest pending workspace checkpoint has been waiting",
+        )
+
+        try:
+            with Redis.from_url(
+                settings.REDIS_URL, decode_responses=True, socket_timeout=1
+            ) as redis:
+                pipe = redis.pipeline(transaction=False)
+                pipe.zcard(REDIS_KEY_CHECKPOINTS_PENDING)
+                pipe.zrange(REDIS_KEY_CHECKPOINTS_PENDING, 0, 0, withscores=True)
+                count, oldest = pipe.execute()
+        except Exception as e:
+            logger.warning("Failed to read checkpoint queue metrics: %s", e)
+            return
+
+        chats.add_metric([], count)
+        lag.add_metric([], max(0.0, time.time() - oldest[0][1]) if oldest else 0.0)
+
+        yield chats
+        yield lag
@@ -1,15 +1,15 @@
 import logging
 import time
 import uuid
-from collections.abc import Callable
 from contextvars import ContextVar
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import get_settings
 from app.services.exceptions import ServiceException
@@ -23,53 +23,70 @@ def get_request_id() -> str | None:
     return request_id_ctx.get()
 
 
-class RequestIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Response]
-    ) -> Response:
-        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+class RequestIdMiddleware:
+    # Plain ASGI rather than BaseHTTPMiddleware: headers are added to the
+    # http.response.start message directly, so streaming responses (SSE, file
+    # downloads) pass through without being re-wrapped in a new task and stream.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        request_id = request_headers.get("X-Request-ID") or str(uuid.uuid4())
         request_id_ctx.set(request_id)
-        request.state.request_id = request_id
+        scope.setdefault("state", {})["request_id"] = request_id
 
         start_time = time.perf_counter()
 
-        response = await call_next(request)
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Process-Time"] = f"{process_time:.4f}"
 
-        process_time = time.perf_counter() - start_time
+                client = scope.get("client")
+                logger.info(
+                    "request_completed",
+                    extra={
+                        "request_id": request_id,
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status_code": message["status"],
+                        "process_time_ms": round(process_time * 1000, 2),
+                        "client_ip": client[0] if client else None,
+                    },
+                )
 
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Process-Time"] = f"{process_time:.4f}"
+            await send(message)
 
-        logger.info(
-            "request_completed",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "path": request.url.path,
-                "status_code": response.status_code,
-                "process_time_ms": round(process_time * 1000, 2),
-                "client_ip": request.client.host if request.client else None,
-            },
-        )
+        await self.app(scope, receive, send_wrapper)
 
-        return response
 
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.security_headers = self._build_security_headers()
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Response]
-    ) -> Response:
-        response = await call_next(request)
+    @staticmethod
+    def _build_security_headers() -> list[tuple[str, str]]:
         settings = get_settings()
 
         if not settings.ENABLE_SECURITY_HEADERS:
-            return response
+            return []
 
-        response.headers["X-Content-Type-Options"] = settings.CONTENT_TYPE_OPTIONS
-        response.headers["X-Frame-Options"] = settings.FRAME_OPTIONS
-        response.headers["X-XSS-Protection"] = settings.XSS_PROTECTION
-        response.headers["Referrer-Policy"] = settings.REFERRER_POLICY
-        response.headers["Permissions-Policy"] = settings.PERMISSIONS_POLICY
+        security_headers = [
+            ("X-Content-Type-Options", settings.CONTENT_TYPE_OPTIONS),
+            ("X-Frame-Options", settings.FRAME_OPTIONS),
+            ("X-XSS-Protection", settings.XSS_PROTECTION),
+            ("Referrer-Policy", settings.REFERRER_POLICY),
+            ("Permissions-Policy", settings.PERMISSIONS_POLICY),
+        ]
 
         if settings.ENVIRONMENT == "production":
             hsts_value = f"max-age={settings.HSTS_MAX_AGE}"
@@ -77,9 +94,23 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
                 hsts_value += "; includeSubDomains"
             if settings.HSTS_PRELOAD:
                 hsts_value += "; preload"
-            response.headers["Strict-Transport-Security"] = hsts_value
+            security_headers.append(("Strict-Transport-Security", hsts_value))
+
+        return security_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.security_headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in self.security_headers:
+                    headers[name] = value
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_wrapper)
 
 
 async def _service_exception_handler(
@@ -17,6 +17,7 @@ from sqlalchemy import select
 from ..db.session import get_db
 from ..models.db_models import User
 from .config import get_settings
+from .user_cache import user_auth_cache
 from .user_manager import optional_current_active_user
 
 settings = get_settings()
@@ -98,10 +99,15 @@ async def get_user_from_token(token: str, db: AsyncSession) -> User | None:
             return None
 
         user_id = UUID(user_id_str)
+        cached_user, epoch = await user_auth_cache.get(user_id)
+        if cached_user is not None:
+            return cached_user
+
         result = await db.execute(select(User).filter(User.id == user_id))
         user = result.scalar_one_or_none()
         if user:
             logger.info("Successfully validated token for user %s", user_id)
+            await user_auth_cache.set(user, epoch)
         else:
             logger.warning("User %s not found in database", user_id)
         return cast(User | None, user)
@@ -0,0 +1,118 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import DateTime, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.constants import REDIS_KEY_USER_AUTH, REDIS_KEY_USER_AUTH_EPOCH
+from app.core.config import get_settings
+from app.db.types import GUID
+from app.models.db_models import User
+from app.utils.redis import redis_connection
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Credentials and one-time tokens are never needed to authorize a request, so
+# they stay out of Redis. Reading one from a cached user raises instead of
+# silently returning None.
+EXCLUDED_USER_FIELDS = frozenset(
+    {"hashed_password", "verification_token", "reset_token"}
+)
+
+
+class UserAuthCache:
+    # Resolved users are cached per id together with the user's auth epoch.
+    # Invalidation bumps the epoch before deleting the entry, so a request that
+    # loaded the row before an update can't repopulate the cache with stale
+    # data: its entry carries the old epoch and is ignored on read.
+    def __init__(self) -> None:
+        self._columns = [
+            (attr.key, attr.columns[0].type)
+            for attr in inspect(User).column_attrs
+            if attr.key not in EXCLUDED_USER_FIELDS
+        ]
+
+    async def get(self, user_id: UUID) -> tuple[User | None, str]:
+        # Returns the cached user (if still valid) and the current epoch, which
+        # the caller passes back to `set` after loading the row itself.
+        try:
+            async with redis_connection() as redis:
+                epoch, cached = await redis.mget(
+                    REDIS_KEY_USER_AUTH_EPOCH.format(user_id=user_id),
+                    REDIS_KEY_USER_AUTH.format(user_id=user_id),
+                )
+        except Exception as e:
+            logger.warning("Failed to read auth cache for user %s: %s", user_id, e)
+            return None, ""
+
+        epoch = epoch or "0"
+        if not cached:
+            return None, epoch
+
+        try:
+            entry = json.loads(cached)
+            if entry.get("epoch") != epoch:
+                return None, epoch
+            return self._deserialize(entry["user"]), epoch
+        except Exception as e:
+            logger.warning("Discarding auth cache entry for user %s: %s", user_id, e)
+            return None, epoch
+
+    async def set(self, user: User, epoch: str) -> None:
+        if not epoch:
+            return
+        entry = {"epoch": epoch, "user": self._serialize(user)}
+        try:
+            async with redis_connection() as redis:
+                await redis.setex(
+                    REDIS_KEY_USER_AUTH.format(user_id=user.id),
+                    settings.USER_AUTH_CACHE_TTL_SECONDS,
+                    json.dumps(entry),
+                )
+        except Exception as e:
+            logger.warning("Failed to write auth cache for user %s: %s", user.id, e)
+
+    async def invalidate(self, user_id: UUID) -> None:
+        try:
+            async with redis_connection() as redis:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.incr(REDIS_KEY_USER_AUTH_EPOCH.format(user_id=user_id))
+                    pipe.delete(REDIS_KEY_USER_AUTH.format(user_id=user_id))
+                    await pipe.execute()
+        except Exception as e:
+            logger.error("Failed to invalidate auth cache for user %s: %s", user_id, e)
+
+    def _serialize(self, user: User) -> dict[str, Any]:
+        data: dict[str, Any] = {}
+        for key, _ in self._columns:
+            value = getattr(user, key)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif isinstance(value, UUID):
+                value = str(value)
+            data[key] = value
+        return data
+
+    def _deserialize(self, data: dict[str, Any]) -> User:
+        values: dict[str, Any] = {}
+        for key, column_type in self._columns:
+            value = data.get(key)
+            if value is not None:
+                if isinstance(column_type, DateTime):
+                    value = datetime.fromisoformat(value)
+                elif isinstance(column_type, GUID):
+                    value = UUID(value)
+            values[key] = value
+
+        user = User(**values)
+        # Detached rather than transient: adding it to a session never issues
+        # an INSERT, and lazy relationship access fails loudly.
+        make_transient_to_detached(user)
+        return user
+
+
+user_auth_cache = UserAuthCache()
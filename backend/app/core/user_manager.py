@@ -1,19 +1,23 @@
 import logging
 import uuid
 from collections.abc import AsyncIterator
+from typing import Any
 
+import jwt
 from fastapi import Depends, Request
-from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin
+from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy,
 )
 from fastapi_users.db import SQLAlchemyUserDatabase
+from fastapi_users.jwt import decode_jwt
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
+from app.core.user_cache import user_auth_cache
 from app.db.session import get_db
 from app.models.db_models.user import User, UserSettings
 from app.services.email import email_service
@@ -96,6 +100,23 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
         except Exception as e:
             logger.error("Failed to send verification email to %s: %s", user.email, e)
 
+    async def on_after_update(
+        self, user: User, update_dict: dict[str, Any], request: Request | None = None
+    ) -> None:
+        await user_auth_cache.invalidate(user.id)
+
+    async def on_after_verify(self, user: User, request: Request | None = None) -> None:
+        await user_auth_cache.invalidate(user.id)
+
+    async def on_after_reset_password(
+        self, user: User, request: Request | None = None
+    ) -> None:
+        logger.info("User %s has reset their password", user.id)
+        await user_auth_cache.invalidate(user.id)
+
+    async def on_after_delete(self, user: User, request: Request | None = None) -> None:
+        await user_auth_cache.invalidate(user.id)
+
 
 async def get_user_manager(
     user_db: UserDatabase = Depends(get_user_db),
@@ -106,8 +127,43 @@ async def get_user_manager(
 bearer_transport = BearerTransport(tokenUrl="api/v1/auth/login")
 
 
+class CachedJWTStrategy(JWTStrategy[User, uuid.UUID]):
+    # Same token validation as JWTStrategy, but the user row is resolved through
+    # user_auth_cache so polling endpoints don't hit Postgres on every request.
+    async def read_token(
+        self,
+        token: str | None,
+        user_manager: BaseUserManager[User, uuid.UUID],
+    ) -> User | None:
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
+            )
+            user_id = data.get("sub")
+            if user_id is None:
+                return None
+            parsed_id = user_manager.parse_id(user_id)
+        except (jwt.PyJWTError, exceptions.InvalidID):
+            return None
+
+        cached_user, epoch = await user_auth_cache.get(parsed_id)
+        if cached_user is not None:
+            return cached_user
+
+        try:
+            user = await user_manager.get(parsed_id)
+        except exceptions.UserNotExists:
+            return None
+
+        await user_auth_cache.set(user, epoch)
+        return user
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(
+    return CachedJWTStrategy(
         secret=settings.SECRET_KEY,
         lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         algorithm=settings.ALGORITHM,
@@ -22,6 +22,11 @@ from app.api.endpoints import (
 )
 from app.api.endpoints import settings as settings_router
 from app.core.config import get_settings
+from app.core.metrics import (
+    CeleryQueueCollector,
+    CheckpointQueueCollector,
+    RedisKeyFamilyCollector,
+)
 from app.core.middleware import (
     setup_middleware,
 )
@@ -35,6 +40,7 @@ from app.admin.views import (
     MessageAttachmentAdmin,
     UserSettingsAdmin,
 )
+from prometheus_client import REGISTRY
 from prometheus_fastapi_instrumentator import Instrumentator
 from granian.utils.proxies import wrap_asgi_with_proxy_headers
 
@@ -150,5 +156,8 @@ def create_application() -> FastAPI:
 
 app = create_application()
 Instrumentator().instrument(app).expose(app)
+REGISTRY.register(CeleryQueueCollector())
+REGISTRY.register(RedisKeyFamilyCollector())
+REGISTRY.register(CheckpointQueueCollector())
 
 app = wrap_asgi_with_proxy_headers(app, trusted_hosts=settings.TRUSTED_PROXY_HOSTS)
@@ -39,12 +39,15 @@ from .chat import (
     PermissionRespondResponse,
     PortPreviewLink,
     PreviewLinksResponse,
+    RestorePreviewResponse,
     RestoreRequest,
+    ToolResultResponse,
 )
 from .pagination import PaginatedResponse, PaginationParams
 from .permissions import PermissionRequest, PermissionRequestResponse, PermissionResult
 from .sandbox import (
     AddSecretRequest,
+    FileChange,
     FileContentResponse,
     FileMetadata,
     IDEUrlResponse,
@@ -124,7 +127,9 @@ __all__ = [
     "PermissionRespondResponse",
     "PortPreviewLink",
     "PreviewLinksResponse",
+    "RestorePreviewResponse",
     "RestoreRequest",
+    "ToolResultResponse",
     # pagination
     "PaginatedResponse",
     "PaginationParams",
@@ -134,6 +139,7 @@ __all__ = [
     "PermissionResult",
     # sandbox
     "AddSecretRequest",
+    "FileChange",
     "FileContentResponse",
     "FileMetadata",
     "IDEUrlResponse",
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal
+from typing import Any, Literal
 from uuid import UUID
 
 from fastapi import UploadFile
@@ -103,6 +103,17 @@ class RestoreRequest(BaseModel):
     message_id: UUID
 
 
+class RestorePreviewResponse(BaseModel):
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+
+
+class ToolResultResponse(BaseModel):
+    tool_use_id: str
+    result: Any
+
+
 class PaginatedChats(PaginatedResponse[Chat]):
     pass
 
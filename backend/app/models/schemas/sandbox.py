@@ -28,8 +28,19 @@ class FileMetadata(BaseModel):
     is_binary: bool | None = None
 
 
+class FileChange(BaseModel):
+    op: Literal["upsert", "delete"]
+    path: str
+    file: FileMetadata | None = None
+
+
 class SandboxFilesMetadataResponse(BaseModel):
     files: list[FileMetadata]
+    # When `full` is false, `files` is empty and `changes` holds what changed
+    # since the version the client sent.
+    version: str | None = None
+    full: bool = True
+    changes: list[FileChange] = Field(default_factory=list)
 
 
 class FileContentResponse(BaseModel):
@@ -37,6 +48,9 @@ class FileContentResponse(BaseModel):
     path: str
     type: str
     is_binary: bool
+    # Set for ranged reads: where `content` starts and the full file size.
+    offset: int | None = None
+    size: int | None = None
 
 
 class AddSecretRequest(BaseModel):
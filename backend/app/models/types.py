@@ -57,6 +57,15 @@ class MessageAttachmentDict(TypedDict, total=False):
     filename: str | None
 
 
+class ChatTaskContextDict(TypedDict):
+    prompt: str
+    system_prompt: str
+    custom_instructions: str | None
+    user_data: dict[str, str]
+    chat_data: dict[str, str | None]
+    attachments: list[MessageAttachmentDict] | None
+
+
 class ChatCompletionResult(TypedDict):
     task_id: str
     message_id: str
@@ -2,14 +2,19 @@ import asyncio
 import logging
 import math
 from datetime import datetime, timezone
-from typing import cast
+from typing import TypeVar, cast
 from uuid import UUID
 
 from celery.result import AsyncResult
 from sqlalchemy import exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.constants import REDIS_KEY_CHAT_TASK
+from app.constants import (
+    REDIS_KEY_CHAT_STATE,
+    REDIS_KEY_CHAT_TASK,
+    REDIS_KEY_USER_ACTIVE_TURNS,
+)
 from app.core.config import get_settings
 from app.models.db_models import (
     Chat,
@@ -28,17 +33,24 @@ from app.models.schemas import (
     PaginatedMessages,
     PaginationParams,
 )
-from app.models.types import ChatCompletionResult, MessageAttachmentDict
+from app.models.types import ChatCompletionResult, JSONValue, MessageAttachmentDict
 from app.prompts.system_prompt import build_system_prompt_for_chat
 from app.services.ai_model import AIModelService
 from app.services.base import BaseDbService, SessionFactoryType
+from app.services.checkpoint_queue import checkpoint_queue
 from app.services.claude_agent import ClaudeAgentService
 from app.services.exceptions import ChatException, ErrorCode
 from app.services.message import MessageService
 from app.services.sandbox import SandboxService
+from app.services.sandbox_providers import CheckpointDiff
+from app.services.sandbox_lifecycle import sandbox_lifecycle
 from app.services.storage import StorageService
+from app.services.streaming.state import STREAM_STATE_QUEUED, set_stream_state
+from app.services.task_context import task_context_store
 from app.services.user import UserService
 from app.tasks.chat_processor import process_chat
+from app.tasks.sandbox_lifecycle import delete_sandboxes
+from app.utils.lazy import Lazy
 from app.utils.message_events import extract_user_prompt_and_reviews
 from app.utils.redis import redis_connection
 from app.utils.validators import (
@@ -50,22 +62,49 @@ from app.utils.validators import (
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+_background_tasks: set[asyncio.Task[None]] = set()
+
 CHAT_TITLE_MAX_LENGTH = 50
 
+# Drops expired turns, then takes the slot for ARGV[1] unless the user already
+# has ARGV[3] other chats running. Counting and claiming in one step keeps two
+# concurrent requests from both passing the limit check. Returns 2 for a new
+# slot, 1 when the chat already held one and 0 when the limit is reached.
+CLAIM_ACTIVE_TURN_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+local active = redis.call('ZCARD', KEYS[1])
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+  active = active - 1
+end
+if active >= tonumber(ARGV[3]) then
+  return 0
+end
+return redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1]) + 1
+"""
+
+T = TypeVar("T")
+
+
+def _as_lazy(service: T | Lazy[T]) -> Lazy[T]:
+    return service if isinstance(service, Lazy) else Lazy.ready(service)
+
 
 class ChatService(BaseDbService[Chat]):
     def __init__(
         self,
-        storage_service: StorageService,
-        sandbox_service: SandboxService,
-        ai_service: ClaudeAgentService,
+        storage_service: StorageService | Lazy[StorageService],
+        sandbox_service: SandboxService | Lazy[SandboxService],
+        ai_service: ClaudeAgentService | Lazy[ClaudeAgentService],
         user_service: UserService,
         session_factory: SessionFactoryType | None = None,
     ) -> None:
+        # Most chat endpoints only touch the database. The sandbox, storage
+        # and agent services may be passed as Lazy so they are only built by
+        # the requests that use them.
         super().__init__(session_factory)
-        self.sandbox_service = sandbox_service
-        self.ai_service = ai_service
-        self.storage_service = storage_service
+        self._sandbox_service = _as_lazy(sandbox_service)
+        self._ai_service = _as_lazy(ai_service)
+        self._storage_service = _as_lazy(storage_service)
         self.user_service = user_service
         self.message_service = MessageService(session_factory=self._session_factory)
 
@@ -78,6 +117,15 @@ class ChatService(BaseDbService[Chat]):
         self._session_factory = value
         self.message_service.session_factory = value
 
+    async def get_sandbox_service(self) -> SandboxService:
+        return await self._sandbox_service.get()
+
+    async def get_ai_service(self) -> ClaudeAgentService:
+        return await self._ai_service.get()
+
+    async def get_storage_service(self) -> StorageService:
+        return await self._storage_service.get()
+
     async def get_user_chats(
         self, user: User, pagination: PaginationParams | None = None
     ) -> PaginatedChats:
@@ -119,7 +167,8 @@ class ChatService(BaseDbService[Chat]):
         )
         await self._validate_api_keys(user_settings, chat_data.model_id)
 
-        sandbox_id = await self.sandbox_service.create_sandbox()
+        sandbox_service = await self.get_sandbox_service()
+        sandbox_id = await sandbox_service.create_sandbox()
 
         github_token = user_settings.github_personal_access_token
         openrouter_api_key = user_settings.openrouter_api_key
@@ -128,7 +177,7 @@ class ChatService(BaseDbService[Chat]):
         custom_slash_commands = user_settings.custom_slash_commands
         custom_agents = user_settings.custom_agents
 
-        await self.sandbox_service.initialize_sandbox(
+        await sandbox_service.initialize_sandbox(
             sandbox_id=sandbox_id,
             github_token=github_token,
             openrouter_api_key=openrouter_api_key,
@@ -254,7 +303,15 @@ class ChatService(BaseDbService[Chat]):
             await db.commit()
 
             if chat.sandbox_id:
-                await self.sandbox_service.delete_sandbox(chat.sandbox_id)
+                await self._schedule_sandbox_deletion(
+                    user.id,
+                    [
+                        {
+                            "sandbox_id": chat.sandbox_id,
+                            "sandbox_provider": chat.sandbox_provider,
+                        }
+                    ],
+                )
 
     async def get_chat_sandbox_id(self, chat_id: UUID, user: User) -> str | None:
         async with self.session_factory() as db:
@@ -305,22 +362,20 @@ class ChatService(BaseDbService[Chat]):
 
     async def delete_all_chats(self, user: User) -> int:
         async with self.session_factory() as db:
-            sandbox_query = select(Chat.sandbox_id).filter(
-                Chat.user_id == user.id,
-                Chat.sandbox_id.isnot(None),
-                Chat.deleted_at.is_(None),
-            )
-            result = await db.execute(sandbox_query)
-            sandbox_ids = [row[0] for row in result.fetchall()]
-
             now = datetime.now(timezone.utc)
 
             chats_update = (
                 update(Chat)
                 .where(Chat.user_id == user.id, Chat.deleted_at.is_(None))
                 .values(deleted_at=now)
+                .returning(Chat.sandbox_id, Chat.sandbox_provider)
             )
-            await db.execute(chats_update)
+            result = await db.execute(chats_update)
+            sandboxes = [
+                {"sandbox_id": row.sandbox_id, "sandbox_provider": row.sandbox_provider}
+                for row in result.all()
+                if row.sandbox_id
+            ]
 
             messages_update = (
                 update(Message)
@@ -336,10 +391,30 @@ class ChatService(BaseDbService[Chat]):
 
             await db.commit()
 
-            for sandbox_id in sandbox_ids:
-                await self.sandbox_service.delete_sandbox(sandbox_id)
+        await self._schedule_sandbox_deletion(user.id, sandboxes)
+        return len(sandboxes)
 
-            return len(sandbox_ids)
+    async def _schedule_sandbox_deletion(
+        self, user_id: UUID, sandboxes: list[dict[str, str | None]]
+    ) -> None:
+        # Teardown runs on a maintenance worker with bounded concurrency and
+        # retries, so the request returns without waiting for any sandbox.
+        if not sandboxes:
+            return
+        try:
+            delete_sandboxes.delay(str(user_id), sandboxes)
+            return
+        except Exception as e:
+            logger.warning("Failed to queue sandbox deletion: %s", e)
+
+        sandbox_service = await self.get_sandbox_service()
+        for sandbox in sandboxes:
+            try:
+                await sandbox_service.destroy_sandbox(str(sandbox["sandbox_id"]))
+            except Exception as e:
+                logger.warning(
+                    "Failed to delete sandbox %s: %s", sandbox["sandbox_id"], e
+                )
 
     async def get_chat_messages(
         self, chat_id: UUID, user: User, pagination: PaginationParams | None = None
@@ -353,7 +428,11 @@ class ChatService(BaseDbService[Chat]):
                 status_code=403,
             )
 
-        asyncio.create_task(self._resume_sandbox(chat_id, user))
+        # The resume outlives the request, so it must not use the request's
+        # sandbox service; keep a reference so the task isn't collected.
+        task = asyncio.create_task(self._resume_sandbox(chat_id, user))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
 
         return await self.message_service.get_chat_messages(chat_id, pagination)
 
@@ -370,23 +449,34 @@ class ChatService(BaseDbService[Chat]):
             )
 
         await self._check_message_limit(current_user.id)
+        claimed = await self._claim_active_turn(current_user.id, request.chat_id)
+        try:
+            return await self._start_chat_completion(request, current_user)
+        except Exception:
+            # A slot the chat already held belongs to its running turn.
+            if claimed:
+                await self._release_active_turn(current_user.id, request.chat_id)
+            raise
 
+    async def _start_chat_completion(
+        self,
+        request: ChatRequest,
+        current_user: User,
+    ) -> ChatCompletionResult:
         user_settings = await self.user_service.get_user_settings(current_user.id)
         await self._validate_api_keys(user_settings, request.model_id)
 
         chat = await self.get_chat(request.chat_id, current_user)
 
         chat_id = chat.id
+        if chat.sandbox_id:
+            await sandbox_lifecycle.record_activity(chat.sandbox_id, force=True)
 
         attachments: list[MessageAttachmentDict] | None = None
         if request.attached_files:
-            attachments = list(
-                await asyncio.gather(
-                    *[
-                        self.storage_service.save_file(file, sandbox_id=chat.sandbox_id)
-                        for file in request.attached_files
-                    ]
-                )
+            storage_service = await self.get_storage_service()
+            attachments = await storage_service.save_files(
+                request.attached_files, sandbox_id=chat.sandbox_id
             )
 
         try:
@@ -412,7 +502,8 @@ class ChatService(BaseDbService[Chat]):
         session_id = chat.session_id
         if session_id and chat.sandbox_id:
             if await self._needs_session_cleaning(chat.id, request.model_id):
-                await self.sandbox_service.clean_session_thinking_blocks(
+                sandbox_service = await self.get_sandbox_service()
+                await sandbox_service.clean_session_thinking_blocks(
                     chat.sandbox_id, session_id
                 )
 
@@ -425,6 +516,7 @@ class ChatService(BaseDbService[Chat]):
             user_settings.custom_instructions if user_settings else None
         )
 
+        await self._mark_turn_queued(chat_id, assistant_message.id)
         try:
             task = await self._enqueue_chat_task(
                 prompt=ai_prompt,
@@ -471,23 +563,14 @@ class ChatService(BaseDbService[Chat]):
     ) -> None:
         chat = await self.get_chat(chat_id, current_user)
         sandbox_id = chat.sandbox_id
+        await self._wait_for_checkpoints(chat)
 
         async with self.session_factory() as db:
-            result = await db.execute(select(Message).filter(Message.id == message_id))
-            message = result.scalar_one_or_none()
-
-            if not message or message.chat_id != chat_id:
-                raise ChatException(
-                    "Message not found for this chat",
-                    error_code=ErrorCode.MESSAGE_NOT_FOUND,
-                    details={"message_id": str(message_id), "chat_id": str(chat_id)},
-                    status_code=404,
-                )
+            message = await self._get_chat_message(db, chat_id, message_id)
 
             if sandbox_id and message.checkpoint_id:
-                await self.sandbox_service.restore_to_message(
-                    sandbox_id, str(message.id)
-                )
+                sandbox_service = await self.get_sandbox_service()
+                await sandbox_service.restore_to_message(sandbox_id, str(message.id))
 
             await self.message_service.delete_messages_after(chat_id, message)
 
@@ -499,6 +582,80 @@ class ChatService(BaseDbService[Chat]):
             await db.execute(update_stmt)
             await db.commit()
 
+    async def preview_restore(
+        self, chat_id: UUID, message_id: UUID, current_user: User
+    ) -> CheckpointDiff:
+        # Lists the workspace files restore_to_checkpoint would add, change and
+        # remove, without touching the workspace.
+        chat = await self.get_chat(chat_id, current_user)
+        await self._wait_for_checkpoints(chat)
+
+        async with self.session_factory() as db:
+            message = await self._get_chat_message(db, chat_id, message_id)
+
+        if not (chat.sandbox_id and message.checkpoint_id):
+            return CheckpointDiff()
+
+        sandbox_service = await self.get_sandbox_service()
+        try:
+            return await sandbox_service.diff_checkpoint(
+                chat.sandbox_id, str(message.id)
+            )
+        except FileNotFoundError:
+            raise ChatException(
+                "Checkpoint not found for this message",
+                error_code=ErrorCode.MESSAGE_NOT_FOUND,
+                details={"message_id": str(message_id), "chat_id": str(chat_id)},
+                status_code=404,
+            )
+
+    async def get_tool_result(
+        self, chat_id: UUID, tool_use_id: str, current_user: User
+    ) -> JSONValue:
+        chat = await self.get_chat(chat_id, current_user)
+        result: JSONValue | None = None
+        if chat.sandbox_id and chat.session_id:
+            sandbox_service = await self.get_sandbox_service()
+            result = await sandbox_service.get_tool_result(
+                chat.sandbox_id, chat.session_id, tool_use_id
+            )
+        if result is None:
+            raise ChatException(
+                "Tool result not found in the chat's session",
+                error_code=ErrorCode.TOOL_RESULT_NOT_FOUND,
+                details={"chat_id": str(chat_id), "tool_use_id": tool_use_id},
+                status_code=404,
+            )
+        return result
+
+    async def _wait_for_checkpoints(self, chat: Chat) -> None:
+        # Checkpoints are taken in the background; the one being restored may
+        # still be queued, and a running one must not race the restore.
+        if chat.sandbox_id and not await checkpoint_queue.wait_until_drained(
+            str(chat.id), settings.CHECKPOINT_RESTORE_WAIT_SECONDS
+        ):
+            raise ChatException(
+                "Checkpoints for this chat are still being created",
+                error_code=ErrorCode.CHAT_CHECKPOINT_PENDING,
+                details={"chat_id": str(chat.id)},
+                status_code=409,
+            )
+
+    async def _get_chat_message(
+        self, db: AsyncSession, chat_id: UUID, message_id: UUID
+    ) -> Message:
+        result = await db.execute(select(Message).filter(Message.id == message_id))
+        message: Message | None = result.scalar_one_or_none()
+
+        if not message or message.chat_id != chat_id:
+            raise ChatException(
+                "Message not found for this chat",
+                error_code=ErrorCode.MESSAGE_NOT_FOUND,
+                details={"message_id": str(message_id), "chat_id": str(chat_id)},
+                status_code=404,
+            )
+        return message
+
     async def _verify_chat_access(self, chat_id: UUID, user_id: UUID) -> bool:
         async with self.session_factory() as db:
             query = select(
@@ -562,31 +719,83 @@ class ChatService(BaseDbService[Chat]):
         thinking_mode: str | None,
         attachments: list[MessageAttachmentDict] | None,
     ) -> "AsyncResult[object]":
+        context_hash = await task_context_store.save(
+            {
+                "prompt": prompt,
+                "system_prompt": system_prompt,
+                "custom_instructions": custom_instructions,
+                "user_data": {
+                    "id": str(user.id),
+                    "email": user.email,
+                    "username": user.username,
+                },
+                "chat_data": {
+                    "id": str(chat.id),
+                    "user_id": str(chat.user_id),
+                    "title": chat.title,
+                    "sandbox_id": chat.sandbox_id,
+                    "session_id": chat.session_id,
+                    "sandbox_provider": chat.sandbox_provider,
+                },
+                "attachments": attachments,
+            }
+        )
         return process_chat.delay(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            custom_instructions=custom_instructions,
-            user_data={
-                "id": str(user.id),
-                "email": user.email,
-                "username": user.username,
-            },
-            chat_data={
-                "id": str(chat.id),
-                "user_id": str(chat.user_id),
-                "title": chat.title,
-                "sandbox_id": chat.sandbox_id,
-                "session_id": chat.session_id,
-                "sandbox_provider": chat.sandbox_provider,
-            },
-            permission_mode=permission_mode,
+            context_hash=context_hash,
+            chat_id=str(chat.id),
+            user_id=str(user.id),
             model_id=model_id,
+            permission_mode=permission_mode,
             session_id=session_id,
             assistant_message_id=assistant_message_id,
             thinking_mode=thinking_mode,
-            attachments=attachments,
         )
 
+    async def _claim_active_turn(self, user_id: UUID, chat_id: UUID) -> bool:
+        # Active turns are tracked per user as chat_id -> expiry so a worker that
+        # dies without cleaning up only holds the slot until the task TTL. The
+        # slot is claimed before enqueueing so a turn that finishes immediately
+        # can't release it before it was taken.
+        now = datetime.now(timezone.utc).timestamp()
+        async with redis_connection() as redis:
+            claimed = await redis.eval(  # type: ignore[misc]
+                CLAIM_ACTIVE_TURN_SCRIPT,
+                1,
+                REDIS_KEY_USER_ACTIVE_TURNS.format(user_id=user_id),
+                str(chat_id),
+                now,
+                settings.MAX_CONCURRENT_CHAT_TURNS_PER_USER,
+                now + settings.TASK_TTL_SECONDS,
+            )
+        if not claimed:
+            raise ChatException(
+                "Too many chats are running at once. Wait for one to finish and try again.",
+                error_code=ErrorCode.RATE_LIMIT_EXCEEDED,
+                details={"user_id": str(user_id)},
+                status_code=429,
+            )
+        return bool(claimed == 2)
+
+    async def _mark_turn_queued(self, chat_id: UUID, message_id: UUID) -> None:
+        # Published before enqueueing so the turn can't publish its final state
+        # ahead of this one.
+        async with redis_connection() as redis:
+            await set_stream_state(
+                redis,
+                str(chat_id),
+                status=STREAM_STATE_QUEUED,
+                task_id="",
+                message_id=str(message_id),
+                last_event_id="",
+            )
+
+    async def _release_active_turn(self, user_id: UUID, chat_id: UUID) -> None:
+        async with redis_connection() as redis:
+            await redis.zrem(
+                REDIS_KEY_USER_ACTIVE_TURNS.format(user_id=user_id), str(chat_id)
+            )
+            await redis.delete(REDIS_KEY_CHAT_STATE.format(chat_id=chat_id))
+
     async def _store_active_task(self, chat_id: UUID, task_id: str) -> None:
         async with redis_connection() as redis:
             await redis.setex(
@@ -594,12 +803,21 @@ class ChatService(BaseDbService[Chat]):
                 settings.TASK_TTL_SECONDS,
                 task_id,
             )
+            await redis.hset(
+                REDIS_KEY_CHAT_STATE.format(chat_id=chat_id), "task_id", task_id
+            )
 
     async def _resume_sandbox(self, chat_id: UUID, user: User) -> None:
         try:
             sandbox_id = await self.get_chat_sandbox_id(chat_id, user)
-            if sandbox_id:
-                await self.sandbox_service.get_or_connect_sandbox(sandbox_id)
+            if sandbox_id and await sandbox_lifecycle.claim_resume(sandbox_id):
+                sandbox_service = SandboxService(
+                    await self.user_service.create_sandbox_provider(user.id)
+                )
+                try:
+                    await sandbox_service.get_or_connect_sandbox(sandbox_id)
+                finally:
+                    await sandbox_service.cleanup()
         except ChatException:
             pass
         except Exception as e:
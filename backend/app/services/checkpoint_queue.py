@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from dataclasses import asdict, dataclass
+
+from app.constants import (
+    REDIS_KEY_CHAT_CHECKPOINTS,
+    REDIS_KEY_CHAT_CHECKPOINTS_LOCK,
+    REDIS_KEY_CHECKPOINTS_PENDING,
+)
+from app.core.config import get_settings
+from app.utils.redis import redis_connection
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RESTORE_WAIT_POLL_SECONDS = 0.25
+
+ENQUEUE_SCRIPT = """
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[2], 'NX', ARGV[2], ARGV[3])
+return 1
+"""
+
+# Pops the entry only if it is still the head, so a worker that lost its lock
+# cannot drop a checkpoint it did not take, and moves the chat's score in the
+# pending set to the next entry's enqueue time.
+COMPLETE_SCRIPT = """
+if redis.call('LINDEX', KEYS[1], 0) ~= ARGV[1] then
+  return 0
+end
+redis.call('LPOP', KEYS[1])
+local head = redis.call('LINDEX', KEYS[1], 0)
+if head then
+  redis.call('ZADD', KEYS[2], cjson.decode(head)['enqueued_at'], ARGV[2])
+else
+  redis.call('ZREM', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+# A chat is stale when nobody holds its lock; one whose list is already gone
+# only has a leftover pending entry, which is dropped instead.
+STALE_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) == 0 then
+  redis.call('ZREM', KEYS[3], ARGV[1])
+  return 0
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+  return 0
+end
+return 1
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class PendingCheckpoint:
+    chat_id: str
+    user_id: str
+    sandbox_id: str
+    sandbox_provider: str | None
+    message_id: str
+    enqueued_at: float
+
+    def encode(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def decode(cls, raw: str) -> "PendingCheckpoint":
+        return cls(**json.loads(raw))
+
+
+class CheckpointQueue:
+    # Each chat has a FIFO list of checkpoints still to take. A worker drains
+    # it under a per-chat lock and removes an entry only after its snapshot is
+    # done, so snapshots are taken in turn order and an empty list means none
+    # is pending or running. The pending sorted set maps chat_id -> enqueue time
+    # of that chat's oldest entry, which is what the lag metric reads.
+    async def enqueue(self, checkpoint: PendingCheckpoint) -> None:
+        async with redis_connection() as redis:
+            await redis.eval(  # type: ignore[misc]
+                ENQUEUE_SCRIPT,
+                2,
+                REDIS_KEY_CHAT_CHECKPOINTS.format(chat_id=checkpoint.chat_id),
+                REDIS_KEY_CHECKPOINTS_PENDING,
+                checkpoint.encode(),
+                checkpoint.enqueued_at,
+                checkpoint.chat_id,
+            )
+
+    async def acquire(self, chat_id: str) -> str | None:
+        token = secrets.token_hex(8)
+        async with redis_connection() as redis:
+            acquired = await redis.set(
+                REDIS_KEY_CHAT_CHECKPOINTS_LOCK.format(chat_id=chat_id),
+                token,
+                ex=settings.CHECKPOINT_QUEUE_LOCK_SECONDS,
+                nx=True,
+            )
+        return token if acquired else None
+
+    async def extend(self, chat_id: str) -> None:
+        async with redis_connection() as redis:
+            await redis.expire(
+                REDIS_KEY_CHAT_CHECKPOINTS_LOCK.format(chat_id=chat_id),
+                settings.CHECKPOINT_QUEUE_LOCK_SECONDS,
+            )
+
+    async def release(self, chat_id: str, token: str) -> None:
+        async with redis_connection() as redis:
+            await redis.eval(  # type: ignore[misc]
+                RELEASE_SCRIPT,
+                1,
+                REDIS_KEY_CHAT_CHECKPOINTS_LOCK.format(chat_id=chat_id),
+                token,
+            )
+
+    async def peek(self, chat_id: str) -> PendingCheckpoint | None:
+        async with redis_connection() as redis:
+            raw = await redis.lindex(
+                REDIS_KEY_CHAT_CHECKPOINTS.format(chat_id=chat_id), 0
+            )
+        return PendingCheckpoint.decode(raw) if raw else None
+
+    async def complete(self, checkpoint: PendingCheckpoint) -> None:
+        async with redis_connection() as redis:
+            await redis.eval(  # type: ignore[misc]
+                COMPLETE_SCRIPT,
+                2,
+                REDIS_KEY_CHAT_CHECKPOINTS.format(chat_id=checkpoint.chat_id),
+                REDIS_KEY_CHECKPOINTS_PENDING,
+                checkpoint.encode(),
+                checkpoint.chat_id,
+            )
+
+    async def pending_count(self, chat_id: str) -> int:
+        async with redis_connection() as redis:
+            count: int = await redis.llen(
+                REDIS_KEY_CHAT_CHECKPOINTS.format(chat_id=chat_id)
+            )
+        return count
+
+    async def wait_until_drained(self, chat_id: str, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        async with redis_connection() as redis:
+            key = REDIS_KEY_CHAT_CHECKPOINTS.format(chat_id=chat_id)
+            while await redis.llen(key):
+                if time.monotonic() >= deadline:
+                    return False
+                await asyncio.sleep(RESTORE_WAIT_POLL_SECONDS)
+        return True
+
+    async def stale_chats(self, max_age: float) -> list[str]:
+        # Chats whose oldest checkpoint has waited past max_age without a
+        # worker draining them: the dispatch after enqueue failed, or the
+        # worker died and its lock has since expired.
+        stale: list[str] = []
+        async with redis_connection() as redis:
+            chat_ids = await redis.zrangebyscore(
+                REDIS_KEY_CHECKPOINTS_PENDING, "-inf", time.time() - max_age
+            )
+            for chat_id in chat_ids:
+                if await redis.eval(  # type: ignore[misc]
+                    STALE_SCRIPT,
+                    3,
+                    REDIS_KEY_CHAT_CHECKPOINTS.format(chat_id=chat_id),
+                    REDIS_KEY_CHAT_CHECKPOINTS_LOCK.format(chat_id=chat_id),
+                    REDIS_KEY_CHECKPOINTS_PENDING,
+                    chat_id,
+                ):
+                    stale.append(chat_id)
+        return stale
+
+
+checkpoint_queue = CheckpointQueue()
@@ -23,8 +23,13 @@ from app.models.db_models import Chat, User, UserSettings
 from app.models.db_models.enums import ModelProvider
 from app.prompts.enhance_prompt import get_enhance_prompt
 from app.services.ai_model import AIModelService
-from app.services.transports import DockerSandboxTransport, E2BSandboxTransport
+from app.services.transports import (
+    DockerSandboxTransport,
+    E2BSandboxTransport,
+    ResidentSession,
+)
 from app.services.exceptions import ClaudeAgentException
+from app.services.mcp_runtime import npx_server_command
 from app.services.sandbox_providers import SandboxProviderType, create_docker_config
 from app.services.streaming.events import StreamEvent
 from app.services.streaming.processor import StreamProcessor
@@ -136,6 +141,7 @@ class ClaudeAgentService:
         options: ClaudeAgentOptions,
         user_settings: UserSettings | None = None,
         e2b_api_key: str | None = None,
+        resident: ResidentSession | None = None,
     ) -> E2BSandboxTransport | DockerSandboxTransport:
         if sandbox_provider == SandboxProviderType.DOCKER:
             docker_config = create_docker_config()
@@ -144,6 +150,7 @@ class ClaudeAgentService:
                 docker_config=docker_config,
                 prompt=prompt_iterable,
                 options=options,
+                resident=resident,
             )
 
         if e2b_api_key is None and user_settings is not None:
@@ -162,6 +169,21 @@ class ClaudeAgentService:
             api_key=e2b_api_key,
             prompt=prompt_iterable,
             options=options,
+            resident=resident,
+        )
+
+    @staticmethod
+    def _create_resident_session(chat_id: str) -> ResidentSession | None:
+        # The chat's CLI stays up between turns; its permission server reads a
+        # token that is refreshed on every turn rather than one baked into its
+        # launch options.
+        if not settings.AGENT_RESIDENT_PROCESS_ENABLED:
+            return None
+        return ResidentSession(
+            key=chat_id,
+            idle_timeout=settings.AGENT_RESIDENT_IDLE_TIMEOUT_SECONDS,
+            max_age=settings.AGENT_RESIDENT_MAX_AGE_SECONDS,
+            files={"chat_token": create_chat_scoped_token(chat_id)},
         )
 
     async def get_ai_stream(
@@ -188,6 +210,7 @@ class ClaudeAgentService:
         self._total_cost_usd = 0.0
 
         sandbox_provider = chat.sandbox_provider or user_settings.sandbox_provider
+        resident = self._create_resident_session(chat_id)
 
         options = await self._build_claude_options(
             user=user,
@@ -199,6 +222,7 @@ class ClaudeAgentService:
             thinking_mode=thinking_mode,
             chat_id=chat_id,
             sandbox_provider=sandbox_provider,
+            chat_token_file=resident.file_path("chat_token") if resident else None,
         )
 
         user_prompt = self.prepare_user_prompt(prompt, custom_instructions, attachments)
@@ -223,6 +247,7 @@ class ClaudeAgentService:
             prompt_iterable=prompt_iterable,
             options=options,
             user_settings=user_settings,
+            resident=resident,
         )
         e2b_api_key = (
             user_settings.e2b_api_key
@@ -242,6 +267,10 @@ class ClaudeAgentService:
                 async with ClaudeSDKClient(
                     options=options, transport=transport
                 ) as client:
+                    if transport.reused and options.permission_mode:
+                        # An earlier turn may have switched modes (e.g. on
+                        # ExitPlanMode) in the process being reused.
+                        await client.set_permission_mode(options.permission_mode)
                     await client.query(prompt_iterable)
                     async for message in client.receive_response():
                         for event in processor.emit_events_for_message(message):
@@ -268,6 +297,7 @@ class ClaudeAgentService:
             e2b_api_key=e2b_api_key
             if sandbox_provider != SandboxProviderType.DOCKER
             else None,
+            resident=resident,
         )
 
         if token_usage is not None:
@@ -343,14 +373,16 @@ class ClaudeAgentService:
             raise ClaudeAgentException(f"Failed to enhance prompt: {str(e)}")
 
     def _build_permission_server(
-        self, permission_mode: str, chat_id: str, sandbox_provider: str = "docker"
+        self,
+        permission_mode: str,
+        chat_id: str,
+        sandbox_provider: str = "docker",
+        chat_token_file: str | None = None,
     ) -> dict[str, Any]:
         # MCP permission server runs inside the E2B sandbox and makes HTTP requests
         # to our backend API for user approval flows. For local development, this
         # requires a tunnel (ngrok, cloudflare) since the sandbox can't reach localhost.
         # Docker sandboxes use host.docker.internal to reach the host machine.
-        chat_token = create_chat_scoped_token(chat_id)
-
         if sandbox_provider == SandboxProviderType.DOCKER:
             base_url = settings.BASE_URL
             port = (
@@ -362,16 +394,21 @@ class ClaudeAgentService:
         else:
             api_base_url = settings.BASE_URL
 
+        env = {
+            "PYTHONUNBUFFERED": "1",
+            "PERMISSION_MODE": permission_mode,
+            "API_BASE_URL": api_base_url,
+            "CHAT_ID": chat_id,
+        }
+        if chat_token_file:
+            env["CHAT_TOKEN_FILE"] = chat_token_file
+        else:
+            env["CHAT_TOKEN"] = create_chat_scoped_token(chat_id)
+
         return {
             "command": "python3",
             "args": ["-u", "/usr/local/bin/permission_server.py"],
-            "env": {
-                "PYTHONUNBUFFERED": "1",
-                "PERMISSION_MODE": permission_mode,
-                "API_BASE_URL": api_base_url,
-                "CHAT_TOKEN": chat_token,
-                "CHAT_ID": chat_id,
-            },
+            "env": env,
         }
 
     def _build_zai_servers(self, z_ai_api_key: str) -> dict[str, Any]:
@@ -427,6 +464,7 @@ class ClaudeAgentService:
         use_zai_mcp: bool,
         use_minimax_mcp: bool = False,
         sandbox_provider: str = "docker",
+        chat_token_file: str | None = None,
     ) -> dict[str, Any]:
         user_settings = await UserService(
             session_factory=self.session_factory
@@ -434,7 +472,7 @@ class ClaudeAgentService:
 
         servers = {
             "permission": self._build_permission_server(
-                permission_mode, chat_id, sandbox_provider
+                permission_mode, chat_id, sandbox_provider, chat_token_file
             )
         }
 
@@ -472,13 +510,18 @@ class ClaudeAgentService:
             if mcp.get("env_vars"):
                 config["headers"] = mcp["env_vars"]
         else:
-            args = list(type_config["args_prefix"]) + [mcp[required_field]]
-            if mcp.get("args"):
-                args.extend(mcp["args"])
-            config = {
-                "command": type_config["command"],
-                "args": args,
-            }
+            if command_type == "npx":
+                config = npx_server_command(
+                    mcp[required_field], list(mcp.get("args") or [])
+                )
+            else:
+                args = list(type_config["args_prefix"]) + [mcp[required_field]]
+                if mcp.get("args"):
+                    args.extend(mcp["args"])
+                config = {
+                    "command": type_config["command"],
+                    "args": args,
+                }
             if mcp.get("env_vars"):
                 config["env"] = mcp["env_vars"]
 
@@ -491,10 +534,7 @@ class ClaudeAgentService:
         env: dict[str, str] | None = None,
         extra_args: list[str] | None = None,
     ) -> dict[str, Any]:
-        args = ["-y", package]
-        if extra_args:
-            args.extend(extra_args)
-        config: dict[str, object] = {"command": "npx", "args": args}
+        config: dict[str, object] = npx_server_command(package, extra_args or [])
         if env:
             config["env"] = env
         return config
@@ -511,6 +551,7 @@ class ClaudeAgentService:
         thinking_mode: str | None,
         chat_id: str,
         sandbox_provider: str = "docker",
+        chat_token_file: str | None = None,
     ) -> ClaudeAgentOptions:
         env, provider = await self._build_auth_env(model_id, user_settings)
 
@@ -557,6 +598,7 @@ class ClaudeAgentService:
                 provider == ModelProvider.ZAI,
                 provider == ModelProvider.MINIMAX,
                 sandbox_provider,
+                chat_token_file,
             ),
             cwd="/home/user",
             user="user",
@@ -625,6 +667,7 @@ class ClaudeAgentService:
         sandbox_id: str,
         sandbox_provider: str,
         e2b_api_key: str | None = None,
+        resident: ResidentSession | None = None,
     ) -> int | None:
         # Extracts token usage by running the /context command and parsing the response.
         # The Claude CLI outputs context info in a specific format:
@@ -649,6 +692,7 @@ class ClaudeAgentService:
                 prompt_iterable=prompt_iterable,
                 options=options,
                 e2b_api_key=e2b_api_key,
+                resident=resident,
             )
 
             async with transport:
@@ -12,8 +12,10 @@ class ErrorCode(str, Enum):
     CHAT_UPDATE_FAILED = "CHAT_UPDATE_FAILED"
     CHAT_DELETE_FAILED = "CHAT_DELETE_FAILED"
     CHAT_DAILY_LIMIT_EXCEEDED = "CHAT_DAILY_LIMIT_EXCEEDED"
+    CHAT_CHECKPOINT_PENDING = "CHAT_CHECKPOINT_PENDING"
 
     MESSAGE_NOT_FOUND = "MESSAGE_NOT_FOUND"
+    TOOL_RESULT_NOT_FOUND = "TOOL_RESULT_NOT_FOUND"
     MESSAGE_CREATE_FAILED = "MESSAGE_CREATE_FAILED"
     MESSAGE_UPDATE_FAILED = "MESSAGE_UPDATE_FAILED"
 
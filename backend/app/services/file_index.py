@@ -0,0 +1,336 @@
+import logging
+import posixpath
+import re
+import time
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any
+
+from app.constants import (
+    REDIS_KEY_FILE_INDEX,
+    REDIS_KEY_FILE_INDEX_JOURNAL,
+    REDIS_KEY_FILE_INDEX_LOCK,
+    REDIS_KEY_FILE_INDEX_META,
+)
+from app.core.config import get_settings
+from app.services.sandbox_providers import FileMetadata, SandboxProvider
+from app.utils.json_codec import json_codec
+from app.utils.redis import redis_connection
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+    from redis.asyncio.client import Pipeline
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+HOME_DIR = "/home/user"
+INDEX_LOCK_SECONDS = 60
+STREAM_ID_PATTERN = re.compile(r"\d+-\d+")
+
+JOURNAL_RESET = "reset"
+JOURNAL_UPSERT = "upsert"
+JOURNAL_DELETE = "delete"
+
+
+def _encode_entry(item: FileMetadata) -> str:
+    return json_codec.dumps([item.type, item.size, item.modified, item.is_binary])
+
+
+def _decode_entry(path: str, value: str) -> dict[str, Any]:
+    file_type, size, modified, is_binary = json_codec.loads(value)
+    return {
+        "path": path,
+        "type": file_type,
+        "size": size,
+        "modified": modified,
+        "is_binary": is_binary,
+    }
+
+
+def _is_directory(value: str) -> bool:
+    return bool(json_codec.loads(value)[0] == "directory")
+
+
+def _sandbox_path(path: str) -> str:
+    return f"{HOME_DIR}/{path}" if path else HOME_DIR
+
+
+class FileTreeIndex:
+    # Per-sandbox index of the file explorer tree, kept in Redis so polling
+    # clients don't walk the whole sandbox on every request. The first request
+    # does a full scan. Later ones look only at entries whose ctime moved since
+    # the previous scan, re-list the directories among them to pick up
+    # deletions, and record what changed in a journal stream. The id of the
+    # newest journal entry is the version clients send back to receive only
+    # the changes after it.
+    async def get_files(
+        self, provider: SandboxProvider, sandbox_id: str, since: str | None = None
+    ) -> dict[str, Any]:
+        index_key = REDIS_KEY_FILE_INDEX.format(sandbox_id=sandbox_id)
+        journal_key = REDIS_KEY_FILE_INDEX_JOURNAL.format(sandbox_id=sandbox_id)
+
+        async with redis_connection() as redis:
+            await self._refresh(redis, provider, sandbox_id)
+
+            if since and STREAM_ID_PATTERN.fullmatch(since):
+                entries = await redis.xrange(journal_key, min=since, max="+")
+                changes = self._collect_changes(entries, since)
+                if changes is not None:
+                    version = entries[-1][0]
+                    return {
+                        "version": version,
+                        "full": False,
+                        "files": [],
+                        "changes": changes,
+                    }
+
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.xrevrange(journal_key, count=1)
+                pipe.hgetall(index_key)
+                latest, index = await pipe.execute()
+
+        if not latest:
+            # Another request holds the lock and is still building the index.
+            files = await provider.list_files(sandbox_id)
+            return {
+                "version": None,
+                "full": True,
+                "files": [asdict(item) for item in files],
+                "changes": [],
+            }
+
+        return {
+            "version": latest[0][0],
+            "full": True,
+            "files": [_decode_entry(path, value) for path, value in index.items()],
+            "changes": [],
+        }
+
+    async def mark_stale(self, sandbox_id: str) -> None:
+        # Files written through the API should show up on the next poll rather
+        # than after the refresh interval.
+        meta_key = REDIS_KEY_FILE_INDEX_META.format(sandbox_id=sandbox_id)
+        try:
+            async with redis_connection() as redis:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.hset(meta_key, "refreshed_at", 0)
+                    pipe.expire(meta_key, settings.FILE_INDEX_TTL_SECONDS)
+                    await pipe.execute()
+        except Exception as e:
+            logger.warning(
+                "Failed to mark file index stale for sandbox %s: %s", sandbox_id, e
+            )
+
+    async def forget(self, sandbox_id: str) -> None:
+        try:
+            async with redis_connection() as redis:
+                await redis.delete(
+                    REDIS_KEY_FILE_INDEX.format(sandbox_id=sandbox_id),
+                    REDIS_KEY_FILE_INDEX_META.format(sandbox_id=sandbox_id),
+                    REDIS_KEY_FILE_INDEX_JOURNAL.format(sandbox_id=sandbox_id),
+                    REDIS_KEY_FILE_INDEX_LOCK.format(sandbox_id=sandbox_id),
+                )
+        except Exception as e:
+            logger.warning(
+                "Failed to clear file index for sandbox %s: %s", sandbox_id, e
+            )
+
+    @staticmethod
+    def _collect_changes(
+        entries: list[tuple[str, dict[str, str]]], since: str
+    ) -> list[dict[str, Any]] | None:
+        # A delta is only possible while the client's version is still in the
+        # journal; if it was trimmed or the index was rebuilt after it, the
+        # client needs the full list.
+        if not entries or entries[0][0] != since:
+            return None
+
+        changes: dict[str, dict[str, Any]] = {}
+        for _, fields in entries[1:]:
+            op = fields.get("op")
+            if op == JOURNAL_RESET:
+                return None
+            path = fields["path"]
+            # Only the latest change per path matters, in the order it happened.
+            changes.pop(path, None)
+            changes[path] = {
+                "op": op,
+                "path": path,
+                "file": _decode_entry(path, fields["file"])
+                if op == JOURNAL_UPSERT
+                else None,
+            }
+        return list(changes.values())
+
+    async def _refresh(
+        self, redis: "Redis[str]", provider: SandboxProvider, sandbox_id: str
+    ) -> None:
+        meta = await redis.hgetall(
+            REDIS_KEY_FILE_INDEX_META.format(sandbox_id=sandbox_id)
+        )
+        if (
+            meta.get("base")
+            and time.time() - float(meta.get("refreshed_at") or 0)
+            < settings.FILE_INDEX_REFRESH_INTERVAL_SECONDS
+        ):
+            return
+
+        lock_key = REDIS_KEY_FILE_INDEX_LOCK.format(sandbox_id=sandbox_id)
+        if not await redis.set(lock_key, "1", ex=INDEX_LOCK_SECONDS, nx=True):
+            return
+
+        try:
+            if meta.get("base") and meta.get("scanned_at"):
+                await self._update(
+                    redis, provider, sandbox_id, float(meta["scanned_at"])
+                )
+            else:
+                await self._rebuild(redis, provider, sandbox_id)
+        finally:
+            await redis.delete(lock_key)
+
+    async def _rebuild(
+        self, redis: "Redis[str]", provider: SandboxProvider, sandbox_id: str
+    ) -> None:
+        index_key = REDIS_KEY_FILE_INDEX.format(sandbox_id=sandbox_id)
+        journal_key = REDIS_KEY_FILE_INDEX_JOURNAL.format(sandbox_id=sandbox_id)
+
+        scan = await provider.scan_files(sandbox_id, [HOME_DIR])
+        entries = {item.path: _encode_entry(item) for item in scan.files if item.path}
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(index_key, journal_key)
+            if entries:
+                pipe.hset(index_key, mapping=entries)
+            pipe.xadd(journal_key, {"op": JOURNAL_RESET})
+            results = await pipe.execute()
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                REDIS_KEY_FILE_INDEX_META.format(sandbox_id=sandbox_id),
+                mapping={"base": results[-1]},
+            )
+            self._record_scan(pipe, sandbox_id, scan.scanned_at)
+            await pipe.execute()
+
+    async def _update(
+        self,
+        redis: "Redis[str]",
+        provider: SandboxProvider,
+        sandbox_id: str,
+        scanned_at: float,
+    ) -> None:
+        scan = await provider.scan_files(
+            sandbox_id, [HOME_DIR], changed_since=scanned_at
+        )
+        if not scan.complete:
+            # find without -newerct support.
+            await self._rebuild(redis, provider, sandbox_id)
+            return
+
+        if not scan.files:
+            async with redis.pipeline(transaction=True) as pipe:
+                self._record_scan(pipe, sandbox_id, scan.scanned_at)
+                await pipe.execute()
+            return
+
+        index: dict[str, str] = await redis.hgetall(
+            REDIS_KEY_FILE_INDEX.format(sandbox_id=sandbox_id)
+        )
+        current = {item.path: _encode_entry(item) for item in scan.files if item.path}
+
+        # Adding, removing or renaming an entry changes its parent directory,
+        # so re-listing the changed directories is enough to find deletions.
+        changed_dirs = {item.path for item in scan.files if item.type == "directory"}
+        if changed_dirs:
+            listing = await provider.scan_files(
+                sandbox_id,
+                [_sandbox_path(path) for path in changed_dirs],
+                min_depth=1,
+                max_depth=1,
+            )
+            current.update((item.path, _encode_entry(item)) for item in listing.files)
+
+        # Directories moved in from elsewhere keep their children's ctimes, so
+        # new directories are scanned in full.
+        new_dirs = [
+            path
+            for path, value in current.items()
+            if path not in index and _is_directory(value)
+        ]
+        if new_dirs:
+            subtree = await provider.scan_files(
+                sandbox_id, [_sandbox_path(path) for path in new_dirs], min_depth=1
+            )
+            current.update((item.path, _encode_entry(item)) for item in subtree.files)
+
+        deleted = [
+            path
+            for path in index
+            if posixpath.dirname(path) in changed_dirs and path not in current
+        ]
+        removed_prefixes = tuple(
+            f"{path}/" for path in deleted if _is_directory(index[path])
+        )
+        if removed_prefixes:
+            deleted.extend(
+                path
+                for path in index
+                if path.startswith(removed_prefixes) and path not in current
+            )
+
+        upserts = {
+            path: value for path, value in current.items() if index.get(path) != value
+        }
+        await self._apply(redis, sandbox_id, upserts, deleted, scan.scanned_at)
+
+    async def _apply(
+        self,
+        redis: "Redis[str]",
+        sandbox_id: str,
+        upserts: dict[str, str],
+        deleted: list[str],
+        scanned_at: float,
+    ) -> None:
+        index_key = REDIS_KEY_FILE_INDEX.format(sandbox_id=sandbox_id)
+        journal_key = REDIS_KEY_FILE_INDEX_JOURNAL.format(sandbox_id=sandbox_id)
+
+        async with redis.pipeline(transaction=True) as pipe:
+            if upserts:
+                pipe.hset(index_key, mapping=upserts)
+            if deleted:
+                pipe.hdel(index_key, *deleted)
+            for path, value in upserts.items():
+                pipe.xadd(
+                    journal_key,
+                    {"op": JOURNAL_UPSERT, "path": path, "file": value},
+                    maxlen=settings.FILE_INDEX_JOURNAL_MAX_LEN,
+                    approximate=True,
+                )
+            for path in deleted:
+                pipe.xadd(
+                    journal_key,
+                    {"op": JOURNAL_DELETE, "path": path},
+                    maxlen=settings.FILE_INDEX_JOURNAL_MAX_LEN,
+                    approximate=True,
+                )
+            self._record_scan(pipe, sandbox_id, scanned_at)
+            await pipe.execute()
+
+    @staticmethod
+    def _record_scan(pipe: "Pipeline", sandbox_id: str, scanned_at: float) -> None:
+        pipe.hset(
+            REDIS_KEY_FILE_INDEX_META.format(sandbox_id=sandbox_id),
+            mapping={"scanned_at": scanned_at, "refreshed_at": time.time()},
+        )
+        for template in (
+            REDIS_KEY_FILE_INDEX,
+            REDIS_KEY_FILE_INDEX_META,
+            REDIS_KEY_FILE_INDEX_JOURNAL,
+        ):
+            pipe.expire(
+                template.format(sandbox_id=sandbox_id), settings.FILE_INDEX_TTL_SECONDS
+            )
+
+
+file_tree_index = FileTreeIndex()
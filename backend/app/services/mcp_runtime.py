@@ -0,0 +1,106 @@
+import re
+from typing import Any
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+MCP_RUNTIME_ROOT = "/home/user/.cache/claudex-mcp"
+
+# `name` or `name@version-or-tag`; git, tarball, path and alias specs have no
+# installable name we can derive, so they keep going through plain npx.
+REGISTRY_SPEC_PATTERN = re.compile(
+    r"(@[A-Za-z0-9][\w.-]*/)?[A-Za-z0-9][\w.-]*(@[^\s:/@]+)?"
+)
+
+# Launches an npm-distributed MCP server from a per-sandbox install instead of
+# `npx -y`, which re-resolves the package against the registry on every start.
+# Each package spec gets its own npm prefix under $root; installs are staged in
+# timestamped directories and published by swapping the `current` symlink. A
+# server holds a shared lock on its stage's .claudex-bin for as long as it (or
+# anything it spawned) runs, and only stages nobody has locked are pruned, so
+# servers already running keep their files. A miss falls back to npx while the
+# install happens in the background, and unpinned specs are reinstalled in the
+# background once the last check is older than the refresh interval. A failed
+# install is stamped so misses don't retry it before the interval has passed.
+NPX_LAUNCHER_SCRIPT = r"""
+root=$1 refresh_interval=$2 spec=$3
+shift 3
+prefix="$root/$(printf '%s' "$spec" | tr -c 'A-Za-z0-9._-' '_')"
+current="$prefix/current"
+case $spec in
+  @*/*@*) name="@${spec#@}"; name="${name%@*}" ;;
+  @*) name=$spec ;;
+  *) name=${spec%%@*} ;;
+esac
+
+install() {
+  exec 9>"$prefix/lock"
+  flock -n 9 || return 0
+  touch "$prefix/checked"
+  for dir in "$prefix"/[0-9]*; do
+    [ -e "$dir/.claudex-bin" ] || rm -rf "$dir"
+  done
+  stage="$prefix/$(date +%s%N)"
+  npm install --prefix "$stage" --no-audit --no-fund --no-package-lock \
+    --loglevel=error -- "$spec" || { rm -rf "$stage"; return 1; }
+  node -e '
+    const [stage, name] = process.argv.slice(1);
+    const pkg = require(`${stage}/node_modules/${name}/package.json`);
+    const short = name.split("/").pop();
+    const bin = typeof pkg.bin === "string" ? { [short]: pkg.bin } : pkg.bin || {};
+    const names = Object.keys(bin);
+    const pick = names.length === 1 ? names[0] : names.find((n) => n === short);
+    if (!pick) process.exit(1);
+    process.stdout.write(`node_modules/.bin/${pick}`);
+  ' "$stage" "$name" > "$stage/.claudex-bin.tmp" || { rm -rf "$stage"; return 1; }
+  mv "$stage/.claudex-bin.tmp" "$stage/.claudex-bin"
+  ln -sfn "${stage##*/}" "$prefix/current.tmp" && mv -Tf "$prefix/current.tmp" "$current"
+  for dir in "$prefix"/[0-9]*; do
+    [ "$dir" = "$stage" ] || flock -xn "$dir/.claudex-bin" rm -rf "$dir"
+  done
+  rm -f "$prefix/failed"
+}
+
+stale() {
+  local stamp
+  stamp=$(stat -c %Y "$1" 2>/dev/null || echo 0)
+  [ $(( $(date +%s) - stamp )) -ge "$refresh_interval" ]
+}
+
+mkdir -p "$prefix"
+# The stage is checked again once locked, in case a prune removed it between
+# resolving `current` and taking the lock.
+if [ -f "$current/.claudex-bin" ] && live="$prefix/$(readlink "$current")" \
+  && exec 8<"$live/.claudex-bin" && flock -s 8 && [ -f "$live/.claudex-bin" ]; then
+  if ! [[ $spec =~ @[0-9]+\.[0-9]+\.[0-9]+([-+][0-9A-Za-z.-]+)?$ ]] \
+    && stale "$prefix/checked"; then
+    install </dev/null >/dev/null 2>&1 &
+  fi
+  exec "$live/$(cat "$live/.claudex-bin")" "$@"
+fi
+exec 8<&-
+if stale "$prefix/failed"; then
+  { install || touch "$prefix/failed"; } </dev/null >/dev/null 2>&1 &
+fi
+exec npx -y "$spec" "$@"
+"""
+
+
+def npx_server_command(package: str, args: list[str]) -> dict[str, Any]:
+    if not settings.MCP_RUNTIME_CACHE_ENABLED or not REGISTRY_SPEC_PATTERN.fullmatch(
+        package
+    ):
+        return {"command": "npx", "args": ["-y", package, *args]}
+    return {
+        "command": "bash",
+        "args": [
+            "-c",
+            NPX_LAUNCHER_SCRIPT,
+            "claudex-mcp",
+            MCP_RUNTIME_ROOT,
+            str(settings.MCP_RUNTIME_REFRESH_INTERVAL_SECONDS),
+            package,
+            *args,
+        ],
+    }
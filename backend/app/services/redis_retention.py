@@ -0,0 +1,163 @@
+import json
+import logging
+import re
+import time
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING, Any
+
+from app.constants import (
+    CELERY_QUEUES,
+    REDIS_KEY_CHAT_CHECKPOINTS,
+    REDIS_KEY_CHAT_CHECKPOINTS_LOCK,
+    REDIS_KEY_CHAT_REVOKED,
+    REDIS_KEY_CHAT_SNAPSHOT,
+    REDIS_KEY_CHAT_STATE,
+    REDIS_KEY_CHAT_STREAM,
+    REDIS_KEY_CHAT_TASK,
+    REDIS_KEY_CHECKPOINTS_PENDING,
+    REDIS_KEY_FILE_INDEX,
+    REDIS_KEY_FILE_INDEX_JOURNAL,
+    REDIS_KEY_FILE_INDEX_LOCK,
+    REDIS_KEY_FILE_INDEX_META,
+    REDIS_KEY_KEY_FAMILY_STATS,
+    REDIS_KEY_MODELS_LIST,
+    REDIS_KEY_PERMISSION_REQUEST,
+    REDIS_KEY_PERMISSION_RESPONSE,
+    REDIS_KEY_SANDBOX_ACTIVITY,
+    REDIS_KEY_SANDBOX_RESUME,
+    REDIS_KEY_TASK_CONTEXT,
+    REDIS_KEY_TASK_PROMPT,
+    REDIS_KEY_USER_ACTIVE_TURNS,
+    REDIS_KEY_USER_AUTH,
+    REDIS_KEY_USER_AUTH_EPOCH,
+    REDIS_KEY_USER_SETTINGS,
+)
+from app.core.config import get_settings
+from app.services.streaming.state import STREAM_STATE_STREAMING, is_heartbeat_fresh
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CELERY_RESULT_KEY_FAMILY = "celery-task-meta-{task_id}"
+OTHER_KEY_FAMILY = "other"
+
+# Families are named after their key templates; everything else the app or
+# Celery writes lands in "other".
+KEY_FAMILY_TEMPLATES = (
+    REDIS_KEY_CHAT_TASK,
+    REDIS_KEY_CHAT_STREAM,
+    REDIS_KEY_CHAT_REVOKED,
+    REDIS_KEY_CHAT_STATE,
+    REDIS_KEY_CHAT_SNAPSHOT,
+    REDIS_KEY_CHAT_CHECKPOINTS,
+    REDIS_KEY_CHAT_CHECKPOINTS_LOCK,
+    REDIS_KEY_CHECKPOINTS_PENDING,
+    REDIS_KEY_PERMISSION_REQUEST,
+    REDIS_KEY_PERMISSION_RESPONSE,
+    REDIS_KEY_USER_SETTINGS,
+    REDIS_KEY_USER_AUTH,
+    REDIS_KEY_USER_AUTH_EPOCH,
+    REDIS_KEY_MODELS_LIST,
+    REDIS_KEY_TASK_CONTEXT,
+    REDIS_KEY_TASK_PROMPT,
+    REDIS_KEY_USER_ACTIVE_TURNS,
+    REDIS_KEY_SANDBOX_ACTIVITY,
+    REDIS_KEY_SANDBOX_RESUME,
+    REDIS_KEY_FILE_INDEX,
+    REDIS_KEY_FILE_INDEX_META,
+    REDIS_KEY_FILE_INDEX_JOURNAL,
+    REDIS_KEY_FILE_INDEX_LOCK,
+    CELERY_RESULT_KEY_FAMILY,
+    *CELERY_QUEUES,
+)
+
+SCAN_BATCH_SIZE = 1000
+
+
+def _template_pattern(template: str) -> re.Pattern[str]:
+    parts = re.split(r"\{[^}]+\}", template)
+    return re.compile("[^:]+".join(re.escape(part) for part in parts))
+
+
+KEY_FAMILY_PATTERNS = [
+    (template, _template_pattern(template)) for template in KEY_FAMILY_TEMPLATES
+]
+CHAT_STREAM_PATTERN = _template_pattern(REDIS_KEY_CHAT_STREAM)
+
+
+def key_family(key: str) -> str:
+    for family, pattern in KEY_FAMILY_PATTERNS:
+        if pattern.fullmatch(key):
+            return family
+    return OTHER_KEY_FAMILY
+
+
+class RedisRetentionManager:
+    # Chat streams and their auxiliary keys only matter while a turn is live
+    # and for a short reconnect window after it. Finished turns get a TTL of
+    # CHAT_STREAM_RETENTION_SECONDS; the periodic sweep catches streams whose
+    # worker never got to clean up and records memory use per key family.
+    async def expire_chat_keys(self, redis: "Redis[str]", chat_id: str) -> None:
+        async with redis.pipeline(transaction=False) as pipe:
+            for template in (
+                REDIS_KEY_CHAT_STREAM,
+                REDIS_KEY_CHAT_SNAPSHOT,
+                REDIS_KEY_CHAT_STATE,
+            ):
+                pipe.expire(
+                    template.format(chat_id=chat_id),
+                    settings.CHAT_STREAM_RETENTION_SECONDS,
+                )
+            await pipe.execute()
+
+    async def sweep(self, redis: "Redis[str]") -> dict[str, Any]:
+        families: dict[str, dict[str, int]] = {}
+        expired = 0
+
+        async for batch in self._scan_batches(redis):
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in batch:
+                    pipe.memory_usage(key)
+                    pipe.ttl(key)
+                results = await pipe.execute()
+
+            for index, key in enumerate(batch):
+                size, ttl = results[index * 2], results[index * 2 + 1]
+                family = families.setdefault(key_family(key), {"keys": 0, "bytes": 0})
+                family["keys"] += 1
+                family["bytes"] += size or 0
+
+                if ttl == -1 and CHAT_STREAM_PATTERN.fullmatch(key):
+                    if await self._expire_orphaned_stream(redis, key):
+                        expired += 1
+
+        await redis.set(
+            REDIS_KEY_KEY_FAMILY_STATS,
+            json.dumps({"updated_at": time.time(), "families": families}),
+        )
+        return {"families": len(families), "expired_streams": expired}
+
+    async def _scan_batches(self, redis: "Redis[str]") -> AsyncIterator[list[str]]:
+        cursor = 0
+        while True:
+            cursor, keys = await redis.scan(cursor, count=SCAN_BATCH_SIZE)
+            if keys:
+                yield keys
+            if cursor == 0:
+                return
+
+    async def _expire_orphaned_stream(self, redis: "Redis[str]", key: str) -> bool:
+        # Streams without a TTL belong to a running turn, or to one whose
+        # worker died before cleanup. Only the former keeps a fresh heartbeat.
+        chat_id = key.split(":")[1]
+        state = await redis.hgetall(REDIS_KEY_CHAT_STATE.format(chat_id=chat_id))
+        if state.get("status") == STREAM_STATE_STREAMING and is_heartbeat_fresh(state):
+            return False
+        await self.expire_chat_keys(redis, chat_id)
+        return True
+
+
+redis_retention = RedisRetentionManager()
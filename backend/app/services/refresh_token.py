@@ -10,6 +10,7 @@ from app.core.security import (
     get_refresh_token_expiry,
     hash_refresh_token,
 )
+from app.core.user_cache import user_auth_cache
 from app.db.session import SessionLocal
 from app.models.db_models import RefreshToken, User
 from app.services.base import SessionFactoryType
@@ -72,6 +73,7 @@ class RefreshTokenService:
             # Revoked token reuse = potential theft; revoke all tokens for this user
             await self._revoke_all_tokens(refresh_token.user_id, db)
             await db.commit()
+            await user_auth_cache.invalidate(refresh_token.user_id)
             raise AuthException("Invalid or expired refresh token")
 
         if refresh_token.is_expired:
@@ -126,6 +128,7 @@ class RefreshTokenService:
 
         refresh_token.revoked_at = datetime.now(timezone.utc)
         await db.commit()
+        await user_auth_cache.invalidate(refresh_token.user_id)
 
         return True
 
@@ -146,6 +149,7 @@ class RefreshTokenService:
     async def revoke_all_user_tokens(self, user_id: UUID, db: AsyncSession) -> int:
         count = await self._revoke_all_tokens(user_id, db)
         await db.commit()
+        await user_auth_cache.invalidate(user_id)
         return count
 
     async def cleanup_expired_tokens(self, db: AsyncSession | None = None) -> int:
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.core.config import get_settings
+from app.models.types import EnabledResourceInfo
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = "1"
+BUNDLE_HASH_LENGTH = 32
+BUNDLE_RETENTION_SECONDS = 3600
+
+FILE_DIGEST_CACHE_SIZE = 4096
+
+# path -> (size, mtime_ns, sha256 hex digest), least recently used first.
+# Resource files are only ever replaced wholesale, so a stat change is enough
+# to invalidate an entry; bundles are built in worker threads, hence the lock.
+_file_digests: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+_file_digests_lock = threading.Lock()
+
+
+def _cached_file_digest(path: Path, stat: os.stat_result) -> str | None:
+    with _file_digests_lock:
+        cached = _file_digests.get(str(path))
+        if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+            return None
+        _file_digests.move_to_end(str(path))
+        return cached[2]
+
+
+def _store_file_digest(path: Path, stat: os.stat_result, sha256: str) -> None:
+    with _file_digests_lock:
+        _file_digests[str(path)] = (stat.st_size, stat.st_mtime_ns, sha256)
+        _file_digests.move_to_end(str(path))
+        if len(_file_digests) > FILE_DIGEST_CACHE_SIZE:
+            _file_digests.popitem(last=False)
+
+
+def remember_file_digest(path: Path, sha256: str) -> None:
+    # Lets callers that already hashed a file while writing it (uploads) spare
+    # the next bundle build from reading it again.
+    _store_file_digest(path, path.stat(), sha256)
+
+
+@dataclass
+class ResourceBundle:
+    path: Path
+    content_hash: str
+    resource_count: int
+
+
+class ResourceBundleService:
+    def __init__(self) -> None:
+        self.bundles_path = Path(settings.STORAGE_PATH) / "resource_bundles"
+
+    async def get_or_build(
+        self,
+        user_id: str,
+        skills: list[EnabledResourceInfo],
+        commands: list[EnabledResourceInfo],
+        agents: list[EnabledResourceInfo],
+    ) -> ResourceBundle | None:
+        return await asyncio.to_thread(
+            self._get_or_build, user_id, skills, commands, agents
+        )
+
+    def _get_or_build(
+        self,
+        user_id: str,
+        skills: list[EnabledResourceInfo],
+        commands: list[EnabledResourceInfo],
+        agents: list[EnabledResourceInfo],
+    ) -> ResourceBundle | None:
+        # Each entry maps a local source to its location under the home
+        # directory in the sandbox; skill zips are expanded into a directory.
+        entries: list[tuple[str, Path, bool]] = []
+        for skill in skills:
+            entries.append(
+                (f".claude/skills/{skill['name']}", Path(skill["path"]), True)
+            )
+        for command in commands:
+            entries.append(
+                (f".claude/commands/{command['name']}.md", Path(command["path"]), False)
+            )
+        for agent in agents:
+            entries.append(
+                (f".claude/agents/{agent['name']}.md", Path(agent["path"]), False)
+            )
+
+        digest = hashlib.sha256(BUNDLE_FORMAT_VERSION.encode())
+        available: list[tuple[str, Path, bool]] = []
+        for arcname, local_path, is_archive in sorted(entries):
+            try:
+                file_digest = self._file_digest(local_path)
+            except FileNotFoundError:
+                logger.warning("Resource not found: %s at %s", arcname, local_path)
+                continue
+            digest.update(f"{arcname}\0{file_digest}\n".encode())
+            available.append((arcname, local_path, is_archive))
+
+        if not available:
+            return None
+
+        content_hash = digest.hexdigest()[:BUNDLE_HASH_LENGTH]
+        user_path = self.bundles_path / user_id
+        bundle_path = user_path / f"{content_hash}.zip"
+
+        if not bundle_path.exists():
+            user_path.mkdir(parents=True, exist_ok=True)
+            self._build_bundle(bundle_path, available)
+            self._prune_bundles(user_path, keep=bundle_path)
+            logger.info(
+                "Built resource bundle %s for user %s (%d resources)",
+                content_hash,
+                user_id,
+                len(available),
+            )
+
+        return ResourceBundle(
+            path=bundle_path,
+            content_hash=content_hash,
+            resource_count=len(available),
+        )
+
+    @staticmethod
+    def _file_digest(path: Path) -> str:
+        stat = path.stat()
+        cached = _cached_file_digest(path, stat)
+        if cached:
+            return cached
+
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                file_hash.update(chunk)
+        digest = file_hash.hexdigest()
+        _store_file_digest(path, stat, digest)
+        return digest
+
+    @staticmethod
+    def _build_bundle(bundle_path: Path, entries: list[tuple[str, Path, bool]]) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=bundle_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zf:
+                    for arcname, local_path, is_archive in entries:
+                        if not is_archive:
+                            zf.write(local_path, arcname)
+                            continue
+                        with zipfile.ZipFile(local_path, "r") as source_zip:
+                            for info in source_zip.infolist():
+                                if info.is_dir():
+                                    continue
+                                with (
+                                    source_zip.open(info) as src,
+                                    zf.open(f"{arcname}/{info.filename}", "w") as dst,
+                                ):
+                                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(temp_path, bundle_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _prune_bundles(user_path: Path, keep: Path) -> None:
+        # Superseded bundles get a grace period so an initialization that
+        # resolved one just before the user changed resources can still read it.
+        cutoff = time.time() - BUNDLE_RETENTION_SECONDS
+        for bundle in user_path.glob("*.zip"):
+            if bundle != keep and bundle.stat().st_mtime < cutoff:
+                bundle.unlink(missing_ok=True)
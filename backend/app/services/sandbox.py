@@ -6,28 +6,37 @@ import logging
 import shlex
 import uuid
 import zipfile
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any, Callable, Coroutine
 
 from fastapi import WebSocket
 
 from app.constants import PTY_OUTPUT_QUEUE_SIZE
+from app.core.config import get_settings
 from app.models.types import (
     CustomAgentDict,
     CustomEnvVarDict,
     CustomSkillDict,
     CustomSlashCommandDict,
+    JSONValue,
 )
 from app.services.agent import AgentService
 from app.services.command import CommandService
 from app.services.exceptions import SandboxException
+from app.services.file_index import file_tree_index
+from app.services.resource_bundle import ResourceBundleService
+from app.services.sandbox_lifecycle import sandbox_lifecycle
 from app.services.sandbox_providers import (
+    CheckpointDiff,
     PtySize,
     SandboxProvider,
 )
 from app.services.skill import SkillService
+from app.utils.http_cache import file_etag
 from app.utils.queue import drain_queue, put_with_overflow
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 OPENVSCODE_PORT = 8765
@@ -43,6 +52,48 @@ OPENVSCODE_DEFAULT_SETTINGS: dict[str, object] = {
     "editor.wordWrap": "on",
     "telemetry.telemetryLevel": "off",
 }
+RESOURCE_BUNDLE_MARKER_PATH = "/home/user/.claude/.resource-bundle"
+SESSION_TRANSCRIPT_PATH = "/home/user/.claude/projects/-home-user/{session_id}.jsonl"
+SESSION_SANITIZE_MARKER_DIR = "/home/user/.claude/.sanitized"
+SESSION_SANITIZE_CHECK_BYTES = 4096
+
+# Expects $f (session file), $m (marker), $tmp, $filter (jq) and $window.
+# The marker holds the size of the file after the last pass plus a hash of the
+# first and last `window` bytes up to that offset. Session files are append-only
+# while the CLI runs, so if both still match only the lines appended since need
+# filtering; anything else (compaction, manual edits) falls back to a full
+# rewrite. A failed incremental pass drops the marker so the next one is full.
+SESSION_SANITIZE_SCRIPT = r"""
+[ -f "$f" ] || exit 0
+prefix_hash() {
+  start=$(( $1 > window ? $1 - window : 0 ))
+  { head -c $(( $1 < window ? $1 : window )) "$f"
+    tail -c +$((start + 1)) "$f" | head -c $(($1 - start)); } | sha256sum | cut -d' ' -f1
+}
+size=$(stat -c %s "$f")
+offset=0
+if [ -f "$m" ]; then
+  read -r offset checksum < "$m"
+  case "$offset" in ''|*[!0-9]*) offset=0 ;; esac
+  if [ "$offset" -gt "$size" ] || [ "$(prefix_hash "$offset")" != "$checksum" ]; then
+    offset=0
+  fi
+fi
+if [ "$offset" -eq 0 ]; then
+  mode=full
+  jq -c "$filter" "$f" > "$tmp" && mv "$tmp" "$f" || { rm -f "$tmp"; exit 1; }
+elif [ "$offset" -lt "$size" ]; then
+  mode=incremental
+  tail -c +$((offset + 1)) "$f" | jq -c "$filter" > "$tmp" || { rm -f "$tmp" "$m"; exit 1; }
+  truncate -s "$offset" "$f" && cat "$tmp" >> "$f" && rm -f "$tmp" || { rm -f "$m"; exit 1; }
+else
+  mode=unchanged
+fi
+size=$(stat -c %s "$f")
+mkdir -p "$(dirname "$m")"
+printf '%s %s\n' "$size" "$(prefix_hash "$size")" > "$m"
+echo "OK $mode"
+"""
 
 
 class SandboxService:
@@ -84,9 +135,14 @@ class SandboxService:
             return
         asyncio.create_task(self._delete_sandbox_deferred(sandbox_id))
 
+    async def destroy_sandbox(self, sandbox_id: str) -> None:
+        await self.provider.delete_sandbox(sandbox_id)
+        await sandbox_lifecycle.forget(sandbox_id)
+        await file_tree_index.forget(sandbox_id)
+
     async def _delete_sandbox_deferred(self, sandbox_id: str) -> None:
         try:
-            await self.provider.delete_sandbox(sandbox_id)
+            await self.destroy_sandbox(sandbox_id)
         except Exception as e:
             logger.warning(
                 "Failed to delete sandbox %s: %s",
@@ -97,6 +153,7 @@ class SandboxService:
             )
 
     async def get_or_connect_sandbox(self, sandbox_id: str) -> bool:
+        await sandbox_lifecycle.record_activity(sandbox_id)
         return await self.provider.connect_sandbox(sandbox_id)
 
     async def execute_command(
@@ -105,6 +162,7 @@ class SandboxService:
         command: str,
         background: bool = False,
     ) -> str:
+        await sandbox_lifecycle.record_activity(sandbox_id)
         secrets = await self.provider.get_secrets(sandbox_id)
         envs = {s.key: s.value for s in secrets}
 
@@ -117,19 +175,36 @@ class SandboxService:
 
         return result.stdout + result.stderr
 
-    async def write_file(self, sandbox_id: str, file_path: str, content: str) -> None:
+    async def write_file(
+        self, sandbox_id: str, file_path: str, content: str | bytes
+    ) -> None:
+        await sandbox_lifecycle.record_activity(sandbox_id)
         await self.provider.write_file(sandbox_id, file_path, content)
+        await file_tree_index.mark_stale(sandbox_id)
+
+    async def write_files(self, sandbox_id: str, files: dict[str, str | bytes]) -> None:
+        await sandbox_lifecycle.record_activity(sandbox_id)
+        await self.provider.write_files(sandbox_id, files)
+        await file_tree_index.mark_stale(sandbox_id)
+
+    async def upload_files(self, sandbox_id: str, files: dict[str, Path]) -> None:
+        await sandbox_lifecycle.record_activity(sandbox_id)
+        await self.provider.upload_files(sandbox_id, files)
+        await file_tree_index.mark_stale(sandbox_id)
 
     async def get_preview_links(self, sandbox_id: str) -> list[dict[str, str | int]]:
+        await sandbox_lifecycle.record_activity(sandbox_id)
         links = await self.provider.get_preview_links(sandbox_id)
         return [{"preview_url": link.preview_url, "port": link.port} for link in links]
 
     async def get_ide_url(self, sandbox_id: str) -> str | None:
+        await sandbox_lifecycle.record_activity(sandbox_id)
         return await self.provider.get_ide_url(sandbox_id)
 
     async def create_pty_session(
         self, sandbox_id: str, rows: int = 24, cols: int = 80
     ) -> dict[str, Any]:
+        await sandbox_lifecycle.record_activity(sandbox_id, force=True)
         output_queue: "asyncio.Queue[str]" = asyncio.Queue(
             maxsize=PTY_OUTPUT_QUEUE_SIZE
         )
@@ -160,6 +235,7 @@ class SandboxService:
             return
 
         data_bytes = data.encode() if isinstance(data, str) else data
+        await sandbox_lifecycle.record_activity(sandbox_id)
 
         try:
             await self.provider.send_pty_input(sandbox_id, pty_session_id, data_bytes)
@@ -232,20 +308,38 @@ class SandboxService:
                 exc_info=True,
             )
 
-    async def get_files_metadata(self, sandbox_id: str) -> list[dict[str, Any]]:
-        metadata = await self.provider.list_files(sandbox_id)
-        return [
-            {
-                "path": m.path,
-                "type": m.type,
-                "size": m.size,
-                "modified": m.modified,
-                "is_binary": m.is_binary,
-            }
-            for m in metadata
-        ]
+    async def get_files_metadata(
+        self, sandbox_id: str, since: str | None = None
+    ) -> dict[str, Any]:
+        await sandbox_lifecycle.record_activity(sandbox_id)
+        return await file_tree_index.get_files(self.provider, sandbox_id, since)
+
+    async def stat_file(self, sandbox_id: str, file_path: str) -> dict[str, Any]:
+        await sandbox_lifecycle.record_activity(sandbox_id)
+        try:
+            stat = await self.provider.stat_file(sandbox_id, file_path)
+        except Exception as e:
+            raise SandboxException(f"Failed to stat file {file_path}: {str(e)}")
+        if stat.type != "file":
+            raise SandboxException(f"Not a regular file: {file_path}")
+        return {
+            "path": stat.path,
+            "size": stat.size,
+            "modified": stat.modified,
+            "is_binary": stat.is_binary,
+            "etag": file_etag(stat.inode, stat.size, stat.modified),
+        }
 
-    async def get_file_content(self, sandbox_id: str, file_path: str) -> dict[str, Any]:
+    async def get_file_content(
+        self,
+        sandbox_id: str,
+        file_path: str,
+        offset: int | None = None,
+        length: int | None = None,
+    ) -> dict[str, Any]:
+        await sandbox_lifecycle.record_activity(sandbox_id)
+        if offset is not None or length is not None:
+            return await self._get_file_range(sandbox_id, file_path, offset, length)
         try:
             content = await self.provider.read_file(sandbox_id, file_path)
             return {
@@ -257,6 +351,58 @@ class SandboxService:
         except Exception as e:
             raise SandboxException(f"Failed to read file {file_path}: {str(e)}")
 
+    async def _get_file_range(
+        self,
+        sandbox_id: str,
+        file_path: str,
+        offset: int | None,
+        length: int | None,
+    ) -> dict[str, Any]:
+        stat = await self.stat_file(sandbox_id, file_path)
+        offset = min(offset or 0, stat["size"])
+        length = min(
+            length or settings.SANDBOX_FILE_READ_CHUNK_BYTES,
+            settings.SANDBOX_FILE_READ_CHUNK_BYTES,
+            stat["size"] - offset,
+        )
+        try:
+            data = (
+                await self.provider.read_file_range(
+                    sandbox_id, file_path, offset, length
+                )
+                if length > 0
+                else b""
+            )
+        except Exception as e:
+            raise SandboxException(f"Failed to read file {file_path}: {str(e)}")
+
+        return {
+            "path": file_path,
+            "content": base64.b64encode(data).decode("utf-8")
+            if stat["is_binary"]
+            else data.decode("utf-8", errors="replace"),
+            "type": "file",
+            "is_binary": stat["is_binary"],
+            "offset": offset,
+            "size": stat["size"],
+        }
+
+    async def iter_file_range(
+        self, sandbox_id: str, file_path: str, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        # Streams the inclusive byte range in bounded chunks so large files
+        # never have to fit in memory.
+        position = start
+        while position <= end:
+            length = min(settings.SANDBOX_FILE_READ_CHUNK_BYTES, end - position + 1)
+            chunk = await self.provider.read_file_range(
+                sandbox_id, file_path, position, length
+            )
+            if not chunk:
+                return
+            yield chunk
+            position += len(chunk)
+
     async def add_secret(
         self,
         sandbox_id: str,
@@ -339,86 +485,46 @@ class SandboxService:
         if not enabled_skills and not enabled_commands and not enabled_agents:
             return
 
-        zip_buffer = io.BytesIO()
-        has_content = False
-
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for skill in enabled_skills:
-                skill_name = skill["name"]
-                local_zip_path = Path(skill["path"])
-
-                if not local_zip_path.exists():
-                    logger.warning(
-                        "Skill ZIP not found: %s at %s", skill_name, local_zip_path
-                    )
-                    continue
-
-                with zipfile.ZipFile(local_zip_path, "r") as skill_zip:
-                    for item in skill_zip.namelist():
-                        content = skill_zip.read(item)
-                        zf.writestr(f".claude/skills/{skill_name}/{item}", content)
-                        has_content = True
-
-            for command in enabled_commands:
-                command_name = command["name"]
-                local_path = Path(command["path"])
-
-                if not local_path.exists():
-                    logger.warning(
-                        "Command not found: %s at %s", command_name, local_path
-                    )
-                    continue
-
-                command_content = local_path.read_text(encoding="utf-8")
-                zf.writestr(f".claude/commands/{command_name}.md", command_content)
-                has_content = True
-
-            for agent in enabled_agents:
-                agent_name = agent["name"]
-                local_path = Path(agent["path"])
-
-                if not local_path.exists():
-                    logger.warning("Agent not found: %s at %s", agent_name, local_path)
-                    continue
-
-                agent_content = local_path.read_text(encoding="utf-8")
-                zf.writestr(f".claude/agents/{agent_name}.md", agent_content)
-                has_content = True
-
-        if not has_content:
+        bundle = await ResourceBundleService().get_or_build(
+            user_id, enabled_skills, enabled_commands, enabled_agents
+        )
+        if not bundle:
             return
 
-        zip_buffer.seek(0)
-        zip_content = zip_buffer.getvalue()
-        encoded_content = base64.b64encode(zip_content).decode("utf-8")
+        marker_result = await self.execute_command(
+            sandbox_id, f"cat {RESOURCE_BUNDLE_MARKER_PATH} 2>/dev/null || true"
+        )
+        if marker_result.strip() == bundle.content_hash:
+            logger.info(
+                "Resource bundle %s already present in sandbox %s",
+                bundle.content_hash,
+                sandbox_id,
+            )
+            return
 
-        remote_zip_path = f"/home/user/_resources_{uuid.uuid4().hex[:8]}.zip"
-        temp_b64_path = f"{remote_zip_path}.b64tmp"
+        remote_zip_path = f"/home/user/_resources_{bundle.content_hash}.zip"
 
         try:
-            await self.write_file(sandbox_id, temp_b64_path, encoded_content)
-            decode_and_extract_cmd = (
-                f"base64 -d {shlex.quote(temp_b64_path)} > {shlex.quote(remote_zip_path)} && "
+            await self.upload_files(sandbox_id, {remote_zip_path: bundle.path})
+            extract_cmd = (
                 f"unzip -q -o {shlex.quote(remote_zip_path)} -d /home/user && "
-                f"rm -f {shlex.quote(remote_zip_path)} {shlex.quote(temp_b64_path)}"
+                f"rm -f {shlex.quote(remote_zip_path)} && "
+                f"printf '%s' {shlex.quote(bundle.content_hash)} > {RESOURCE_BUNDLE_MARKER_PATH}"
             )
-            await self.execute_command(sandbox_id, decode_and_extract_cmd)
+            await self.execute_command(sandbox_id, extract_cmd)
 
-            resource_count = (
-                len(enabled_skills) + len(enabled_commands) + len(enabled_agents)
-            )
             logger.info(
-                "Copied %d resources to sandbox %s in single upload",
-                resource_count,
+                "Copied %d resources to sandbox %s from bundle %s",
+                bundle.resource_count,
                 sandbox_id,
+                bundle.content_hash,
             )
         except Exception as e:
             logger.error("Failed to copy resources to sandbox %s: %s", sandbox_id, e)
-            cleanup_cmd = (
-                f"rm -f {shlex.quote(remote_zip_path)} {shlex.quote(temp_b64_path)}"
-            )
             try:
-                await self.execute_command(sandbox_id, cleanup_cmd)
+                await self.execute_command(
+                    sandbox_id, f"rm -f {shlex.quote(remote_zip_path)}"
+                )
             except Exception:
                 pass
             raise SandboxException(f"Failed to copy resources to sandbox: {e}") from e
@@ -533,6 +639,16 @@ class SandboxService:
         self._validate_message_id(message_id)
         return await self.provider.restore_checkpoint(sandbox_id, message_id)
 
+    async def diff_checkpoint(
+        self, sandbox_id: str, message_id: str, base_message_id: str | None = None
+    ) -> CheckpointDiff:
+        self._validate_message_id(message_id)
+        if base_message_id:
+            self._validate_message_id(base_message_id)
+        return await self.provider.diff_checkpoint(
+            sandbox_id, message_id, base_message_id
+        )
+
     async def list_checkpoints(self, sandbox_id: str) -> list[dict[str, Any]]:
         checkpoints = await self.provider.list_checkpoints(sandbox_id)
         return [
@@ -543,6 +659,36 @@ class SandboxService:
     async def restore_to_message(self, sandbox_id: str, message_id: str) -> bool:
         return await self.restore_checkpoint(sandbox_id, message_id)
 
+    async def get_tool_result(
+        self, sandbox_id: str, session_id: str, tool_use_id: str
+    ) -> JSONValue | None:
+        # Stream events carry tool results cut to TOOL_RESULT_MAX_CHARS; the
+        # full result is the tool_result block the CLI wrote to the session
+        # transcript. The transcript is compact JSON, so a fixed-string grep
+        # finds the entry without reading the whole file back.
+        needle = json.dumps({"tool_use_id": tool_use_id}, separators=(",", ":"))
+        output = await self.execute_command(
+            sandbox_id,
+            f"grep -F -m1 -- {shlex.quote(needle[1:-1])} "
+            f"{shlex.quote(SESSION_TRANSCRIPT_PATH.format(session_id=session_id))}",
+        )
+        for line in output.splitlines():
+            try:
+                content = json.loads(line)["message"]["content"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if not isinstance(content, list):
+                continue
+            for block in content:
+                if (
+                    isinstance(block, dict)
+                    and block.get("type") == "tool_result"
+                    and block.get("tool_use_id") == tool_use_id
+                ):
+                    result: JSONValue = block.get("content")
+                    return result
+        return None
+
     async def _enqueue_pty_output(
         self, data: bytes, output_queue: "asyncio.Queue[str]"
     ) -> None:
@@ -564,7 +710,8 @@ class SandboxService:
     async def clean_session_thinking_blocks(
         self, sandbox_id: str, session_id: str
     ) -> bool:
-        session_file = f"/home/user/.claude/projects/-home-user/{session_id}.jsonl"
+        session_file = SESSION_TRANSCRIPT_PATH.format(session_id=session_id)
+        marker_file = f"{SESSION_SANITIZE_MARKER_DIR}/{session_id}"
         temp_file = f"{session_file}.tmp"
 
         jq_filter = (
@@ -575,14 +722,18 @@ class SandboxService:
 
         try:
             cmd = (
-                f"[ -f {shlex.quote(session_file)} ] && "
-                f"jq -c '{jq_filter}' {shlex.quote(session_file)} > {shlex.quote(temp_file)} && "
-                f"mv {shlex.quote(temp_file)} {shlex.quote(session_file)} && echo 'OK'"
+                f"f={shlex.quote(session_file)} m={shlex.quote(marker_file)} "
+                f"tmp={shlex.quote(temp_file)} filter={shlex.quote(jq_filter)} "
+                f"window={SESSION_SANITIZE_CHECK_BYTES}\n{SESSION_SANITIZE_SCRIPT}"
             )
             result = await self.execute_command(sandbox_id, cmd)
 
             if "OK" in result:
-                logger.info("Cleaned thinking blocks from session %s", session_id)
+                logger.info(
+                    "Cleaned thinking blocks from session %s (%s)",
+                    session_id,
+                    result.strip().removeprefix("OK "),
+                )
                 return True
 
             return False
@@ -0,0 +1,90 @@
+import logging
+import time
+from collections import OrderedDict
+
+from app.constants import REDIS_KEY_SANDBOX_ACTIVITY, REDIS_KEY_SANDBOX_RESUME
+from app.core.config import get_settings
+from app.utils.redis import redis_connection
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class SandboxLifecycleManager:
+    # Activity is tracked in a single sorted set (sandbox_id -> last activity
+    # timestamp) so the reaper can fetch every idle sandbox with one range query.
+    # Writes are throttled per process: terminals and polling endpoints touch the
+    # sandbox far more often than the idle threshold needs. The throttle map is
+    # kept in write order so entries past the interval, which no longer
+    # throttle anything, can be dropped from the front.
+    def __init__(self) -> None:
+        self._last_recorded: OrderedDict[str, float] = OrderedDict()
+
+    async def record_activity(self, sandbox_id: str, force: bool = False) -> None:
+        if not sandbox_id:
+            return
+
+        now = time.time()
+        last_recorded = self._last_recorded.get(sandbox_id, 0.0)
+        if (
+            not force
+            and now - last_recorded < settings.SANDBOX_ACTIVITY_WRITE_INTERVAL_SECONDS
+        ):
+            return
+
+        self._last_recorded[sandbox_id] = now
+        self._last_recorded.move_to_end(sandbox_id)
+        self._prune_throttle(now)
+        try:
+            async with redis_connection() as redis:
+                await redis.zadd(REDIS_KEY_SANDBOX_ACTIVITY, {sandbox_id: now})
+        except Exception as e:
+            logger.warning(
+                "Failed to record activity for sandbox %s: %s", sandbox_id, e
+            )
+
+    def _prune_throttle(self, now: float) -> None:
+        interval = settings.SANDBOX_ACTIVITY_WRITE_INTERVAL_SECONDS
+        while self._last_recorded:
+            oldest = next(iter(self._last_recorded.values()))
+            if now - oldest < interval:
+                return
+            self._last_recorded.popitem(last=False)
+
+    async def claim_resume(self, sandbox_id: str) -> bool:
+        # Only the first caller within the dedup window resumes the sandbox;
+        # paginated message fetches would otherwise each trigger a reconnect.
+        try:
+            async with redis_connection() as redis:
+                claimed = await redis.set(
+                    REDIS_KEY_SANDBOX_RESUME.format(sandbox_id=sandbox_id),
+                    "1",
+                    ex=settings.SANDBOX_RESUME_DEDUP_SECONDS,
+                    nx=True,
+                )
+                return bool(claimed)
+        except Exception as e:
+            logger.warning("Failed to claim resume for sandbox %s: %s", sandbox_id, e)
+            return True
+
+    async def get_idle_sandboxes(self, idle_seconds: int) -> list[str]:
+        cutoff = time.time() - idle_seconds
+        async with redis_connection() as redis:
+            sandbox_ids: list[str] = await redis.zrangebyscore(
+                REDIS_KEY_SANDBOX_ACTIVITY, "-inf", cutoff
+            )
+        return sandbox_ids
+
+    async def forget(self, sandbox_id: str) -> None:
+        self._last_recorded.pop(sandbox_id, None)
+        try:
+            async with redis_connection() as redis:
+                await redis.zrem(REDIS_KEY_SANDBOX_ACTIVITY, sandbox_id)
+                await redis.delete(
+                    REDIS_KEY_SANDBOX_RESUME.format(sandbox_id=sandbox_id)
+                )
+        except Exception as e:
+            logger.warning("Failed to clear activity for sandbox %s: %s", sandbox_id, e)
+
+
+sandbox_lifecycle = SandboxLifecycleManager()
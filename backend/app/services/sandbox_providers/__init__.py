@@ -4,11 +4,14 @@ from app.services.sandbox_providers.factory import (
     create_sandbox_provider,
 )
 from app.services.sandbox_providers.types import (
+    CheckpointDiff,
     CheckpointInfo,
     CommandResult,
     DockerConfig,
     FileContent,
     FileMetadata,
+    FileScan,
+    FileStat,
     PreviewLink,
     PtyDataCallbackType,
     PtySession,
@@ -25,10 +28,13 @@ __all__ = [
     "SandboxProviderType",
     "CommandResult",
     "FileMetadata",
+    "FileScan",
+    "FileStat",
     "FileContent",
     "PtySession",
     "PtySize",
     "CheckpointInfo",
+    "CheckpointDiff",
     "PreviewLink",
     "SecretEntry",
     "DockerConfig",
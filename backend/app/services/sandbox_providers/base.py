@@ -17,11 +17,15 @@ from app.constants import (
     SANDBOX_RESTORE_EXCLUDE_PATTERNS,
     SANDBOX_SYSTEM_VARIABLES,
 )
+from app.services.exceptions import SandboxException
 from app.services.sandbox_providers.types import (
+    CheckpointDiff,
     CheckpointInfo,
     CommandResult,
     FileContent,
     FileMetadata,
+    FileScan,
+    FileStat,
     PreviewLink,
     PtyDataCallbackType,
     PtySession,
@@ -33,6 +37,14 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
+CHECKPOINT_WORKSPACE_DIR = "/home/user"
+# rsync's 11-character change summary followed by the path, one per item.
+CHECKPOINT_ITEMIZE_FORMAT = "%i %n"
+CHECKPOINT_ITEMIZE_WIDTH = 11
+
+# Printed once find has accepted the scan's tests, before the walk starts.
+FILE_SCAN_READY_MARKER = "scan-ready"
+
 LISTENING_PORTS_COMMAND = "ss -tuln | grep LISTEN | awk '{print $5}' | sed 's/.*://g' | grep -E '^[0-9]+$' | sort -u"
 
 
@@ -106,6 +118,53 @@ class SandboxProvider(ABC):
             return None
         return f"{CHECKPOINT_BASE_DIR}/{checkpoints[0].message_id}"
 
+    async def _require_checkpoint_dir(self, sandbox_id: str, checkpoint_id: str) -> str:
+        checkpoint_dir = f"{CHECKPOINT_BASE_DIR}/{checkpoint_id}"
+        check_result = await self.execute_command(
+            sandbox_id, f'[ -d {shlex.quote(checkpoint_dir)} ] && echo "1" || echo "0"'
+        )
+        if check_result.stdout.strip() != "1":
+            raise FileNotFoundError(f"Checkpoint {checkpoint_id} not found")
+        return checkpoint_dir
+
+    @staticmethod
+    def _checkpoint_rsync_command(
+        source: str,
+        target: str,
+        link_dest: str | None = None,
+        itemize: bool = False,
+        dry_run: bool = False,
+    ) -> str:
+        args = ["rsync", "-a", "--delete"]
+        if dry_run:
+            args.append("--dry-run")
+        if link_dest:
+            args.append(f"--link-dest={link_dest}")
+        if itemize:
+            args.append(f"--out-format={CHECKPOINT_ITEMIZE_FORMAT}")
+        args.extend(
+            f"--exclude={pattern}" for pattern in SANDBOX_RESTORE_EXCLUDE_PATTERNS
+        )
+        args.extend([f"{source}/", f"{target}/"])
+        return shlex.join(args)
+
+    @staticmethod
+    def _parse_itemized_changes(output: str) -> CheckpointDiff:
+        # Only files and links are reported; directories follow their contents.
+        diff = CheckpointDiff()
+        for line in output.splitlines():
+            item = line[:CHECKPOINT_ITEMIZE_WIDTH].rstrip()
+            path = line[CHECKPOINT_ITEMIZE_WIDTH + 1 :]
+            if not path or path.endswith("/"):
+                continue
+            if item == "*deleting":
+                diff.removed.append(path)
+            elif item.endswith("+++++++++"):
+                diff.added.append(path)
+            elif len(item) == CHECKPOINT_ITEMIZE_WIDTH and item[1] != "d":
+                diff.changed.append(path)
+        return diff
+
     async def _cleanup_old_checkpoints(self, sandbox_id: str) -> int:
         checkpoints = await self.list_checkpoints(sandbox_id)
 
@@ -160,6 +219,11 @@ class SandboxProvider(ABC):
     async def is_running(self, sandbox_id: str) -> bool:
         pass
 
+    async def suspend_sandbox(self, sandbox_id: str) -> bool:
+        # Providers that manage their own idle lifecycle (E2B auto-pause) keep
+        # this no-op; suspended sandboxes are resumed on the next connect.
+        return False
+
     @abstractmethod
     async def execute_command(
         self,
@@ -180,6 +244,26 @@ class SandboxProvider(ABC):
     ) -> None:
         pass
 
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+    ) -> None:
+        for path, content in files.items():
+            await self.write_file(sandbox_id, path, content)
+
+    async def upload_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, Path],
+    ) -> None:
+        # Uploads local files by path. Providers that can stream from disk
+        # override this; the default reads each file into memory.
+        contents: dict[str, str | bytes] = {}
+        for path, local_path in files.items():
+            contents[path] = await asyncio.to_thread(local_path.read_bytes)
+        await self.write_files(sandbox_id, contents)
+
     @abstractmethod
     async def read_file(
         self,
@@ -188,45 +272,130 @@ class SandboxProvider(ABC):
     ) -> FileContent:
         pass
 
+    async def stat_file(self, sandbox_id: str, path: str) -> FileStat:
+        normalized_path = self.normalize_path(path)
+        result = await self.execute_command(
+            sandbox_id,
+            f"find {shlex.quote(normalized_path)} -maxdepth 0 "
+            "-printf '%y\t%s\t%T@\t%i\n'",
+            timeout=10,
+        )
+        parts = result.stdout.strip().split("\t")
+        if result.exit_code != 0 or len(parts) < 4:
+            raise FileNotFoundError(f"File {path} not found")
+
+        file_type, size, mtime, inode = parts[:4]
+        return FileStat(
+            path=path,
+            type={"f": "file", "d": "directory"}.get(file_type, "other"),
+            size=int(size),
+            modified=float(mtime),
+            inode=int(inode),
+            is_binary=self._is_binary_file(path),
+        )
+
+    async def read_file_range(
+        self, sandbox_id: str, path: str, offset: int, length: int
+    ) -> bytes:
+        # tail seeks straight to the offset on regular files and head stops
+        # after `length` bytes, so only the requested slice leaves the sandbox.
+        normalized_path = self.normalize_path(path)
+        result = await self.execute_command(
+            sandbox_id,
+            f"tail -c +{offset + 1} {shlex.quote(normalized_path)} "
+            f"| head -c {length} | base64 -w0",
+            timeout=30,
+        )
+        if result.exit_code != 0:
+            raise FileNotFoundError(f"Failed to read {path}: {result.stderr.strip()}")
+        return base64.b64decode(result.stdout)
+
     async def list_files(
         self,
         sandbox_id: str,
         path: str = "/home/user",
         excluded_patterns: list[str] | None = None,
     ) -> list[FileMetadata]:
+        scan = await self.scan_files(
+            sandbox_id, [path], excluded_patterns=excluded_patterns
+        )
+        return [item for item in scan.files if item.path]
+
+    async def scan_files(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+        excluded_patterns: list[str] | None = None,
+        changed_since: float | None = None,
+        min_depth: int | None = None,
+        max_depth: int | None = None,
+    ) -> FileScan:
+        # Walks `paths` with find, pruning excluded directories instead of
+        # filtering their contents afterwards. `changed_since` (a timestamp
+        # from the sandbox clock, as returned in FileScan.scanned_at) limits
+        # the output to entries whose inode changed after it. The home
+        # directory itself is reported with an empty path. The walk stays on
+        # one filesystem and ignores unreadable entries, so the scan is only
+        # incomplete when find rejects the tests themselves (e.g. a find
+        # without -newerct), which a dry run on / detects up front.
         patterns = excluded_patterns or SANDBOX_EXCLUDED_PATHS
 
-        exclude_conditions = []
+        prune_conditions = []
+        name_conditions = []
         for pattern in patterns:
             if pattern.startswith("*."):
-                exclude_conditions.append(f"-not -name '{pattern}'")
+                name_conditions.append(f"-not -name '{pattern}'")
             else:
-                exclude_conditions.append(f"-not -path '{pattern}'")
-
-        exclude_args = " ".join(exclude_conditions)
-        find_command = f"find {path} {exclude_args} -printf '%p\t%y\t%s\t%T@\n'"
+                prune_conditions.append(f"-path '{pattern}'")
+
+        roots = " ".join(shlex.quote(p) for p in paths)
+        if min_depth is not None:
+            roots += f" -mindepth {min_depth}"
+        if max_depth is not None:
+            roots += f" -maxdepth {max_depth}"
+
+        prune_args = " -o ".join(prune_conditions) or "-false"
+        filter_args = " ".join(name_conditions)
+        if changed_since is not None:
+            filter_args += f" -newerct @{changed_since:.9f}"
+
+        probe_command = (
+            f"find / -maxdepth 0 {filter_args} -printf '' 2>/dev/null "
+            f"&& echo {FILE_SCAN_READY_MARKER}"
+        )
+        find_command = (
+            f"find {roots} -xdev \\( {prune_args} \\) -prune -o {filter_args} "
+            "-printf '%p\t%y\t%s\t%T@\n' 2>/dev/null"
+        )
+        result = await self.execute_command(
+            sandbox_id,
+            f"date +%s.%N; {probe_command}; {find_command}",
+            timeout=30,
+        )
 
-        result = await self.execute_command(sandbox_id, find_command, timeout=30)
+        lines = result.stdout.strip().split("\n")
+        try:
+            scanned_at = float(lines[0])
+        except ValueError:
+            raise SandboxException(f"Failed to scan files: {result.stderr.strip()}")
+        complete = len(lines) > 1 and lines[1] == FILE_SCAN_READY_MARKER
 
         metadata_items = []
-        for line in result.stdout.strip().split("\n"):
-            if not line:
-                continue
-
+        for line in lines[1:]:
             parts = line.split("\t")
             if len(parts) < 4:
                 continue
 
             file_path, file_type, size, mtime = parts[0], parts[1], parts[2], parts[3]
 
-            if not file_path or file_path == "/home/user" or file_path == "":
-                continue
-
-            if file_path.startswith("/home/user/"):
+            if file_path == "/home/user":
+                file_path = ""
+            elif file_path.startswith("/home/user/"):
                 file_path = file_path[11:]
-            elif file_path.startswith("/home/user"):
-                file_path = file_path[10:]
+            else:
+                continue
 
+            modified = float(mtime) if mtime.replace(".", "").isdigit() else 0
             if file_type == "f":
                 is_binary = (
                     Path(file_path).suffix.lstrip(".").lower()
@@ -238,9 +407,7 @@ class SandboxProvider(ABC):
                         type="file",
                         is_binary=is_binary,
                         size=int(size) if size.isdigit() else 0,
-                        modified=float(mtime)
-                        if mtime.replace(".", "").isdigit()
-                        else 0,
+                        modified=modified,
                     )
                 )
             elif file_type == "d":
@@ -249,13 +416,15 @@ class SandboxProvider(ABC):
                         path=file_path,
                         type="directory",
                         size=0,
-                        modified=float(mtime)
-                        if mtime.replace(".", "").isdigit()
-                        else 0,
+                        modified=modified,
                     )
                 )
 
-        return metadata_items
+        return FileScan(
+            scanned_at=scanned_at,
+            files=metadata_items,
+            complete=complete,
+        )
 
     @abstractmethod
     async def create_pty(
@@ -315,25 +484,10 @@ class SandboxProvider(ABC):
 
         prev_checkpoint = await self._get_latest_checkpoint_dir(sandbox_id)
 
-        exclude_args = " ".join(
-            f"--exclude={shlex.quote(pattern)}"
-            for pattern in SANDBOX_RESTORE_EXCLUDE_PATTERNS
-        )
-
         # Use --link-dest for incremental backup: unchanged files become hard links
-        if prev_checkpoint:
-            rsync_cmd = (
-                f"rsync -a --delete "
-                f"--link-dest={shlex.quote(prev_checkpoint)} "
-                f"{exclude_args} "
-                f"/home/user/ {shlex.quote(checkpoint_dir)}/"
-            )
-        else:
-            rsync_cmd = (
-                f"rsync -a --delete "
-                f"{exclude_args} "
-                f"/home/user/ {shlex.quote(checkpoint_dir)}/"
-            )
+        rsync_cmd = self._checkpoint_rsync_command(
+            CHECKPOINT_WORKSPACE_DIR, checkpoint_dir, link_dest=prev_checkpoint
+        )
 
         try:
             await self.execute_command(sandbox_id, rsync_cmd)
@@ -355,29 +509,47 @@ class SandboxProvider(ABC):
         sandbox_id: str,
         checkpoint_id: str,
     ) -> bool:
-        checkpoint_dir = f"{CHECKPOINT_BASE_DIR}/{checkpoint_id}"
-
-        check_result = await self.execute_command(
-            sandbox_id, f'[ -d {shlex.quote(checkpoint_dir)} ] && echo "1" || echo "0"'
+        # rsync's quick check only copies files whose size or mtime differ, so
+        # the restore applies just the delta; itemizing it costs nothing extra.
+        checkpoint_dir = await self._require_checkpoint_dir(sandbox_id, checkpoint_id)
+        result = await self.execute_command(
+            sandbox_id,
+            self._checkpoint_rsync_command(
+                checkpoint_dir, CHECKPOINT_WORKSPACE_DIR, itemize=True
+            ),
         )
-
-        if check_result.stdout.strip() != "1":
-            raise FileNotFoundError(f"Checkpoint {checkpoint_id} not found")
-
-        exclude_args = " ".join(
-            f"--exclude={shlex.quote(pattern)}"
-            for pattern in SANDBOX_RESTORE_EXCLUDE_PATTERNS
+        diff = self._parse_itemized_changes(result.stdout)
+        logger.info(
+            "Restored checkpoint %s: %s added, %s changed, %s removed",
+            checkpoint_id,
+            len(diff.added),
+            len(diff.changed),
+            len(diff.removed),
         )
+        return True
 
-        rsync_cmd = (
-            f"rsync -a --delete "
-            f"{exclude_args} "
-            f"--stats "
-            f"{shlex.quote(checkpoint_dir)}/ /home/user/"
+    async def diff_checkpoint(
+        self,
+        sandbox_id: str,
+        checkpoint_id: str,
+        base_checkpoint_id: str | None = None,
+    ) -> CheckpointDiff:
+        # Reports what restoring checkpoint_id over the base (another
+        # checkpoint, or the live workspace by default) would add, change and
+        # remove, from a dry run of the same rsync the restore performs.
+        checkpoint_dir = await self._require_checkpoint_dir(sandbox_id, checkpoint_id)
+        base_dir = (
+            await self._require_checkpoint_dir(sandbox_id, base_checkpoint_id)
+            if base_checkpoint_id
+            else CHECKPOINT_WORKSPACE_DIR
         )
-
-        await self.execute_command(sandbox_id, rsync_cmd)
-        return True
+        result = await self.execute_command(
+            sandbox_id,
+            self._checkpoint_rsync_command(
+                checkpoint_dir, base_dir, itemize=True, dry_run=True
+            ),
+        )
+        return self._parse_itemized_changes(result.stdout)
 
     async def list_checkpoints(self, sandbox_id: str) -> list[CheckpointInfo]:
         check_result = await self.execute_command(
@@ -0,0 +1,338 @@
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+from urllib.parse import quote, urlencode, urlsplit
+
+import aiohttp
+
+from app.services.exceptions import ErrorCode, SandboxException
+
+DEFAULT_DOCKER_HOST = "unix:///var/run/docker.sock"
+DOCKER_CONNECTION_POOL_SIZE = 32
+DOCKER_REQUEST_TIMEOUT_SECONDS = 60
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+STREAM_READ_SIZE = 64 * 1024
+
+STREAM_STDOUT = 1
+STREAM_STDERR = 2
+FRAME_HEADER_SIZE = 8
+
+
+class ExecStream:
+    # An exec's stdio after Docker hijacked the HTTP connection. Non-TTY execs
+    # multiplex stdout and stderr into 8-byte-header frames; TTY execs are a
+    # plain byte stream.
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+
+    async def read(self, size: int = STREAM_READ_SIZE) -> bytes:
+        return await self._reader.read(size)
+
+    async def read_frame(self) -> tuple[int, bytes] | None:
+        # Returns None at EOF, i.e. once the exec's process has exited.
+        try:
+            header = await self._reader.readexactly(FRAME_HEADER_SIZE)
+            size = int.from_bytes(header[4:8], byteorder="big")
+            return header[0], await self._reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            return None
+
+    async def write(self, data: bytes) -> None:
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def close(self) -> None:
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class DockerEngineClient:
+    # Minimal asyncio client for the parts of the Docker Engine API the local
+    # provider and transport use. Requests share a pooled connector for the
+    # client's lifetime; exec streams take over a dedicated connection.
+    def __init__(self, host: str | None = None) -> None:
+        host = host or os.environ.get("DOCKER_HOST") or DEFAULT_DOCKER_HOST
+        parts = urlsplit(host)
+        if parts.scheme == "unix":
+            self._socket_path: str | None = parts.path
+            self._address: tuple[str, int] | None = None
+            self._base_url = "http://docker"
+        elif parts.scheme in ("tcp", "http") and parts.hostname:
+            self._socket_path = None
+            self._address = (parts.hostname, parts.port or 2375)
+            self._base_url = f"http://{parts.hostname}:{parts.port or 2375}"
+        else:
+            raise SandboxException(f"Unsupported Docker host: {host}")
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector: aiohttp.BaseConnector
+            if self._socket_path:
+                connector = aiohttp.UnixConnector(
+                    path=self._socket_path, limit=DOCKER_CONNECTION_POOL_SIZE
+                )
+            else:
+                connector = aiohttp.TCPConnector(limit=DOCKER_CONNECTION_POOL_SIZE)
+            self._session = aiohttp.ClientSession(
+                base_url=self._base_url,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=None, sock_connect=DOCKER_REQUEST_TIMEOUT_SECONDS
+                ),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        body: Any = None,
+        data: Any = None,
+        headers: dict[str, str] | None = None,
+        timeout: float | None = DOCKER_REQUEST_TIMEOUT_SECONDS,
+    ) -> aiohttp.ClientResponse:
+        response = await self._get_session().request(
+            method,
+            path,
+            params=params,
+            json=body,
+            data=data,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+        if response.status >= 400:
+            try:
+                message = (await response.json(content_type=None)).get("message")
+            except (ValueError, aiohttp.ClientError):
+                message = None
+            finally:
+                response.release()
+            raise SandboxException(
+                f"Docker API {method} {path} failed ({response.status}): "
+                f"{message or response.reason}",
+                error_code=ErrorCode.SANDBOX_NOT_FOUND
+                if response.status == 404
+                else ErrorCode.SANDBOX_OPERATION_FAILED,
+            )
+        return response
+
+    async def _call(self, method: str, path: str, **kwargs: Any) -> Any:
+        async with await self._request(method, path, **kwargs) as response:
+            if response.status == 204 or response.content_length == 0:
+                return None
+            return await response.json(content_type=None)
+
+    async def create_container(self, name: str, config: dict[str, Any]) -> str:
+        try:
+            result = await self._call(
+                "POST", "/containers/create", params={"name": name}, body=config
+            )
+        except SandboxException as e:
+            if e.error_code != ErrorCode.SANDBOX_NOT_FOUND:
+                raise
+            await self.pull_image(config["Image"])
+            result = await self._call(
+                "POST", "/containers/create", params={"name": name}, body=config
+            )
+        return str(result["Id"])
+
+    async def pull_image(self, image: str) -> None:
+        name, _, tag = image.rpartition(":")
+        if not name or "/" in tag:
+            name, tag = image, "latest"
+        async with await self._request(
+            "POST",
+            "/images/create",
+            params={"fromImage": name, "tag": tag},
+            timeout=None,
+        ) as response:
+            # Progress is streamed as JSON lines; failures arrive in-band.
+            async for line in response.content:
+                if b'"error"' in line:
+                    raise SandboxException(
+                        f"Failed to pull {image}: {json.loads(line).get('error')}"
+                    )
+
+    async def inspect_container(self, container: str) -> dict[str, Any]:
+        result: dict[str, Any] = await self._call(
+            "GET", f"/containers/{quote(container)}/json"
+        )
+        return result
+
+    async def start_container(self, container: str) -> None:
+        await self._call("POST", f"/containers/{quote(container)}/start")
+
+    async def stop_container(self, container: str, timeout: int = 10) -> None:
+        await self._call(
+            "POST",
+            f"/containers/{quote(container)}/stop",
+            params={"t": timeout},
+            timeout=timeout + DOCKER_REQUEST_TIMEOUT_SECONDS,
+        )
+
+    async def pause_container(self, container: str) -> None:
+        await self._call("POST", f"/containers/{quote(container)}/pause")
+
+    async def unpause_container(self, container: str) -> None:
+        await self._call("POST", f"/containers/{quote(container)}/unpause")
+
+    async def remove_container(self, container: str, force: bool = False) -> None:
+        await self._call(
+            "DELETE",
+            f"/containers/{quote(container)}",
+            params={"force": "true" if force else "false"},
+        )
+
+    async def exec_create(
+        self,
+        container: str,
+        cmd: list[str],
+        *,
+        env: dict[str, str] | list[str] | None = None,
+        workdir: str | None = None,
+        user: str | None = None,
+        tty: bool = False,
+        stdin: bool = False,
+    ) -> str:
+        if isinstance(env, dict):
+            env = [f"{key}={value}" for key, value in env.items()]
+        config: dict[str, Any] = {
+            "Cmd": cmd,
+            "Env": env or [],
+            "Tty": tty,
+            "AttachStdin": stdin,
+            "AttachStdout": True,
+            "AttachStderr": True,
+        }
+        if workdir:
+            config["WorkingDir"] = workdir
+        if user:
+            config["User"] = user
+        result = await self._call(
+            "POST", f"/containers/{quote(container)}/exec", body=config
+        )
+        return str(result["Id"])
+
+    async def exec_start_detached(self, exec_id: str, tty: bool = False) -> None:
+        await self._call(
+            "POST", f"/exec/{exec_id}/start", body={"Detach": True, "Tty": tty}
+        )
+
+    async def exec_attach(self, exec_id: str, tty: bool = False) -> ExecStream:
+        # aiohttp has no API for a hijacked connection, so the upgrade request
+        # is written by hand on a dedicated connection.
+        if self._socket_path:
+            reader, writer = await asyncio.open_unix_connection(
+                self._socket_path, limit=STREAM_READ_SIZE * 4
+            )
+        else:
+            assert self._address is not None
+            reader, writer = await asyncio.open_connection(
+                *self._address, limit=STREAM_READ_SIZE * 4
+            )
+
+        body = json.dumps({"Detach": False, "Tty": tty}).encode()
+        writer.write(
+            (
+                f"POST /exec/{exec_id}/start HTTP/1.1\r\n"
+                "Host: docker\r\n"
+                "Content-Type: application/json\r\n"
+                "Connection: Upgrade\r\n"
+                "Upgrade: tcp\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode()
+            + body
+        )
+        await writer.drain()
+
+        stream = ExecStream(reader, writer)
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            await stream.close()
+            raise SandboxException(f"Docker closed exec {exec_id} on attach: {e}")
+
+        status_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+        if status_line.split(" ")[1:2] not in (["101"], ["200"]):
+            await stream.close()
+            raise SandboxException(f"Failed to attach to exec {exec_id}: {status_line}")
+        return stream
+
+    async def exec_run(
+        self, exec_id: str, timeout: float | None = None
+    ) -> tuple[int, bytes, bytes]:
+        # Runs a non-TTY exec to completion and returns its exit code, stdout
+        # and stderr.
+        stream = await self.exec_attach(exec_id)
+        stdout: list[bytes] = []
+        stderr: list[bytes] = []
+        try:
+            async with asyncio.timeout(timeout):
+                while (frame := await stream.read_frame()) is not None:
+                    stream_type, payload = frame
+                    (stderr if stream_type == STREAM_STDERR else stdout).append(payload)
+        finally:
+            await stream.close()
+        info = await self.exec_inspect(exec_id)
+        return int(info.get("ExitCode") or 0), b"".join(stdout), b"".join(stderr)
+
+    async def exec_inspect(self, exec_id: str) -> dict[str, Any]:
+        result: dict[str, Any] = await self._call("GET", f"/exec/{exec_id}/json")
+        return result
+
+    async def exec_resize(self, exec_id: str, rows: int, cols: int) -> None:
+        await self._call(
+            "POST", f"/exec/{exec_id}/resize", params={"h": rows, "w": cols}
+        )
+
+    async def events(
+        self, filters: dict[str, list[str]], since: float | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        params: dict[str, Any] = {"filters": json.dumps(filters)}
+        if since is not None:
+            params["since"] = f"{since:.9f}"
+        async with await self._request(
+            "GET", "/events", params=params, timeout=None
+        ) as response:
+            async for line in response.content:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def put_archive(
+        self, container: str, path: str, chunks: AsyncIterable[bytes]
+    ) -> None:
+        # The body is sent with chunked encoding as it is produced, so large
+        # uploads never sit in memory as a whole.
+        await self._call(
+            "PUT",
+            f"/containers/{quote(container)}/archive?{urlencode({'path': path})}",
+            data=chunks,
+            headers={"Content-Type": "application/x-tar"},
+            timeout=None,
+        )
+
+    async def get_archive(self, container: str, path: str) -> AsyncIterator[bytes]:
+        async with await self._request(
+            "GET",
+            f"/containers/{quote(container)}/archive",
+            params={"path": path},
+            timeout=None,
+        ) as response:
+            async for chunk in response.content.iter_chunked(ARCHIVE_CHUNK_SIZE):
+                yield chunk
@@ -3,10 +3,12 @@ import io
 import logging
 import shlex
 import tarfile
+import tempfile
+import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import AsyncIterator
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 from app.constants import (
     DOCKER_AVAILABLE_PORTS,
@@ -14,6 +16,11 @@ from app.constants import (
 )
 from app.services.exceptions import SandboxException
 from app.services.sandbox_providers.base import LISTENING_PORTS_COMMAND, SandboxProvider
+from app.services.sandbox_providers.docker_engine import (
+    ARCHIVE_CHUNK_SIZE,
+    DockerEngineClient,
+    ExecStream,
+)
 from app.services.sandbox_providers.types import (
     CommandResult,
     DockerConfig,
@@ -26,73 +33,69 @@ from app.services.sandbox_providers.types import (
 
 logger = logging.getLogger(__name__)
 
+SANDBOX_USER = "user"
+SANDBOX_UID = 1000
+
 
 class LocalDockerProvider(SandboxProvider):
     def __init__(self, config: DockerConfig) -> None:
         self.config = config
-        self._executor = ThreadPoolExecutor(max_workers=10)
-        self._containers: dict[str, Any] = {}
+        self._containers: dict[str, str] = {}
         self._pty_sessions: dict[str, dict[str, Any]] = {}
         self._port_mappings: dict[str, dict[int, int]] = {}
-        self._docker_client: Any = None
+        self._docker: DockerEngineClient | None = None
 
-    def _get_docker_client(self) -> Any:
-        if self._docker_client is None:
-            try:
-                import docker
-
-                if self.config.host:
-                    self._docker_client = docker.DockerClient(base_url=self.config.host)
-                else:
-                    self._docker_client = docker.from_env()
-            except ImportError:
-                raise SandboxException(
-                    "Docker SDK not installed. Run: pip install docker"
-                )
-            except Exception as e:
-                raise SandboxException(f"Failed to connect to Docker: {e}")
-        return self._docker_client
-
-    def _create_container(self, sandbox_id: str) -> Any:
-        client = self._get_docker_client()
-        container = client.containers.run(
-            self.config.image,
-            command="/bin/bash",
-            name=f"claudex-sandbox-{sandbox_id}",
-            hostname="sandbox",
-            user="user",
-            working_dir=self.config.user_home,
-            stdin_open=True,
-            tty=True,
-            detach=True,
-            remove=False,
-            network=self.config.network,
-            ports={
-                **{f"{port}/tcp": None for port in DOCKER_AVAILABLE_PORTS},
-                f"{self.config.openvscode_port}/tcp": None,
-            },
-            environment={
-                "TERM": "xterm-256color",
-                "HOME": self.config.user_home,
-                "USER": "user",
+    def _get_docker_client(self) -> DockerEngineClient:
+        if self._docker is None:
+            self._docker = DockerEngineClient(self.config.host)
+        return self._docker
+
+    @staticmethod
+    def _container_name(sandbox_id: str) -> str:
+        return f"claudex-sandbox-{sandbox_id}"
+
+    async def _create_container(self, sandbox_id: str) -> str:
+        docker = self._get_docker_client()
+        exposed_ports = [
+            f"{port}/tcp"
+            for port in (*DOCKER_AVAILABLE_PORTS, self.config.openvscode_port)
+        ]
+        container_id = await docker.create_container(
+            self._container_name(sandbox_id),
+            {
+                "Image": self.config.image,
+                "Cmd": ["/bin/bash"],
+                "Hostname": "sandbox",
+                "User": SANDBOX_USER,
+                "WorkingDir": self.config.user_home,
+                "OpenStdin": True,
+                "Tty": True,
+                "Env": [
+                    "TERM=xterm-256color",
+                    f"HOME={self.config.user_home}",
+                    "USER=user",
+                ],
+                "ExposedPorts": {port: {} for port in exposed_ports},
+                "HostConfig": {
+                    "NetworkMode": self.config.network,
+                    "PortBindings": {
+                        port: [{"HostIp": "", "HostPort": ""}] for port in exposed_ports
+                    },
+                },
             },
         )
-        return container
+        await docker.start_container(container_id)
+        return container_id
 
     async def create_sandbox(self) -> str:
-        loop = asyncio.get_running_loop()
         sandbox_id = str(uuid.uuid4())[:12]
 
         try:
-            container = await loop.run_in_executor(
-                self._executor, lambda: self._create_container(sandbox_id)
-            )
-            self._containers[sandbox_id] = container
+            container_id = await self._create_container(sandbox_id)
+            self._containers[sandbox_id] = container_id
 
-            port_map = await loop.run_in_executor(
-                self._executor, lambda: self._extract_port_mappings(container)
-            )
-            self._port_mappings[sandbox_id] = port_map
+            attrs = await self._get_docker_client().inspect_container(container_id)
+            self._port_mappings[sandbox_id] = self._extract_port_mappings(attrs)
 
             await self._start_ide_server(sandbox_id)
 
@@ -129,9 +132,8 @@ class LocalDockerProvider(SandboxProvider):
             )
 
     @staticmethod
-    def _extract_port_mappings(container: Any) -> dict[int, int]:
-        container.reload()
-        ports = container.attrs.get("NetworkSettings", {}).get("Ports", {})
+    def _extract_port_mappings(attrs: dict[str, Any]) -> dict[int, int]:
+        ports = (attrs.get("NetworkSettings") or {}).get("Ports") or {}
         port_map: dict[int, int] = {}
         for container_port, host_bindings in ports.items():
             if (
@@ -145,56 +147,57 @@ class LocalDockerProvider(SandboxProvider):
                     port_map[internal_port] = int(host_port)
         return port_map
 
-    def _is_container_running(self, container: Any) -> bool:
-        container.reload()
-        return bool(container.status == "running")
+    @staticmethod
+    def _container_status(attrs: dict[str, Any]) -> str:
+        return str((attrs.get("State") or {}).get("Status", ""))
 
-    def _get_container_by_id(self, sandbox_id: str) -> Any | None:
-        client = self._get_docker_client()
-        try:
-            return client.containers.get(f"claudex-sandbox-{sandbox_id}")
-        except Exception:
-            return None
+    async def _is_container_running(self, container_id: str) -> bool:
+        attrs = await self._get_docker_client().inspect_container(container_id)
+        return self._container_status(attrs) == "running"
 
     async def connect_sandbox(self, sandbox_id: str) -> bool:
-        if sandbox_id in self._containers:
-            container = self._containers[sandbox_id]
-            loop = asyncio.get_running_loop()
+        docker = self._get_docker_client()
 
-            is_running = await loop.run_in_executor(
-                self._executor, lambda: self._is_container_running(container)
-            )
+        if sandbox_id in self._containers:
+            try:
+                is_running = await self._is_container_running(
+                    self._containers[sandbox_id]
+                )
+            except SandboxException:
+                is_running = False
             if is_running:
                 await self._ensure_ide_server_running(sandbox_id)
                 return True
             del self._containers[sandbox_id]
 
-        loop = asyncio.get_running_loop()
-
-        container = await loop.run_in_executor(
-            self._executor, lambda: self._get_container_by_id(sandbox_id)
-        )
-        if container:
-            self._containers[sandbox_id] = container
-            port_mappings = await loop.run_in_executor(
-                self._executor, lambda: self._extract_port_mappings(container)
-            )
-            self._port_mappings[sandbox_id] = port_mappings
-            await self._ensure_ide_server_running(sandbox_id)
-            return True
+        try:
+            attrs = await docker.inspect_container(self._container_name(sandbox_id))
+        except SandboxException:
+            return False
 
-        return False
+        container_id = str(attrs["Id"])
+        self._containers[sandbox_id] = container_id
+        # Idle sandboxes are paused or stopped by the reaper; resume before
+        # reading port mappings since a stopped container has none.
+        if await self._ensure_running(container_id, attrs):
+            attrs = await docker.inspect_container(container_id)
+        self._port_mappings[sandbox_id] = self._extract_port_mappings(attrs)
+        await self._ensure_ide_server_running(sandbox_id)
+        return True
 
     async def delete_sandbox(self, sandbox_id: str) -> None:
-        container = self._containers.get(sandbox_id)
+        container_id = self._containers.get(sandbox_id)
 
-        if not container:
+        if not container_id:
             try:
-                container = await self._find_container_by_name(sandbox_id)
-            except Exception:
+                attrs = await self._get_docker_client().inspect_container(
+                    self._container_name(sandbox_id)
+                )
+            except SandboxException:
                 return
+            container_id = str(attrs["Id"])
 
-        await self._destroy_container(container)
+        await self._destroy_container(container_id)
 
         if sandbox_id in self._containers:
             del self._containers[sandbox_id]
@@ -204,34 +207,63 @@ class LocalDockerProvider(SandboxProvider):
         logger.info("Successfully deleted Docker sandbox %s", sandbox_id)
 
     async def is_running(self, sandbox_id: str) -> bool:
-        container = self._containers.get(sandbox_id)
-        if not container:
+        container_id = self._containers.get(sandbox_id)
+        if not container_id:
             return False
 
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            self._executor, lambda: self._is_container_running(container)
+        try:
+            return await self._is_container_running(container_id)
+        except SandboxException:
+            return False
+
+    async def suspend_sandbox(self, sandbox_id: str) -> bool:
+        docker = self._get_docker_client()
+        container_id = self._containers.get(sandbox_id) or self._container_name(
+            sandbox_id
         )
+        try:
+            attrs = await docker.inspect_container(container_id)
+        except SandboxException:
+            return False
 
-    def _run_command(
+        suspended = self._container_status(attrs) == "running"
+        if suspended:
+            if self.config.idle_action == "stop":
+                await docker.stop_container(container_id, timeout=10)
+            else:
+                await docker.pause_container(container_id)
+
+        # Host ports are reassigned when a stopped container starts again.
+        self._containers.pop(sandbox_id, None)
+        self._port_mappings.pop(sandbox_id, None)
+
+        if suspended:
+            logger.info(
+                "Suspended idle Docker sandbox %s (%s)",
+                sandbox_id,
+                self.config.idle_action,
+            )
+        return suspended
+
+    async def _run_command(
         self,
-        container: Any,
+        container_id: str,
         command: str,
         env_list: list[str],
         background: bool,
     ) -> tuple[int, bytes]:
-        result = container.exec_run(
-            cmd=["bash", "-c", command],
-            environment=env_list,
+        docker = self._get_docker_client()
+        exec_id = await docker.exec_create(
+            container_id,
+            ["bash", "-c", command],
+            env=env_list,
             workdir=self.config.user_home,
-            demux=True,
-            detach=background,
         )
         if background:
+            await docker.exec_start_detached(exec_id)
             return 0, b"Background process started"
-        exit_code = result.exit_code
-        stdout, stderr = result.output or (b"", b"")
-        return exit_code, (stdout or b"") + (stderr or b"")
+        exit_code, stdout, stderr = await docker.exec_run(exec_id)
+        return exit_code, stdout + stderr
 
     async def execute_command(
         self,
@@ -241,17 +273,13 @@ class LocalDockerProvider(SandboxProvider):
         envs: dict[str, str] | None = None,
         timeout: int | None = None,
     ) -> CommandResult:
-        container = await self._get_container(sandbox_id)
-        loop = asyncio.get_running_loop()
+        container_id = await self._get_container(sandbox_id)
         env_list = [f"{k}={v}" for k, v in (envs or {}).items()]
 
         effective_timeout = timeout or SANDBOX_DEFAULT_COMMAND_TIMEOUT
 
         exit_code, output = await self._execute_with_timeout(
-            loop.run_in_executor(
-                self._executor,
-                lambda: self._run_command(container, command, env_list, background),
-            ),
+            self._run_command(container_id, command, env_list, background),
             effective_timeout,
             f"Command execution timed out after {effective_timeout}s",
         )
@@ -259,23 +287,68 @@ class LocalDockerProvider(SandboxProvider):
         output_str = output.decode("utf-8", errors="replace")
         return CommandResult(stdout=output_str, stderr="", exit_code=exit_code)
 
-    def _write_container_file(
+    def _build_archive(
         self,
-        container: Any,
-        normalized_path: str,
-        content_bytes: bytes,
-    ) -> None:
-        tar_stream = io.BytesIO()
-        with tarfile.open(fileobj=tar_stream, mode="w") as tar:
-            file_data = io.BytesIO(content_bytes)
-            info = tarfile.TarInfo(name=Path(normalized_path).name)
-            info.size = len(content_bytes)
-            tar.addfile(info, file_data)
+        files: dict[str, bytes | Path],
+        existing_dirs: set[str],
+    ) -> IO[bytes]:
+        # All files go into a single archive extracted at the home directory.
+        # Parent directories the upload creates are added as explicit entries
+        # owned by the container user, since the daemon would otherwise create
+        # them as root. Directories that already exist get no entry, because
+        # the daemon applies an entry's owner and mode to existing directories
+        # too. The archive is spooled to disk past 8 MB and streamed to the
+        # daemon rather than held in memory; local files are copied into it
+        # chunk by chunk. The caller owns and closes the returned file.
+        home = Path(self.config.user_home)
+        mtime = time.time()
+        added_dirs = set(existing_dirs)
+
+        tar_stream = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        try:
+            with tarfile.open(fileobj=tar_stream, mode="w") as tar:
+                for normalized_path, content in files.items():
+                    relative_path = Path(normalized_path).relative_to(home)
+
+                    for parent in reversed(relative_path.parents[:-1]):
+                        dir_name = parent.as_posix()
+                        if dir_name in added_dirs:
+                            continue
+                        added_dirs.add(dir_name)
+                        dir_info = tarfile.TarInfo(name=dir_name)
+                        dir_info.type = tarfile.DIRTYPE
+                        dir_info.mode = 0o755
+                        dir_info.mtime = mtime
+                        self._set_archive_owner(dir_info)
+                        tar.addfile(dir_info)
+
+                    info = tarfile.TarInfo(name=relative_path.as_posix())
+                    info.mode = 0o644
+                    info.mtime = mtime
+                    self._set_archive_owner(info)
+                    if isinstance(content, Path):
+                        info.size = content.stat().st_size
+                        with open(content, "rb") as local_file:
+                            tar.addfile(info, local_file)
+                    else:
+                        info.size = len(content)
+                        tar.addfile(info, io.BytesIO(content))
+
+        except BaseException:
+            tar_stream.close()
+            raise
         tar_stream.seek(0)
+        return tar_stream
+
+    @staticmethod
+    def _set_archive_owner(info: tarfile.TarInfo) -> None:
+        info.uid = info.gid = SANDBOX_UID
+        info.uname = info.gname = SANDBOX_USER
 
-        parent_dir = str(Path(normalized_path).parent)
-        container.exec_run(f"mkdir -p {shlex.quote(parent_dir)}")
-        container.put_archive(parent_dir, tar_stream.read())
+    @staticmethod
+    async def _iter_archive(tar_stream: IO[bytes]) -> AsyncIterator[bytes]:
+        while chunk := tar_stream.read(ARCHIVE_CHUNK_SIZE):
+            yield chunk
 
     async def write_file(
         self,
@@ -283,29 +356,78 @@ class LocalDockerProvider(SandboxProvider):
         path: str,
         content: str | bytes,
     ) -> None:
-        container = await self._get_container(sandbox_id)
-        normalized_path = self.normalize_path(path)
-        loop = asyncio.get_running_loop()
-
-        if isinstance(content, str):
-            content_bytes = content.encode("utf-8")
-        else:
-            content_bytes = content
+        await self.write_files(sandbox_id, {path: content})
 
-        await loop.run_in_executor(
-            self._executor,
-            lambda: self._write_container_file(
-                container, normalized_path, content_bytes
-            ),
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+    ) -> None:
+        await self._put_files(
+            sandbox_id,
+            {
+                path: content.encode("utf-8") if isinstance(content, str) else content
+                for path, content in files.items()
+            },
         )
 
-    def _read_container_file(self, container: Any, normalized_path: str) -> bytes:
-        bits, _ = container.get_archive(normalized_path)
-        stream = io.BytesIO()
-        for chunk in bits:
-            stream.write(chunk)
-        stream.seek(0)
+    async def upload_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, Path],
+    ) -> None:
+        await self._put_files(sandbox_id, dict(files))
 
+    async def _put_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, bytes | Path],
+    ) -> None:
+        if not files:
+            return
+        container_id = await self._get_container(sandbox_id)
+
+        normalized_files: dict[str, bytes | Path] = {}
+        for path, content in files.items():
+            normalized_path = self.normalize_path(path, self.config.user_home)
+            if not normalized_path.startswith(f"{self.config.user_home}/"):
+                raise SandboxException(f"Path outside sandbox home: {path}")
+            normalized_files[normalized_path] = content
+
+        existing_dirs = await self._find_existing_dirs(sandbox_id, normalized_files)
+        tar_stream = await asyncio.to_thread(
+            self._build_archive, normalized_files, existing_dirs
+        )
+        try:
+            await self._get_docker_client().put_archive(
+                container_id,
+                self.config.user_home,
+                self._iter_archive(tar_stream),
+            )
+        finally:
+            tar_stream.close()
+
+    async def _find_existing_dirs(
+        self, sandbox_id: str, files: dict[str, bytes | Path]
+    ) -> set[str]:
+        home = Path(self.config.user_home)
+        parents = {
+            parent.as_posix()
+            for path in files
+            for parent in Path(path).relative_to(home).parents[:-1]
+        }
+        if not parents:
+            return set()
+        result = await self.execute_command(
+            sandbox_id,
+            f"cd {shlex.quote(str(home))} && for d in "
+            f"{shlex.join(sorted(parents))}; "
+            'do [ -d "$d" ] && printf \'%s\\n\' "$d"; done; true',
+        )
+        return parents & set(result.stdout.splitlines())
+
+    @staticmethod
+    def _extract_first_member(stream: IO[bytes]) -> bytes:
         with tarfile.open(fileobj=stream, mode="r") as tar:
             members = tar.getmembers()
             if not members:
@@ -320,14 +442,16 @@ class LocalDockerProvider(SandboxProvider):
         sandbox_id: str,
         path: str,
     ) -> FileContent:
-        container = await self._get_container(sandbox_id)
+        container_id = await self._get_container(sandbox_id)
         normalized_path = self.normalize_path(path)
-        loop = asyncio.get_running_loop()
 
-        content_bytes = await loop.run_in_executor(
-            self._executor,
-            lambda: self._read_container_file(container, normalized_path),
-        )
+        stream = io.BytesIO()
+        async for chunk in self._get_docker_client().get_archive(
+            container_id, normalized_path
+        ):
+            stream.write(chunk)
+        stream.seek(0)
+        content_bytes = self._extract_first_member(stream)
 
         content, is_binary = self._encode_file_content(path, content_bytes)
 
@@ -338,22 +462,6 @@ class LocalDockerProvider(SandboxProvider):
             is_binary=is_binary,
         )
 
-    def _create_pty_exec(self, container: Any) -> tuple[dict[str, Any], Any]:
-        exec_id = container.client.api.exec_create(
-            container.id,
-            cmd="/bin/bash",
-            stdin=True,
-            tty=True,
-            environment={"TERM": "xterm-256color"},
-            workdir=self.config.user_home,
-        )
-        socket = container.client.api.exec_start(
-            exec_id["Id"],
-            socket=True,
-            tty=True,
-        )
-        return exec_id, socket
-
     async def create_pty(
         self,
         sandbox_id: str,
@@ -361,21 +469,26 @@ class LocalDockerProvider(SandboxProvider):
         cols: int,
         on_data: PtyDataCallbackType | None = None,
     ) -> PtySession:
-        container = await self._get_container(sandbox_id)
+        container_id = await self._get_container(sandbox_id)
         session_id = str(uuid.uuid4())
-        loop = asyncio.get_running_loop()
+        docker = self._get_docker_client()
 
-        exec_info, socket = await loop.run_in_executor(
-            self._executor, lambda: self._create_pty_exec(container)
+        exec_id = await docker.exec_create(
+            container_id,
+            ["/bin/bash"],
+            env={"TERM": "xterm-256color"},
+            workdir=self.config.user_home,
+            tty=True,
+            stdin=True,
         )
+        stream = await docker.exec_attach(exec_id, tty=True)
 
         self._register_pty_session(
             sandbox_id,
             session_id,
             {
-                "exec_id": exec_info["Id"],
-                "socket": socket,
-                "container": container,
+                "exec_id": exec_id,
+                "stream": stream,
                 "on_data": on_data,
                 "reader_task": None,
             },
@@ -383,7 +496,7 @@ class LocalDockerProvider(SandboxProvider):
 
         if on_data:
             reader_task = asyncio.create_task(
-                self._pty_reader(sandbox_id, session_id, socket, on_data)
+                self._pty_reader(sandbox_id, session_id, stream, on_data)
             )
             self._pty_sessions[sandbox_id][session_id]["reader_task"] = reader_task
 
@@ -401,22 +514,11 @@ class LocalDockerProvider(SandboxProvider):
         self,
         sandbox_id: str,
         session_id: str,
-        socket: Any,
+        stream: ExecStream,
         on_data: PtyDataCallbackType,
     ) -> None:
-        loop = asyncio.get_running_loop()
-
-        def read_socket() -> bytes | None:
-            try:
-                return bytes(socket._sock.recv(4096))
-            except Exception:
-                return None
-
         try:
-            while True:
-                data = await loop.run_in_executor(self._executor, read_socket)
-                if data is None or len(data) == 0:
-                    break
+            while data := await stream.read(4096):
                 await on_data(data)
         except asyncio.CancelledError:
             pass
@@ -433,21 +535,11 @@ class LocalDockerProvider(SandboxProvider):
         if not session:
             return
 
-        socket = session.get("socket")
-        if not socket:
+        stream = session.get("stream")
+        if not stream:
             return
 
-        loop = asyncio.get_running_loop()
-
-        await loop.run_in_executor(self._executor, lambda: socket._sock.send(data))
-
-    @staticmethod
-    def _resize_pty(container: Any, exec_id: str, rows: int, cols: int) -> None:
-        container.client.api.exec_resize(
-            exec_id,
-            height=max(rows, 1),
-            width=max(cols, 1),
-        )
+        await stream.write(data)
 
     async def resize_pty(
         self,
@@ -459,16 +551,12 @@ class LocalDockerProvider(SandboxProvider):
         if not session:
             return
 
-        container = session.get("container")
         exec_id = session.get("exec_id")
-        if not container or not exec_id:
+        if not exec_id:
             return
 
-        loop = asyncio.get_running_loop()
-
-        await loop.run_in_executor(
-            self._executor,
-            lambda: self._resize_pty(container, exec_id, size.rows, size.cols),
+        await self._get_docker_client().exec_resize(
+            exec_id, rows=max(size.rows, 1), cols=max(size.cols, 1)
         )
 
     async def kill_pty(
@@ -488,10 +576,10 @@ class LocalDockerProvider(SandboxProvider):
             except asyncio.CancelledError:
                 pass
 
-        socket = session.get("socket")
-        if socket:
+        stream = session.get("stream")
+        if stream:
             try:
-                socket.close()
+                await stream.close()
             except Exception:
                 pass
 
@@ -516,43 +604,42 @@ class LocalDockerProvider(SandboxProvider):
             excluded_ports={self.config.openvscode_port},
         )
 
-    async def _find_container_by_name(self, sandbox_id: str) -> Any:
-        client = self._get_docker_client()
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            self._executor,
-            lambda: client.containers.get(f"claudex-sandbox-{sandbox_id}"),
-        )
-
-    async def _destroy_container(self, container: Any) -> None:
+    async def _destroy_container(self, container_id: str) -> None:
+        docker = self._get_docker_client()
         try:
-            await asyncio.to_thread(container.stop, timeout=5)
+            await docker.stop_container(container_id, timeout=5)
         except Exception:
             pass
         try:
-            await asyncio.to_thread(container.remove, force=True)
+            await docker.remove_container(container_id, force=True)
         except Exception:
             pass
 
-    @staticmethod
-    def _ensure_running(container: Any) -> None:
-        container.reload()
-        if container.status != "running":
-            container.start()
+    async def _ensure_running(
+        self, container_id: str, attrs: dict[str, Any] | None = None
+    ) -> bool:
+        # Returns whether the container had to be resumed.
+        docker = self._get_docker_client()
+        if attrs is None:
+            attrs = await docker.inspect_container(container_id)
+        status = self._container_status(attrs)
+        if status == "paused":
+            await docker.unpause_container(container_id)
+        elif status != "running":
+            await docker.start_container(container_id)
+        else:
+            return False
+        return True
 
-    async def _get_container(self, sandbox_id: str) -> Any:
+    async def _get_container(self, sandbox_id: str) -> str:
         if sandbox_id not in self._containers:
             connected = await self.connect_sandbox(sandbox_id)
             if not connected:
                 raise SandboxException(f"Container {sandbox_id} not found")
 
-        container = self._containers[sandbox_id]
-        loop = asyncio.get_running_loop()
-
-        await loop.run_in_executor(
-            self._executor, lambda: self._ensure_running(container)
-        )
-        return container
+        container_id = self._containers[sandbox_id]
+        await self._ensure_running(container_id)
+        return container_id
 
     async def get_ide_url(self, sandbox_id: str) -> str | None:
         await self.connect_sandbox(sandbox_id)
@@ -564,7 +651,6 @@ class LocalDockerProvider(SandboxProvider):
 
     async def cleanup(self) -> None:
         await super().cleanup()
-        self._executor.shutdown(wait=False)
-        if self._docker_client:
-            self._docker_client.close()
-            self._docker_client = None
+        if self._docker:
+            await self._docker.close()
+            self._docker = None
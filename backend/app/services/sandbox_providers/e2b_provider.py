@@ -200,6 +200,22 @@ class E2BSandboxProvider(SandboxProvider):
         normalized_path = self.normalize_path(path)
         await self._retry_operation(sandbox.files.write, normalized_path, content)
 
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+    ) -> None:
+        if not files:
+            return
+        sandbox = await self._get_sandbox(sandbox_id)
+        # A list of entries is sent as one multipart upload; envd creates
+        # missing parent directories for each entry.
+        entries = [
+            {"path": self.normalize_path(path), "data": content}
+            for path, content in files.items()
+        ]
+        await self._retry_operation(sandbox.files.write, entries)
+
     async def read_file(
         self,
         sandbox_id: str,
@@ -12,6 +12,7 @@ def create_docker_config() -> DockerConfig:
         image=settings.DOCKER_IMAGE,
         network=settings.DOCKER_NETWORK,
         host=settings.DOCKER_HOST,
+        idle_action=settings.SANDBOX_IDLE_ACTION,
     )
 
 
@@ -24,6 +24,23 @@ class FileMetadata:
     is_binary: bool = False
 
 
+@dataclass
+class FileStat:
+    path: str
+    type: str
+    size: int
+    modified: float
+    inode: int
+    is_binary: bool = False
+
+
+@dataclass
+class FileScan:
+    scanned_at: float
+    files: list[FileMetadata]
+    complete: bool = True
+
+
 @dataclass
 class FileContent:
     path: str
@@ -52,6 +69,13 @@ class CheckpointInfo:
     created_at: str
 
 
+@dataclass
+class CheckpointDiff:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+
 @dataclass
 class PreviewLink:
     preview_url: str
@@ -74,6 +98,7 @@ class DockerConfig:
     host: str | None = None  # Docker host (None for local daemon)
     user_home: str = "/home/user"  # User home directory in container
     openvscode_port: int = 8765  # Port for OpenVSCode server
+    idle_action: str = "pause"  # "pause" or "stop" when the reaper idles a sandbox
 
 
 @dataclass
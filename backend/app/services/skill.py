@@ -1,4 +1,3 @@
-import io
 import logging
 import os
 import re
@@ -15,6 +14,8 @@ from app.constants import (
 from app.core.config import get_settings
 from app.models.types import CustomSkillDict, EnabledResourceInfo, YamlMetadata
 from app.services.exceptions import SkillException
+from app.services.resource_bundle import remember_file_digest
+from app.utils.uploads import UploadTooLargeError, spool_upload
 from app.utils.yaml_parser import parse_yaml_frontmatter
 
 settings = get_settings()
@@ -109,40 +110,40 @@ class SkillService:
         if len(current_skills) >= MAX_RESOURCES_PER_USER:
             raise SkillException(f"Maximum {MAX_RESOURCES_PER_USER} skills per user")
 
-        contents = await file.read()
-
-        if len(contents) > MAX_SKILL_SIZE_BYTES:
+        try:
+            spooled = await spool_upload(
+                file, self._get_user_skills_path(user_id), MAX_SKILL_SIZE_BYTES
+            )
+        except UploadTooLargeError:
             raise SkillException(
                 f"Skill package too large (max {MAX_SKILL_SIZE_BYTES / 1024 / 1024}MB)"
             )
 
         try:
-            with zipfile.ZipFile(io.BytesIO(contents)) as zf:
+            with zipfile.ZipFile(spooled.path) as zf:
                 metadata, file_count, total_size = self._validate_zip_structure(zf)
                 skill_name = self.sanitize_name(metadata.get("name", ""))
 
                 if any(s.get("name") == skill_name for s in current_skills):
                     raise SkillException(f"Skill '{skill_name}' already exists")
 
-                final_zip_path = self._get_skill_path(user_id, skill_name)
+            final_zip_path = self._get_skill_path(user_id, skill_name)
+            os.replace(spooled.path, final_zip_path)
+            remember_file_digest(final_zip_path, spooled.sha256)
 
-                if final_zip_path.exists():
-                    os.remove(final_zip_path)
-
-                with open(final_zip_path, "wb") as f:
-                    f.write(contents)
-
-                logger.info(
-                    f"Stored skill ZIP: {skill_name}, "
-                    f"size={len(contents)}, "
-                    f"decompressed_size={total_size}, "
-                    f"files={file_count}"
-                )
+            logger.info(
+                f"Stored skill ZIP: {skill_name}, "
+                f"size={spooled.size}, "
+                f"decompressed_size={total_size}, "
+                f"files={file_count}"
+            )
 
         except zipfile.BadZipFile:
             raise SkillException("Invalid ZIP file")
         except SkillException:
             raise
+        finally:
+            spooled.discard()
 
         return {
             "name": skill_name,
@@ -9,6 +9,7 @@ from app.core.config import get_settings
 from app.models.types import MessageAttachmentDict
 from app.services.exceptions import StorageException
 from app.services.sandbox import SandboxService
+from app.utils.uploads import UploadTooLargeError, spool_upload
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -30,6 +31,43 @@ class StorageService:
         sandbox_id: str | None = None,
         attachment_id: str | None = None,
     ) -> MessageAttachmentDict:
+        attachments = await self.save_files([file], sandbox_id, attachment_id)
+        return attachments[0]
+
+    async def save_files(
+        self,
+        files: list[UploadFile],
+        sandbox_id: str | None = None,
+        attachment_id: str | None = None,
+    ) -> list[MessageAttachmentDict]:
+        attachments: list[MessageAttachmentDict] = []
+        sandbox_files: dict[str, Path] = {}
+
+        for file in files:
+            attachment, physical_file_path = await self._store_locally(
+                file, attachment_id
+            )
+            attachments.append(attachment)
+            sandbox_files[f"/home/user/{physical_file_path.name}"] = physical_file_path
+
+        # Dual-write: files stored locally (for preview API) AND uploaded to sandbox (for AI access).
+        # All attachments of a message go to the sandbox in one batched write.
+        # Sandbox upload failure is logged but not raised - local copy ensures preview still works.
+        if sandbox_id and sandbox_files:
+            try:
+                await self.sandbox_service.upload_files(sandbox_id, sandbox_files)
+            except Exception as e:
+                logger.warning(
+                    "Failed to upload files to sandbox %s: %s", sandbox_id, e
+                )
+
+        return attachments
+
+    async def _store_locally(
+        self,
+        file: UploadFile,
+        attachment_id: str | None,
+    ) -> tuple[MessageAttachmentDict, Path]:
         if file.content_type not in settings.ALLOWED_FILE_TYPES:
             raise StorageException(f"Invalid file type: {file.content_type}")
 
@@ -40,13 +78,6 @@ class StorageService:
         if not content_type:
             raise StorageException("Content type is required")
 
-        contents = await file.read()
-
-        if len(contents) > settings.MAX_UPLOAD_SIZE:
-            raise StorageException(
-                f"File too large: {len(contents)} bytes exceeds {settings.MAX_UPLOAD_SIZE} bytes"
-            )
-
         ext = os.path.splitext(file.filename)[1].lower()
         file_type_config = {
             "application/pdf": ("pdfs", "pdf"),
@@ -65,10 +96,18 @@ class StorageService:
                 f"Unexpected file type: {content_type}. This should have been caught by ALLOWED_FILE_TYPES validation."
             )
 
+        folder_path = self.storage_path / folder
+        try:
+            spooled = await spool_upload(file, folder_path, settings.MAX_UPLOAD_SIZE)
+        except UploadTooLargeError:
+            raise StorageException(
+                f"File too large: exceeds {settings.MAX_UPLOAD_SIZE} bytes"
+            )
+
         unique_filename = f"{uuid4()}{ext}"
 
-        physical_file_path = self.storage_path / folder / unique_filename
-        physical_file_path.write_bytes(contents)
+        physical_file_path = folder_path / unique_filename
+        os.replace(spooled.path, physical_file_path)
 
         relative_file_path = f"{folder}/{unique_filename}"
 
@@ -77,21 +116,10 @@ class StorageService:
         else:
             file_url = f"{settings.BASE_URL}/api/v1/attachments/temp/preview"
 
-        # Dual-write: file stored locally (for preview API) AND uploaded to sandbox (for AI access).
-        # Sandbox upload failure is logged but not raised - local copy ensures preview still works.
-        if sandbox_id:
-            try:
-                sandbox_file_path = f"/home/user/{unique_filename}"
-                await self.sandbox_service.write_file(
-                    sandbox_id=sandbox_id, file_path=sandbox_file_path, content=contents
-                )
-
-            except Exception as e:
-                logger.warning("Failed to upload file to sandbox %s: %s", sandbox_id, e)
-
-        return {
+        attachment: MessageAttachmentDict = {
             "file_url": file_url,
             "file_path": relative_file_path,
             "file_type": file_type,
             "filename": file.filename,
         }
+        return attachment, physical_file_path
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import Literal, TypedDict
 
 from app.models.types import JSONDict, JSONValue
+from app.utils.json_codec import json_codec
 
 
 StreamEventType = Literal[
@@ -26,6 +27,8 @@ class ToolPayload(TypedDict, total=False):
     parent_id: str | None
     input: JSONDict | None
     result: JSONValue
+    truncated_chars: int
+    result_ref: str
     error: str
 
 
@@ -57,3 +60,22 @@ class ActiveToolState:
             "input": self.input or None,
         }
         return payload
+
+
+class EncodedEvent:
+    # A stream event encoded once when it is emitted. The Redis stream entry,
+    # the snapshot and the stored message content are all assembled from this
+    # encoding instead of re-serializing the event for each of them.
+    __slots__ = ("event", "json")
+
+    def __init__(self, event: StreamEvent) -> None:
+        self.event = event
+        self.json = json_codec.dumps(event)
+
+    @property
+    def stream_payload(self) -> str:
+        return '{"event":' + self.json + "}"
+
+
+def encode_event_log(events: list[EncodedEvent]) -> str:
+    return "[" + ",".join(event.json for event in events) + "]"
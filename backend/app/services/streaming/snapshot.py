@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from app.constants import REDIS_KEY_CHAT_SNAPSHOT
+from app.core.config import get_settings
+from app.services.streaming.events import EncodedEvent, StreamEvent
+from app.utils.json_codec import json_codec
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+settings = get_settings()
+
+TOOL_EVENT_TYPES = frozenset({"tool_started", "tool_completed", "tool_failed"})
+
+
+class StreamSnapshot:
+    # Compacted view of the in-progress assistant message. Adjacent text deltas
+    # are merged and tool updates are folded into the event that first
+    # introduced the tool, which is how the frontend renders the event log
+    # anyway, so the snapshot renders the same as the full log it replaces.
+    # Untouched entries reuse the event's own encoding; merged ones are
+    # re-encoded lazily when the snapshot is next written.
+    def __init__(self) -> None:
+        self._events: list[StreamEvent] = []
+        self._encoded: list[str | None] = []
+        self._tool_index: dict[str, int] = {}
+
+    @property
+    def events(self) -> list[StreamEvent]:
+        return self._events
+
+    def add(self, encoded: EncodedEvent) -> None:
+        event = encoded.event
+        event_type = event.get("type")
+
+        if event_type == "assistant_text" and self._events:
+            last = self._events[-1]
+            if last.get("type") == "assistant_text":
+                self._replace(
+                    len(self._events) - 1,
+                    {**last, "text": last.get("text", "") + event.get("text", "")},
+                )
+                return
+
+        if event_type in TOOL_EVENT_TYPES and "tool" in event:
+            tool_id = event["tool"].get("id")
+            index = self._tool_index.get(tool_id) if tool_id else None
+            if index is not None:
+                previous = self._events[index]
+                self._replace(
+                    index,
+                    {**event, "tool": {**previous.get("tool", {}), **event["tool"]}},
+                )
+                return
+            if tool_id:
+                self._tool_index[tool_id] = len(self._events)
+
+        self._events.append(event)
+        self._encoded.append(encoded.json)
+
+    def encode(self) -> str:
+        parts: list[str] = []
+        for index, encoded in enumerate(self._encoded):
+            if encoded is None:
+                encoded = json_codec.dumps(self._events[index])
+                self._encoded[index] = encoded
+            parts.append(encoded)
+        return "[" + ",".join(parts) + "]"
+
+    def _replace(self, index: int, event: StreamEvent) -> None:
+        self._events[index] = event
+        self._encoded[index] = None
+
+
+async def save_stream_snapshot(
+    redis: Redis[str], chat_id: str, event_id: str, events_json: str
+) -> None:
+    key = REDIS_KEY_CHAT_SNAPSHOT.format(chat_id=chat_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={"id": event_id, "events": events_json})
+        pipe.expire(key, settings.TASK_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def load_stream_snapshot(
+    redis: Redis[str], chat_id: str
+) -> tuple[str, str] | None:
+    # Returns the stream id the snapshot covers and its events as JSON, ready
+    # to be sent without decoding.
+    snapshot = await redis.hgetall(REDIS_KEY_CHAT_SNAPSHOT.format(chat_id=chat_id))
+    if not snapshot.get("id") or "events" not in snapshot:
+        return None
+    return snapshot["id"], snapshot["events"]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from app.constants import REDIS_KEY_CHAT_STATE, REDIS_KEY_CHAT_STREAM
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+settings = get_settings()
+
+# Per-chat stream state lives in one hash (status, task_id, message_id,
+# last_event_id, heartbeat) so "is this chat still streaming?" is a single
+# HGETALL. Terminal statuses reuse MessageStreamStatus values.
+STREAM_STATE_QUEUED = "queued"
+STREAM_STATE_STREAMING = "streaming"
+ACTIVE_STREAM_STATES = frozenset({STREAM_STATE_QUEUED, STREAM_STATE_STREAMING})
+
+# Appends an entry to the chat stream and records its id in the state hash in
+# the same step, so the advertised last_event_id never runs ahead of or behind
+# the stream. The state hash is only touched if a turn created it.
+# KEYS: stream, state. ARGV: maxlen, heartbeat, status ('' keeps it), fields...
+APPEND_STREAM_EVENT_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', unpack(ARGV, 4))
+if redis.call('EXISTS', KEYS[2]) == 1 then
+  redis.call('HSET', KEYS[2], 'last_event_id', id, 'heartbeat', ARGV[2])
+  if ARGV[3] ~= '' then
+    redis.call('HSET', KEYS[2], 'status', ARGV[3])
+  end
+end
+return id
+"""
+
+
+async def append_stream_event(
+    redis: Redis[str],
+    chat_id: str,
+    fields: dict[str, str],
+    maxlen: int,
+    status: str | None = None,
+) -> str:
+    args: list[str | int | float] = [maxlen, time.time(), status or ""]
+    for name, value in fields.items():
+        args.extend((name, value))
+    event_id: str = await redis.eval(  # type: ignore[misc]
+        APPEND_STREAM_EVENT_SCRIPT,
+        2,
+        REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id),
+        REDIS_KEY_CHAT_STATE.format(chat_id=chat_id),
+        *args,
+    )
+    return event_id
+
+
+async def set_stream_state(redis: Redis[str], chat_id: str, **fields: str) -> None:
+    key = REDIS_KEY_CHAT_STATE.format(chat_id=chat_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={**fields, "heartbeat": str(time.time())})
+        pipe.expire(key, settings.TASK_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def touch_stream_state(redis: Redis[str], chat_id: str) -> None:
+    key = REDIS_KEY_CHAT_STATE.format(chat_id=chat_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(key, "heartbeat", str(time.time()))
+        pipe.expire(key, settings.TASK_TTL_SECONDS)
+        await pipe.execute()
+
+
+def is_heartbeat_fresh(state: dict[str, str]) -> bool:
+    try:
+        heartbeat = float(state.get("heartbeat", 0))
+    except ValueError:
+        return False
+    return time.time() - heartbeat < settings.CHAT_STREAM_HEARTBEAT_TIMEOUT_SECONDS
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import zlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, cast
+
+from app.constants import REDIS_KEY_TASK_CONTEXT, REDIS_KEY_TASK_PROMPT
+from app.core.config import get_settings
+from app.models.types import ChatTaskContextDict
+from app.services.exceptions import ChatException
+from app.utils.redis import redis_binary_connection
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+settings = get_settings()
+
+TASK_CONTEXT_VERSION = b"v1:"
+TASK_CONTEXT_HASH_LENGTH = 32
+PROMPT_CACHE_SIZE = 256
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:TASK_CONTEXT_HASH_LENGTH]
+
+
+def _encode(data: bytes) -> bytes:
+    return TASK_CONTEXT_VERSION + zlib.compress(data)
+
+
+def _decode(blob: bytes) -> bytes:
+    if not blob.startswith(TASK_CONTEXT_VERSION):
+        raise ChatException("Unsupported task context version")
+    return zlib.decompress(blob[len(TASK_CONTEXT_VERSION) :])
+
+
+class TaskContextStore:
+    # Chat turns are handed to Celery by reference: the API stores the turn
+    # context once, compressed, and the task message only carries its hash.
+    # The rendered system prompt is stored separately under its own hash since
+    # it rarely changes between turns, which lets workers keep it in memory.
+    def __init__(self) -> None:
+        self._prompts: OrderedDict[str, str] = OrderedDict()
+
+    async def save(self, context: ChatTaskContextDict) -> str:
+        system_prompt = context["system_prompt"].encode()
+        prompt_hash = _content_hash(system_prompt)
+
+        payload: dict[str, Any] = {
+            key: value for key, value in context.items() if key != "system_prompt"
+        }
+        payload["system_prompt_hash"] = prompt_hash
+        serialized = json.dumps(payload, sort_keys=True).encode()
+        context_hash = _content_hash(serialized)
+
+        async with redis_binary_connection() as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(
+                    REDIS_KEY_TASK_PROMPT.format(prompt_hash=prompt_hash),
+                    _encode(system_prompt),
+                    ex=settings.TASK_CONTEXT_TTL_SECONDS,
+                )
+                pipe.set(
+                    REDIS_KEY_TASK_CONTEXT.format(context_hash=context_hash),
+                    _encode(serialized),
+                    ex=settings.TASK_CONTEXT_TTL_SECONDS,
+                )
+                await pipe.execute()
+
+        return context_hash
+
+    async def load(self, context_hash: str) -> ChatTaskContextDict:
+        async with redis_binary_connection() as redis:
+            blob = await redis.get(
+                REDIS_KEY_TASK_CONTEXT.format(context_hash=context_hash)
+            )
+            if blob is None:
+                raise ChatException(f"Task context {context_hash} not found")
+
+            serialized = _decode(blob)
+            if _content_hash(serialized) != context_hash:
+                raise ChatException(f"Task context {context_hash} is corrupted")
+
+            payload = json.loads(serialized)
+            prompt_hash = payload.pop("system_prompt_hash")
+            payload["system_prompt"] = await self._load_prompt(redis, prompt_hash)
+
+        return cast(ChatTaskContextDict, payload)
+
+    async def _load_prompt(self, redis: "Redis[bytes]", prompt_hash: str) -> str:
+        cached = self._prompts.get(prompt_hash)
+        if cached is not None:
+            self._prompts.move_to_end(prompt_hash)
+            return cached
+
+        blob = await redis.get(REDIS_KEY_TASK_PROMPT.format(prompt_hash=prompt_hash))
+        if blob is None:
+            raise ChatException(f"System prompt {prompt_hash} not found")
+
+        prompt = _decode(blob).decode()
+        self._prompts[prompt_hash] = prompt
+        if len(self._prompts) > PROMPT_CACHE_SIZE:
+            self._prompts.popitem(last=False)
+        return prompt
+
+
+task_context_store = TaskContextStore()
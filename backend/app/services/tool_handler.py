@@ -1,15 +1,20 @@
 import json
 import logging
-from copy import deepcopy
 from typing import Literal, cast
 
 from claude_agent_sdk.types import ToolUseBlock
 
+from app.core.config import get_settings
 from app.models.types import JSONValue
 from app.services.streaming.events import ActiveToolState, StreamEvent
+from app.utils.json_codec import json_codec
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Strings this short are cheap to try as JSON scalars ("42", "true", "null").
+JSON_SCALAR_MAX_CHARS = 32
+
 
 def _default_tool_title(tool_name: str) -> str:
     if tool_name.startswith("mcp__"):
@@ -19,6 +24,72 @@ def _default_tool_title(tool_name: str) -> str:
     return tool_name
 
 
+def _looks_like_json(text: str) -> bool:
+    first, last = text[0], text[-1]
+    return (
+        (first == "{" and last == "}")
+        or (first == "[" and last == "]")
+        or (first == '"' and last == '"')
+        or len(text) <= JSON_SCALAR_MAX_CHARS
+    )
+
+
+class ResultNormalizer:
+    # Tool outputs often contain stringified JSON that the UI wants as objects,
+    # so strings that look like JSON are parsed. Everything is bounded: strings
+    # share one character budget (the rest is cut off and counted in
+    # truncated_chars) and nesting past max_depth is kept as JSON text that
+    # draws on the same budget. Parsing is only attempted when the string's
+    # first and last characters could delimit a JSON value, so a large log or
+    # file listing is never fed to the parser.
+    def __init__(self, max_chars: int, max_depth: int) -> None:
+        self.truncated_chars = 0
+        self._remaining = max_chars
+        self._max_depth = max_depth
+
+    def normalize(self, value: JSONValue, depth: int = 0) -> JSONValue:
+        if value is None:
+            return None
+
+        if depth > self._max_depth:
+            if isinstance(value, (list, dict)):
+                return self._truncate(json_codec.dumps(value))
+            if isinstance(value, str):
+                return self._truncate(value)
+            return value
+
+        if isinstance(value, list):
+            return [self.normalize(item, depth + 1) for item in value]
+
+        if isinstance(value, dict):
+            return {key: self.normalize(item, depth + 1) for key, item in value.items()}
+
+        if isinstance(value, str):
+            return self._normalize_string(value)
+
+        return value
+
+    def _truncate(self, value: str) -> str:
+        if len(value) > self._remaining:
+            self.truncated_chars += len(value) - self._remaining
+            value = value[: self._remaining]
+        self._remaining -= len(value)
+        return value
+
+    def _normalize_string(self, value: str) -> JSONValue:
+        if len(value) > self._remaining:
+            return self._truncate(value).strip()
+
+        self._remaining -= len(value)
+        text = value.strip()
+        if not text or not _looks_like_json(text):
+            return text
+        try:
+            return cast(JSONValue, json_codec.loads(text))
+        except ValueError:
+            return text
+
+
 class ToolHandlerRegistry:
     def __init__(self) -> None:
         self._active: dict[str, ActiveToolState] = {}
@@ -32,19 +103,18 @@ class ToolHandlerRegistry:
         if not content_block.id:
             return None
 
-        input_copy = None
+        # The SDK hands over a fresh dict per block and nothing downstream
+        # mutates it; events are encoded as soon as they are emitted.
+        tool_input = None
         if hasattr(content_block, "input") and isinstance(content_block.input, dict):
-            try:
-                input_copy = deepcopy(content_block.input)
-            except Exception:
-                input_copy = dict(content_block.input)
+            tool_input = content_block.input
 
         tool_state = ActiveToolState(
             id=content_block.id,
             name=content_block.name,
             title=_default_tool_title(content_block.name),
             parent_id=parent_tool_id,
-            input=input_copy,
+            input=tool_input,
         )
 
         self._active[content_block.id] = tool_state
@@ -81,10 +151,23 @@ class ToolHandlerRegistry:
         payload["status"] = "failed" if is_error else "completed"
 
         if is_error:
-            payload["error"] = self._stringify_result(raw_result)
+            error = self._stringify_result(raw_result)
+            if len(error) > settings.TOOL_RESULT_MAX_CHARS:
+                payload["truncated_chars"] = len(error) - settings.TOOL_RESULT_MAX_CHARS
+                payload["result_ref"] = tool_use_id
+                error = error[: settings.TOOL_RESULT_MAX_CHARS]
+            payload["error"] = error
         else:
-            normalized = self._normalize_result(raw_result)
-            payload["result"] = normalized
+            normalizer = ResultNormalizer(
+                settings.TOOL_RESULT_MAX_CHARS, settings.TOOL_RESULT_MAX_DEPTH
+            )
+            payload["result"] = normalizer.normalize(raw_result)
+            if normalizer.truncated_chars:
+                # The untruncated output stays in the agent's session
+                # transcript; GET /chats/{chat_id}/tool-results/{result_ref}
+                # reads it back from there.
+                payload["truncated_chars"] = normalizer.truncated_chars
+                payload["result_ref"] = tool_use_id
 
         event_type: Literal["tool_failed", "tool_completed"] = (
             "tool_failed" if is_error else "tool_completed"
@@ -92,30 +175,6 @@ class ToolHandlerRegistry:
         event: StreamEvent = {"type": event_type, "tool": payload}
         return event
 
-    def _normalize_result(self, result: JSONValue) -> JSONValue:
-        # Recursively normalizes tool results, attempting to parse JSON-encoded strings.
-        # Tool outputs often contain stringified JSON that needs to be converted to objects
-        # for proper display. Silently falls back to raw string if parsing fails.
-        if result is None:
-            return None
-
-        if isinstance(result, list):
-            return [self._normalize_result(item) for item in result]
-
-        if isinstance(result, dict):
-            return {key: self._normalize_result(value) for key, value in result.items()}
-
-        if isinstance(result, str):
-            text = result.strip()
-            if not text:
-                return ""
-            try:
-                return cast(JSONValue, json.loads(text))
-            except json.JSONDecodeError:
-                return text
-
-        return result
-
     def _stringify_result(self, result: JSONValue) -> str:
         if isinstance(result, str):
             return result
@@ -1,4 +1,5 @@
 from app.services.transports.docker import DockerSandboxTransport
 from app.services.transports.e2b import E2BSandboxTransport
+from app.services.transports.resident import ResidentSession
 
-__all__ = ["DockerSandboxTransport", "E2BSandboxTransport"]
+__all__ = ["DockerSandboxTransport", "E2BSandboxTransport", "ResidentSession"]
@@ -14,6 +14,12 @@ from claude_agent_sdk._internal.transport import Transport
 from claude_agent_sdk._version import __version__ as sdk_version
 from claude_agent_sdk.types import ClaudeAgentOptions
 
+from app.services.transports.resident import (
+    RESIDENT_ATTACH_MESSAGE_TYPE,
+    RESIDENT_ATTACH_TIMEOUT_SECONDS,
+    ResidentSession,
+)
+
 DEFAULT_MAX_BUFFER_SIZE = 1024 * 1024 * 10  # 10MB
 STDOUT_QUEUE_MAXSIZE = 32
 ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
@@ -28,6 +34,7 @@ class BaseSandboxTransport(Transport, ABC):
         sandbox_id: str,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        resident: ResidentSession | None = None,
     ) -> None:
         self._sandbox_id = sandbox_id
         self._prompt = prompt
@@ -46,6 +53,9 @@ class BaseSandboxTransport(Transport, ABC):
         self._ready = False
         self._exit_error: Exception | None = None
         self._stdin_closed = False
+        self._resident = resident
+        self._attached = asyncio.Event()
+        self.reused = False
 
     async def __aenter__(self) -> Self:
         return self
@@ -79,6 +89,8 @@ class BaseSandboxTransport(Transport, ABC):
             "PYTHONUNBUFFERED": "1",
         }
         envs.update(self._options.env or {})
+        if self._resident:
+            envs.update(self._resident.file_envs())
         cwd = str(self._options.cwd) if self._options.cwd else "/home/user"
         user = self._options.user or "user"
         return envs, cwd, user
@@ -131,6 +143,15 @@ class BaseSandboxTransport(Transport, ABC):
         if not self._ready or not self._is_connection_ready():
             raise CLIConnectionError("Transport is not ready for writing")
         self._ensure_input_open()
+        if self._resident:
+            try:
+                await asyncio.wait_for(
+                    self._attached.wait(), RESIDENT_ATTACH_TIMEOUT_SECONDS
+                )
+            except TimeoutError:
+                raise CLIConnectionError("Timed out attaching to Claude CLI")
+            if self.reused and await self._answer_initialize(data):
+                return
         try:
             await self._send_data(data)
         except CLIConnectionError:
@@ -146,19 +167,56 @@ class BaseSandboxTransport(Transport, ABC):
             return
         if self._stdin_closed:
             return
+        if self._resident:
+            # The CLI outlives this turn, so its input is never closed.
+            self._stdin_closed = True
+            return
         try:
             await self._send_eof()
             self._stdin_closed = True
         except Exception:
             pass
 
+    async def _answer_initialize(self, data: str) -> bool:
+        # A reused CLI was initialized by the turn that started it and doesn't
+        # expect the handshake again, so the SDK's request is answered here.
+        if '"initialize"' not in data:
+            return False
+        message = json.loads(data)
+        if message.get("type") != "control_request" or (
+            message.get("request", {}).get("subtype") != "initialize"
+        ):
+            return False
+        response = {
+            "type": "control_response",
+            "response": {
+                "subtype": "success",
+                "request_id": message.get("request_id"),
+                "response": {},
+            },
+        }
+        await self._stdout_queue.put(json.dumps(response) + "\n")
+        return True
+
+    def _build_launch_command(self, envs: dict[str, str], cwd: str, user: str) -> str:
+        if not self._resident:
+            return self._build_command()
+        return self._resident.attach_command(
+            cli_command=self._build_command(),
+            fingerprint_command=self._build_command(include_resume=False),
+            envs=envs,
+            cwd=cwd,
+            user=user,
+            resume=self._options.resume,
+        )
+
     def read_messages(self) -> AsyncIterator[dict[str, Any]]:
         return self._parse_cli_output()
 
     def is_ready(self) -> bool:
         return self._ready
 
-    def _build_command(self) -> str:
+    def _build_command(self, include_resume: bool = True) -> str:
         cli_binary = str(self._options.cli_path) if self._options.cli_path else "claude"
         cmd = [cli_binary, "--output-format", "stream-json", "--verbose"]
 
@@ -198,7 +256,7 @@ class BaseSandboxTransport(Transport, ABC):
         if self._options.continue_conversation:
             cmd.append("--continue")
 
-        if self._options.resume:
+        if include_resume and self._options.resume:
             cmd.extend(["--resume", self._options.resume])
 
         if self._options.settings:
@@ -300,6 +358,7 @@ class BaseSandboxTransport(Transport, ABC):
             chunk = await self._stdout_queue.get()
 
             if chunk is self._SENTINEL:
+                self._attached.set()
                 break
             if not isinstance(chunk, str):
                 continue
@@ -342,6 +401,13 @@ class BaseSandboxTransport(Transport, ABC):
                 json_buffer, parsed_messages = self._parse_json_buffer(json_buffer)
                 if parsed_messages:
                     for data in parsed_messages:
+                        if (
+                            isinstance(data, dict)
+                            and data.get("type") == RESIDENT_ATTACH_MESSAGE_TYPE
+                        ):
+                            self.reused = bool(data.get("reused"))
+                            self._attached.set()
+                            continue
                         yield data
                         if isinstance(data, dict) and data.get("type") == "result":
                             json_buffer = ""
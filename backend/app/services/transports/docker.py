@@ -1,19 +1,27 @@
 import asyncio
 import logging
-import select
+import time
 from collections.abc import AsyncIterable
-from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from typing import Any
 
 from claude_agent_sdk._errors import CLIConnectionError, ProcessError
 from claude_agent_sdk.types import ClaudeAgentOptions
 
+from app.services.sandbox_providers.docker_engine import (
+    STREAM_STDERR,
+    STREAM_STDOUT,
+    DockerEngineClient,
+    ExecStream,
+)
 from app.services.sandbox_providers.types import DockerConfig
 from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.resident import ResidentSession
 
 logger = logging.getLogger(__name__)
 
+EXEC_EXIT_EVENT_TIMEOUT_SECONDS = 10
+
 
 class DockerSandboxTransport(BaseSandboxTransport):
     def __init__(
@@ -23,74 +31,64 @@ class DockerSandboxTransport(BaseSandboxTransport):
         docker_config: DockerConfig,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        resident: ResidentSession | None = None,
     ) -> None:
-        super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
+        super().__init__(
+            sandbox_id=sandbox_id, prompt=prompt, options=options, resident=resident
+        )
         self._docker_config = docker_config
-        self._executor = ThreadPoolExecutor(max_workers=4)
-        self._docker_client: Any = None
-        self._container: Any = None
+        self._docker: DockerEngineClient | None = None
+        self._container_id: str | None = None
         self._exec_id: str | None = None
-        self._socket: Any = None
+        self._stream: ExecStream | None = None
+        self._stream_eof = asyncio.Event()
+        self._exec_started_at: float | None = None
         self._reader_task: asyncio.Task[None] | None = None
 
     def _get_logger(self) -> Any:
         return logger
 
-    def _get_docker_client(self) -> Any:
-        if self._docker_client is None:
+    def _get_docker_client(self) -> DockerEngineClient:
+        if self._docker is None:
             try:
-                import docker
-
-                if self._docker_config.host:
-                    self._docker_client = docker.DockerClient(
-                        base_url=self._docker_config.host
-                    )
-                else:
-                    self._docker_client = docker.from_env()
-            except ImportError:
-                raise CLIConnectionError(
-                    "Docker SDK not installed. Run: pip install docker"
-                )
+                self._docker = DockerEngineClient(self._docker_config.host)
             except Exception as e:
                 raise CLIConnectionError(f"Failed to connect to Docker: {e}")
-        return self._docker_client
+        return self._docker
 
-    def _get_container(self) -> Any:
-        client = self._get_docker_client()
+    async def _get_container(self) -> str:
+        docker = self._get_docker_client()
         try:
-            container = client.containers.get(f"claudex-sandbox-{self._sandbox_id}")
-            container.reload()
-            if container.status != "running":
-                container.start()
-            return container
+            attrs = await docker.inspect_container(
+                f"claudex-sandbox-{self._sandbox_id}"
+            )
+            container_id = str(attrs["Id"])
+            if (attrs.get("State") or {}).get("Status") != "running":
+                await docker.start_container(container_id)
+            return container_id
         except Exception as e:
             raise CLIConnectionError(
                 f"Failed to connect to sandbox {self._sandbox_id}: {e}"
             )
 
-    def _create_exec(
+    async def _create_exec(
         self,
         command_line: str,
         envs: dict[str, str],
         cwd: str,
         user: str,
-    ) -> tuple[str, Any]:
-        exec_result = self._container.client.api.exec_create(
-            self._container.id,
-            cmd=["bash", "-c", command_line],
-            stdin=True,
-            tty=False,
-            environment=envs,
+    ) -> tuple[str, ExecStream]:
+        assert self._container_id is not None
+        docker = self._get_docker_client()
+        exec_id = await docker.exec_create(
+            self._container_id,
+            ["bash", "-c", command_line],
+            env=envs,
             workdir=cwd,
             user=user,
+            stdin=True,
         )
-        exec_id = exec_result["Id"]
-        socket = self._container.client.api.exec_start(
-            exec_id,
-            socket=True,
-            tty=False,
-        )
-        return exec_id, socket
+        return exec_id, await docker.exec_attach(exec_id)
 
     async def connect(self) -> None:
         if self._ready:
@@ -100,22 +98,21 @@ class DockerSandboxTransport(BaseSandboxTransport):
         loop = asyncio.get_running_loop()
 
         try:
-            self._container = await loop.run_in_executor(
-                self._executor, self._get_container
-            )
+            self._container_id = await self._get_container()
         except Exception as exc:
             raise CLIConnectionError(
                 f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
             ) from exc
 
-        command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
         envs["TERM"] = "xterm-256color"
+        command_line = self._build_launch_command(envs, cwd, user)
 
+        self._stream_eof.clear()
+        self._exec_started_at = time.time()
         try:
-            self._exec_id, self._socket = await loop.run_in_executor(
-                self._executor,
-                lambda: self._create_exec(command_line, envs, cwd, user),
+            self._exec_id, self._stream = await self._create_exec(
+                command_line, envs, cwd, user
             )
         except Exception as exc:
             raise CLIConnectionError(f"Failed to start Claude CLI: {exc}") from exc
@@ -125,178 +122,119 @@ class DockerSandboxTransport(BaseSandboxTransport):
         self._ready = True
 
     def _is_connection_ready(self) -> bool:
-        return self._socket is not None
+        return self._stream is not None
 
     async def _cleanup_resources(self) -> None:
         await self._cancel_task(self._reader_task)
         self._reader_task = None
 
-        if self._socket:
+        if self._stream:
             with suppress(Exception):
-                self._socket.close()
-            self._socket = None
+                await self._stream.close()
+            self._stream = None
 
         self._exec_id = None
+        self._container_id = None
 
-        if self._docker_client:
+        if self._docker:
             with suppress(Exception):
-                self._docker_client.close()
-            self._docker_client = None
-
-        await asyncio.to_thread(self._executor.shutdown, wait=True)
+                await self._docker.close()
+            self._docker = None
 
     async def _send_data(self, data: str) -> None:
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(
-            self._executor, lambda: self._socket_send(data.encode("utf-8"))
-        )
+        if self._stream:
+            await self._stream.write(data.encode("utf-8"))
 
     async def _send_eof(self) -> None:
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(self._executor, lambda: self._socket_send(b"\x04"))
-
-    def _get_socket_fd(self) -> int | None:
-        if not self._socket:
-            return None
-        if hasattr(self._socket, "fileno"):
-            try:
-                return int(self._socket.fileno())
-            except Exception:
-                pass
-        if hasattr(self._socket, "_sock"):
-            try:
-                return int(self._socket._sock.fileno())
-            except Exception:
-                pass
-        return None
-
-    def _recv_with_select(self, timeout: float) -> bytes | None:
-        fd = self._get_socket_fd()
-        if fd is None:
-            return None
-        try:
-            readable, _, _ = select.select([fd], [], [], timeout)
-            if not readable:
-                return b""
-            return self._socket_recv(4096)
-        except Exception:
-            return None
+        if self._stream:
+            await self._stream.write(b"\x04")
 
     async def _read_socket_data(self) -> None:
-        loop = asyncio.get_running_loop()
-        buffer = b""
-        drain_empty_count = 0
+        if not self._stream:
+            return
 
         try:
-            while True:
-                timeout = 5.0 if self._ready else 0.2
-                data = await loop.run_in_executor(
-                    self._executor, self._recv_with_select, timeout
-                )
-                if data is None:
-                    break
-                if len(data) == 0:
-                    if not self._ready:
-                        drain_empty_count += 1
-                        if drain_empty_count >= 5:
-                            break
+            while (frame := await self._stream.read_frame()) is not None:
+                stream_type, payload = frame
+
+                if len(payload) > self._max_buffer_size:
+                    logger.warning(
+                        "Dropping %d byte frame from sandbox %s",
+                        len(payload),
+                        self._sandbox_id,
+                    )
                     continue
-                drain_empty_count = 0
-
-                buffer += data
-
-                while len(buffer) >= 8:
-                    stream_type = buffer[0]
-                    frame_size = int.from_bytes(buffer[4:8], byteorder="big")
-
-                    if frame_size > self._max_buffer_size:
-                        buffer = b""
-                        break
 
-                    if len(buffer) < 8 + frame_size:
-                        break
-
-                    payload = buffer[8 : 8 + frame_size]
-                    buffer = buffer[8 + frame_size :]
-
-                    if stream_type == 1:
-                        decoded = payload.decode("utf-8", errors="replace")
-                        await self._stdout_queue.put(decoded)
-                    elif stream_type == 2 and self._options.stderr:
-                        try:
-                            self._options.stderr(
-                                payload.decode("utf-8", errors="replace")
-                            )
-                        except Exception:
-                            pass
+                if stream_type == STREAM_STDOUT:
+                    decoded = payload.decode("utf-8", errors="replace")
+                    await self._stdout_queue.put(decoded)
+                elif stream_type == STREAM_STDERR and self._options.stderr:
+                    try:
+                        self._options.stderr(payload.decode("utf-8", errors="replace"))
+                    except Exception:
+                        pass
         except asyncio.CancelledError:
             pass
         except Exception as e:
             logger.error("Socket reader error: %s", e)
         finally:
-            await self._put_sentinel()
+            # The monitor reports the exit status and ends the output.
+            self._stream_eof.set()
 
-    def _socket_recv(self, size: int) -> bytes:
-        if not self._socket:
-            return b""
-        if hasattr(self._socket, "recv"):
-            return bytes(self._socket.recv(size))
-        if hasattr(self._socket, "read"):
-            return bytes(self._socket.read(size))
-        if hasattr(self._socket, "_sock"):
-            return bytes(self._socket._sock.recv(size))
-        raise CLIConnectionError("Socket does not support recv/read")
-
-    def _socket_send(self, payload: bytes) -> None:
-        if not self._socket:
-            return
-        if hasattr(self._socket, "sendall"):
-            self._socket.sendall(payload)
-            return
-        if hasattr(self._socket, "send"):
-            self._socket.send(payload)
-            return
-        if hasattr(self._socket, "_sock"):
-            self._socket._sock.sendall(payload)
-            return
-        raise CLIConnectionError("Socket does not support send")
-
-    def _get_exec_info(self) -> dict[str, Any] | None:
+    async def _get_exec_info(self) -> dict[str, Any] | None:
+        if not self._docker or not self._exec_id:
+            return None
         try:
-            result: dict[str, Any] = self._container.client.api.exec_inspect(
-                self._exec_id
-            )
-            return result
+            return await self._docker.exec_inspect(self._exec_id)
         except Exception as e:
             logger.warning("exec_inspect failed for exec_id %s: %s", self._exec_id, e)
             return None
 
+    async def _wait_for_exec_exit(self) -> dict[str, Any] | None:
+        # The stream can reach EOF just before the daemon records the exit, so
+        # wait for the exec's die event (replayed from connect time) instead of
+        # polling inspect.
+        assert self._docker is not None and self._container_id is not None
+        with suppress(TimeoutError):
+            async with asyncio.timeout(EXEC_EXIT_EVENT_TIMEOUT_SECONDS):
+                async for event in self._docker.events(
+                    {
+                        "type": ["container"],
+                        "event": ["exec_die"],
+                        "container": [self._container_id],
+                    },
+                    since=(self._exec_started_at or time.time()) - 1,
+                ):
+                    attributes = (event.get("Actor") or {}).get("Attributes") or {}
+                    if attributes.get("execID") == self._exec_id:
+                        break
+        return await self._get_exec_info()
+
     async def _monitor_process(self) -> None:
-        if not self._exec_id or not self._container:
+        if not self._exec_id or not self._container_id:
             return
 
-        loop = asyncio.get_running_loop()
-
         try:
-            while self._ready:
-                await asyncio.sleep(0.5)
+            await self._stream_eof.wait()
+
+            info = await self._get_exec_info()
+            if info is not None and info.get("Running"):
+                info = await self._wait_for_exec_exit()
 
-                info = await loop.run_in_executor(self._executor, self._get_exec_info)
-                if info is None:
-                    self._exit_error = CLIConnectionError(
-                        "Claude CLI process disappeared"
+            if info is None:
+                self._exit_error = CLIConnectionError("Claude CLI process disappeared")
+            elif info.get("Running"):
+                self._exit_error = CLIConnectionError(
+                    "Claude CLI output closed while the process is still running"
+                )
+            else:
+                exit_code = info.get("ExitCode", -1)
+                if exit_code != 0:
+                    self._exit_error = ProcessError(
+                        "Claude CLI exited with an error",
+                        exit_code=exit_code,
+                        stderr="",
                     )
-                    break
-
-                if not info.get("Running", True):
-                    exit_code = info.get("ExitCode", -1)
-                    if exit_code != 0:
-                        self._exit_error = ProcessError(
-                            "Claude CLI exited with an error",
-                            exit_code=exit_code,
-                            stderr="",
-                        )
-                    break
         except asyncio.CancelledError:
             pass
         except Exception as exc:
@@ -304,4 +242,5 @@ class DockerSandboxTransport(BaseSandboxTransport):
                 f"Claude CLI stopped unexpectedly: {exc}"
             )
         finally:
+            await self._put_sentinel()
             self._ready = False
@@ -12,6 +12,7 @@ from e2b.sandbox_async.commands.command_handle import AsyncCommandHandle
 
 from app.constants import SANDBOX_AUTO_PAUSE_TIMEOUT
 from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.resident import ResidentSession
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +25,11 @@ class E2BSandboxTransport(BaseSandboxTransport):
         api_key: str,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        resident: ResidentSession | None = None,
     ) -> None:
-        super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
+        super().__init__(
+            sandbox_id=sandbox_id, prompt=prompt, options=options, resident=resident
+        )
         self._api_key = api_key
         self._sandbox: AsyncSandbox | None = None
         self._command: AsyncCommandHandle | None = None
@@ -49,8 +53,8 @@ class E2BSandboxTransport(BaseSandboxTransport):
                 f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
             ) from exc
 
-        command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
+        command_line = self._build_launch_command(envs, cwd, user)
 
         async def on_stdout(data: str) -> None:
             await self._stdout_queue.put(data)
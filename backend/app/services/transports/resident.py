@@ -0,0 +1,154 @@
+import hashlib
+import json
+import shlex
+from dataclasses import dataclass, field
+
+RESIDENT_ROOT = "/tmp/claudex-agents"
+RESIDENT_FILE_ENV_PREFIX = "CLAUDEX_FILE_"
+RESIDENT_ATTACH_TIMEOUT_SECONDS = 60
+RESIDENT_ATTACH_MESSAGE_TYPE = "claudex_attach"
+
+# Runs detached in its own process group and owns the CLI. Input arrives on a
+# FIFO held open read-write so detaching turns never deliver EOF to the CLI,
+# and output is appended to a log that each turn tails from its own offset.
+# The session id of every result is recorded for the next turn's resume check.
+# The process group exits after idle_timeout without an attached turn, or as
+# soon as a turn is abandoned mid-flight.
+SUPERVISOR_SCRIPT = r"""
+dir=$1 idle_timeout=$2 cli=$3
+exec 3<>"$dir/in"
+bash -c "$cli" <&3 2>>"$dir/err" | tee -a "$dir/out" \
+  | sed -un '/"type":"result"/s/.*"session_id":"\([^"]*\)".*/\1/p' \
+  | while read -r session; do
+      printf '%s' "$session" > "$dir/session"
+      rm -f "$dir/busy"
+    done &
+printf '%s' $$ > "$dir/pid.tmp" && mv "$dir/pid.tmp" "$dir/pid"
+while sleep 5; do
+  [ -n "$(jobs -r)" ] || break
+  attached=false
+  for marker in "$dir"/attach.*; do
+    [ -e "$marker" ] && kill -0 "${marker##*.}" 2>/dev/null && attached=true
+  done
+  $attached && continue
+  [ -e "$dir/busy" ] && break
+  last=$(stat -c %Y "$dir/out" "$dir/seen" 2>/dev/null | sort -n | tail -n 1)
+  [ $(( $(date +%s) - ${last:-0} )) -ge "$idle_timeout" ] && break
+done
+rm -f "$dir/pid"
+kill -- -$$
+"""
+
+# Runs once per turn as the transport's command. Reuses the supervisor when
+# its options fingerprint and session match, otherwise replaces it, then
+# bridges this exec's stdin and stdout to the CLI until either side goes away.
+ATTACH_SCRIPT = r"""
+dir=$1 fingerprint=$2 resume=$3 idle_timeout=$4 max_age=$5 cli=$6 supervisor=$7
+mkdir -p "$dir" && chmod 700 "$dir"
+for var in ${!CLAUDEX_FILE_@}; do
+  printf '%s' "${!var}" > "$dir/${var#CLAUDEX_FILE_}"
+  unset "$var"
+done
+exec 9>"$dir/lock"
+flock 9
+# The directory survives container restarts while the processes don't, so a
+# recorded pid only counts while it is still this directory's supervisor.
+alive() {
+  local p
+  p=$(cat "$dir/pid" 2>/dev/null) && [ -n "$p" ] \
+    && grep -qzxF claudex-agent "/proc/$p/cmdline" 2>/dev/null \
+    && grep -qzxF -- "$dir" "/proc/$p/cmdline" 2>/dev/null
+}
+# The previous turn's result may still be on its way through the supervisor.
+for _ in 1 2 3 4 5 6 7 8 9 10; do
+  alive && [ -e "$dir/busy" ] || break
+  sleep 0.1
+done
+reused=false
+if alive && [ ! -e "$dir/busy" ] \
+  && [ "$(cat "$dir/fingerprint" 2>/dev/null)" = "$fingerprint" ] \
+  && { [ -z "$resume" ] || [ "$(cat "$dir/session" 2>/dev/null)" = "$resume" ]; } \
+  && [ $(( $(date +%s) - $(stat -c %Y "$dir/pid") )) -lt "$max_age" ]; then
+  reused=true
+else
+  alive && kill -- "-$(cat "$dir/pid")" 2>/dev/null
+  rm -f "$dir/in" "$dir/out" "$dir/err" "$dir/pid" "$dir/busy" "$dir/session"
+  mkfifo "$dir/in" && : > "$dir/out"
+  printf '%s' "$fingerprint" > "$dir/fingerprint"
+  setsid bash -c "$supervisor" claudex-agent "$dir" "$idle_timeout" "$cli" \
+    </dev/null >/dev/null 2>&1 9>&- &
+  until alive; do sleep 0.05; done
+fi
+pid=$(cat "$dir/pid")
+touch "$dir/attach.$$" "$dir/busy" "$dir/seen"
+trap 'rm -f "$dir/attach.$$"; touch "$dir/seen"; kill $tail_pid $cat_pid 2>/dev/null' EXIT
+offset=$(stat -c %s "$dir/out")
+flock -u 9
+printf '{"type":"claudex_attach","reused":%s}\n' "$reused"
+tail -c +$((offset + 1)) -f --pid="$pid" "$dir/out" &
+tail_pid=$!
+exec 4<&0
+cat <&4 > "$dir/in" &
+cat_pid=$!
+wait -n "$tail_pid" "$cat_pid"
+alive || exit 1
+"""
+
+
+@dataclass
+class ResidentSession:
+    # Keeps one CLI process per key alive inside the sandbox across turns.
+    # `files` are rewritten in the session directory on every attach, which is
+    # how per-turn secrets reach a process that was started by an earlier turn.
+    key: str
+    idle_timeout: int
+    max_age: int
+    files: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def directory(self) -> str:
+        return f"{RESIDENT_ROOT}/{self.key}"
+
+    def file_path(self, name: str) -> str:
+        return f"{self.directory}/{name}"
+
+    def file_envs(self) -> dict[str, str]:
+        return {
+            f"{RESIDENT_FILE_ENV_PREFIX}{name}": content
+            for name, content in self.files.items()
+        }
+
+    def attach_command(
+        self,
+        cli_command: str,
+        fingerprint_command: str,
+        envs: dict[str, str],
+        cwd: str,
+        user: str,
+        resume: str | None,
+    ) -> str:
+        stable_envs = {
+            key: value
+            for key, value in envs.items()
+            if not key.startswith(RESIDENT_FILE_ENV_PREFIX)
+        }
+        fingerprint = hashlib.sha256(
+            json.dumps(
+                [fingerprint_command, stable_envs, cwd, user], sort_keys=True
+            ).encode()
+        ).hexdigest()
+        return shlex.join(
+            [
+                "bash",
+                "-c",
+                ATTACH_SCRIPT,
+                "claudex-attach",
+                self.directory,
+                fingerprint,
+                resume or "",
+                str(self.idle_timeout),
+                str(self.max_age),
+                cli_command,
+                SUPERVISOR_SCRIPT,
+            ]
+        )
@@ -15,6 +15,11 @@ from app.models.schemas import UserSettingsResponse
 from app.models.types import JSONValue
 from app.services.base import BaseDbService, SessionFactoryType
 from app.services.exceptions import UserException
+from app.services.sandbox_providers import (
+    SandboxProvider,
+    SandboxProviderType,
+    create_sandbox_provider,
+)
 from app.utils.redis import redis_connection
 
 if TYPE_CHECKING:
@@ -71,6 +76,26 @@ class UserService(BaseDbService[UserSettings]):
 
         return cast(UserSettings, user_settings)
 
+    async def create_sandbox_provider(
+        self,
+        user_id: UUID,
+        db: AsyncSession | None = None,
+        provider_type: str | None = None,
+    ) -> SandboxProvider:
+        try:
+            user_settings = await self.get_user_settings(user_id, db=db)
+            default_provider = user_settings.sandbox_provider
+            api_key = user_settings.e2b_api_key
+        except UserException:
+            default_provider = SandboxProviderType.DOCKER.value
+            api_key = None
+
+        provider_type = provider_type or default_provider
+        if provider_type != SandboxProviderType.E2B.value:
+            api_key = None
+
+        return create_sandbox_provider(provider_type, api_key=api_key)
+
     async def update_user_settings(
         self, user_id: UUID, settings_update: dict[str, JSONValue], db: AsyncSession
     ) -> UserSettings:
@@ -1,11 +1,11 @@
 import asyncio
 import json
 import logging
+import time
 import uuid
 from contextlib import suppress
-from copy import deepcopy
-from dataclasses import dataclass
-from typing import AsyncIterator, Any
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Any, cast
 
 from celery.exceptions import Ignore
 from redis.asyncio import Redis
@@ -13,20 +13,49 @@ from sqlalchemy import select
 
 from app.constants import (
     REDIS_KEY_CHAT_REVOKED,
+    REDIS_KEY_CHAT_SNAPSHOT,
+    REDIS_KEY_CHAT_STATE,
     REDIS_KEY_CHAT_STREAM,
     REDIS_KEY_CHAT_TASK,
+    REDIS_KEY_USER_ACTIVE_TURNS,
 )
 
 from app.core.celery import celery_app
 from app.core.config import get_settings
 from app.db.session import get_celery_session
 from app.models.db_models import Chat, Message, MessageStreamStatus, User
+from app.services.checkpoint_queue import PendingCheckpoint, checkpoint_queue
 from app.services.claude_agent import ClaudeAgentService
-from app.services.exceptions import ClaudeAgentException, UserException
+from app.services.exceptions import (
+    ChatException,
+    ClaudeAgentException,
+    ErrorCode,
+    UserException,
+)
+from app.services.redis_retention import redis_retention
 from app.services.sandbox import SandboxService
+from app.services.sandbox_lifecycle import sandbox_lifecycle
 from app.services.sandbox_providers import create_sandbox_provider
-from app.services.streaming.events import StreamEvent
+from app.services.streaming.events import (
+    EncodedEvent,
+    StreamEvent,
+    encode_event_log,
+)
+from app.services.streaming.snapshot import StreamSnapshot, save_stream_snapshot
+from app.services.streaming.state import (
+    ACTIVE_STREAM_STATES,
+    STREAM_STATE_STREAMING,
+    append_stream_event,
+    set_stream_state,
+    touch_stream_state,
+)
+from app.services.task_context import task_context_store
 from app.services.user import UserService
+from app.tasks.checkpoints import (
+    create_chat_checkpoints,
+    create_message_checkpoint,
+    drain_chat_checkpoints,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +72,7 @@ class StreamCancelled(Exception):
 
 @dataclass
 class StreamOutcome:
-    events: list[StreamEvent]
+    events: list[EncodedEvent]
     final_content: str
     total_cost: float
 
@@ -84,9 +113,11 @@ class StreamContext:
     sandbox_service: SandboxService | None
     chat: Chat
     session_factory: Any
-    events: list[StreamEvent]
+    events: list[EncodedEvent]
     was_cancelled: bool = False
     cancel_requested: bool = False
+    snapshot: StreamSnapshot = field(default_factory=StreamSnapshot)
+    events_since_snapshot: int = 0
 
 
 def _hydrate_user_and_chat(
@@ -114,11 +145,12 @@ async def _publish_stream_entry(
     chat_id: str,
     kind: str,
     payload: dict[str, Any] | str | None = None,
-) -> None:
+    status: str | None = None,
+) -> str | None:
     if not redis:
-        return
+        return None
 
-    fields: dict[str, str | int | float] = {"kind": kind}
+    fields: dict[str, str] = {"kind": kind}
     if payload is not None:
         if isinstance(payload, str):
             fields["payload"] = payload
@@ -128,14 +160,13 @@ async def _publish_stream_entry(
     try:
         # XADD appends to Redis stream (append-only log). maxlen with approximate=True
         # caps stream size for memory efficiency, allowing slight overage for performance.
-        await redis.xadd(
-            REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id),
-            fields,
-            maxlen=STREAM_MAX_LEN,
-            approximate=True,
+        # The chat's state hash picks up the new entry id in the same script.
+        return await append_stream_event(
+            redis, chat_id, fields, maxlen=STREAM_MAX_LEN, status=status
         )
     except Exception as exc:
         logger.warning("Failed to append stream entry for chat %s: %s", chat_id, exc)
+        return None
 
 
 async def _update_message_status(
@@ -171,10 +202,23 @@ async def _check_task_revocation(chat_id: str, redis_client: "Redis[str]") -> bo
 
 
 async def _wait_for_task_revocation(chat_id: str, redis_client: "Redis[str]") -> None:
+    # Also keeps the chat's stream state heartbeat fresh; the status endpoint
+    # only falls back to Celery when the heartbeat goes stale.
+    loop = asyncio.get_running_loop()
+    next_heartbeat = 0.0
     while True:
         if await _check_task_revocation(chat_id, redis_client):
             return
 
+        if loop.time() >= next_heartbeat:
+            try:
+                await touch_stream_state(redis_client, chat_id)
+            except Exception as exc:
+                logger.warning("Failed to update stream heartbeat: %s", exc)
+            next_heartbeat = (
+                loop.time() + settings.CHAT_STREAM_HEARTBEAT_INTERVAL_SECONDS
+            )
+
         await asyncio.sleep(settings.REVOCATION_POLL_INTERVAL_SECONDS)
 
 
@@ -212,12 +256,24 @@ async def _monitor_revocation(
 
 async def _cleanup_task_resources(
     chat_id: str,
+    user_id: str,
     redis_client: "Redis[str] | None" = None,
 ) -> None:
     if redis_client:
         try:
             await redis_client.delete(REDIS_KEY_CHAT_TASK.format(chat_id=chat_id))
             await redis_client.delete(REDIS_KEY_CHAT_REVOKED.format(chat_id=chat_id))
+            await redis_client.zrem(
+                REDIS_KEY_USER_ACTIVE_TURNS.format(user_id=user_id), chat_id
+            )
+            # A turn that ended without publishing a terminal entry (setup
+            # failure, worker shutdown) must not keep reporting as active.
+            state_key = REDIS_KEY_CHAT_STATE.format(chat_id=chat_id)
+            if await redis_client.hget(state_key, "status") in ACTIVE_STREAM_STATES:
+                await redis_client.hset(
+                    state_key, "status", MessageStreamStatus.FAILED.value
+                )
+            await redis_retention.expire_chat_keys(redis_client, chat_id)
         except Exception as exc:
             logger.error("Failed to cleanup Redis keys: %s", exc)
 
@@ -229,11 +285,11 @@ async def _cleanup_task_resources(
 
 async def _save_message_content(
     assistant_message_id: str,
-    events: list[StreamEvent],
+    content: str,
     total_cost_usd: float,
     stream_status: MessageStreamStatus,
 ) -> None:
-    if not assistant_message_id or not events:
+    if not assistant_message_id or not content:
         return
 
     async with get_celery_session() as (session_factory, engine):
@@ -245,7 +301,7 @@ async def _save_message_content(
                 message = result.scalar_one_or_none()
 
                 if message:
-                    message.content = json.dumps(events, ensure_ascii=False)
+                    message.content = content
                     message.total_cost_usd = total_cost_usd
                     message.stream_status = stream_status
                     db.add(message)
@@ -287,7 +343,9 @@ async def _update_session_id(
         logger.error("Failed to update session_id: %s", exc)
 
 
-async def _prepare_stream(chat_id: str, task: Any) -> "Redis[str] | None":
+async def _prepare_stream(
+    chat_id: str, task: Any, assistant_message_id: str | None
+) -> "Redis[str] | None":
     try:
         redis_client: "Redis[str]" = Redis.from_url(
             settings.REDIS_URL, decode_responses=True
@@ -297,12 +355,23 @@ async def _prepare_stream(chat_id: str, task: Any) -> "Redis[str] | None":
         return None
 
     try:
-        await redis_client.delete(REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id))
+        await redis_client.delete(
+            REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id),
+            REDIS_KEY_CHAT_SNAPSHOT.format(chat_id=chat_id),
+        )
         await redis_client.setex(
             REDIS_KEY_CHAT_TASK.format(chat_id=chat_id),
             settings.TASK_TTL_SECONDS,
             task.request.id,
         )
+        await set_stream_state(
+            redis_client,
+            chat_id,
+            status=STREAM_STATE_STREAMING,
+            task_id=task.request.id,
+            message_id=assistant_message_id or "",
+            last_event_id="",
+        )
     except Exception as exc:
         logger.warning("Failed to initialize stream for chat %s: %s", chat_id, exc)
     return redis_client
@@ -317,24 +386,81 @@ async def _create_checkpoint_if_needed(
     if not (sandbox_service and chat.sandbox_id and assistant_message_id):
         return
 
+    if not settings.CHECKPOINT_QUEUE_ENABLED:
+        await create_message_checkpoint(
+            sandbox_service, chat.sandbox_id, assistant_message_id, session_factory
+        )
+        return
+
+    # The snapshot is taken by a maintenance worker so the turn and this
+    # worker slot are not held up by an rsync of the whole workspace.
     try:
-        checkpoint_id = await sandbox_service.create_checkpoint(
-            chat.sandbox_id, assistant_message_id
+        await checkpoint_queue.enqueue(
+            PendingCheckpoint(
+                chat_id=str(chat.id),
+                user_id=str(chat.user_id),
+                sandbox_id=chat.sandbox_id,
+                sandbox_provider=chat.sandbox_provider,
+                message_id=assistant_message_id,
+                enqueued_at=time.time(),
+            )
         )
-        if not checkpoint_id:
+        create_chat_checkpoints.delay(str(chat.id))
+    except Exception as exc:
+        logger.warning("Failed to queue checkpoint: %s", exc)
+
+
+async def _wait_for_checkpoints(chat_data: dict[str, Any]) -> None:
+    # The previous turn's snapshot may still be queued or running; the agent
+    # must not change the workspace under it.
+    if not (settings.CHECKPOINT_QUEUE_ENABLED and chat_data.get("sandbox_id")):
+        return
+    chat_id = str(chat_data["id"])
+    if await checkpoint_queue.wait_until_drained(
+        chat_id, settings.CHECKPOINT_TURN_WAIT_SECONDS
+    ):
+        return
+    # Rather than fail the turn, drain the backlog here. A worker that holds
+    # the lock is waited on until its lock would have expired, which also
+    # covers a worker that died mid-drain.
+    deadline = time.monotonic() + settings.CHECKPOINT_QUEUE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        await drain_chat_checkpoints(chat_id)
+        if await checkpoint_queue.wait_until_drained(
+            chat_id, settings.CHECKPOINT_TURN_WAIT_SECONDS
+        ):
             return
+    raise ChatException(
+        "Checkpoints for this chat are still being created",
+        error_code=ErrorCode.CHAT_CHECKPOINT_PENDING,
+        details={"chat_id": chat_id},
+        status_code=409,
+    )
 
-        async with session_factory() as db:
-            message_uuid = uuid.UUID(assistant_message_id)
-            query = select(Message).filter(Message.id == message_uuid)
-            result = await db.execute(query)
-            message = result.scalar_one_or_none()
-            if message:
-                message.checkpoint_id = checkpoint_id
-                db.add(message)
-                await db.commit()
+
+async def _update_stream_snapshot(
+    ctx: StreamContext, event: EncodedEvent, event_id: str | None
+) -> None:
+    # Reconnecting clients get the latest snapshot plus the entries after it
+    # instead of replaying every delta from the start of the turn.
+    ctx.snapshot.add(event)
+    ctx.events_since_snapshot += 1
+    if (
+        not ctx.redis_client
+        or not event_id
+        or ctx.events_since_snapshot < settings.CHAT_STREAM_SNAPSHOT_INTERVAL_EVENTS
+    ):
+        return
+
+    try:
+        await save_stream_snapshot(
+            ctx.redis_client, ctx.chat_id, event_id, ctx.snapshot.encode()
+        )
+        ctx.events_since_snapshot = 0
     except Exception as exc:
-        logger.warning("Failed to create checkpoint: %s", exc)
+        logger.warning(
+            "Failed to save stream snapshot for chat %s: %s", ctx.chat_id, exc
+        )
 
 
 async def _process_stream_events(ctx: StreamContext) -> None:
@@ -361,10 +487,15 @@ async def _process_stream_events(ctx: StreamContext) -> None:
                     break
                 raise
 
-            ctx.events.append(deepcopy(event))
-            await _publish_stream_entry(
-                ctx.redis_client, ctx.chat_id, "content", {"event": event}
+            encoded = EncodedEvent(event)
+            ctx.events.append(encoded)
+            # Long turns must not look idle to the reaper; writes are throttled.
+            if ctx.chat.sandbox_id:
+                await sandbox_lifecycle.record_activity(ctx.chat.sandbox_id)
+            event_id = await _publish_stream_entry(
+                ctx.redis_client, ctx.chat_id, "content", encoded.stream_payload
             )
+            await _update_stream_snapshot(ctx, encoded, event_id)
 
             ctx.task.update_state(
                 state="PROGRESS",
@@ -381,14 +512,16 @@ async def _finalize_stream(
     ctx: StreamContext, status: MessageStreamStatus
 ) -> StreamOutcome:
     total_cost = ctx.ai_service.get_total_cost_usd()
-    final_content = json.dumps(ctx.events, ensure_ascii=False)
+    final_content = encode_event_log(ctx.events)
 
-    await _publish_stream_entry(ctx.redis_client, ctx.chat_id, "complete")
+    await _publish_stream_entry(
+        ctx.redis_client, ctx.chat_id, "complete", status=status.value
+    )
 
     if ctx.assistant_message_id and ctx.events:
         await _save_message_content(
             ctx.assistant_message_id,
-            ctx.events,
+            final_content,
             total_cost,
             status,
         )
@@ -412,7 +545,7 @@ async def _drain_ai_stream(
     task: Any,
     redis_client: "Redis[str] | None",
     ai_service: ClaudeAgentService,
-    events: list[StreamEvent],
+    events: list[EncodedEvent],
     assistant_message_id: str | None,
     sandbox_service: SandboxService | None,
     chat: Chat,
@@ -453,7 +586,13 @@ async def _drain_ai_stream(
     except Exception as exc:
         logger.error("Error in stream processing: %s", exc)
 
-        await _publish_stream_entry(redis_client, chat_id, "error", {"error": str(exc)})
+        await _publish_stream_entry(
+            redis_client,
+            chat_id,
+            "error",
+            {"error": str(exc)},
+            status=MessageStreamStatus.FAILED.value,
+        )
         await _update_message_status(
             assistant_message_id or "", MessageStreamStatus.FAILED
         )
@@ -461,7 +600,7 @@ async def _drain_ai_stream(
         if assistant_message_id and events:
             await _save_message_content(
                 assistant_message_id,
-                events,
+                encode_event_log(events),
                 ai_service.get_total_cost_usd(),
                 MessageStreamStatus.FAILED,
             )
@@ -488,9 +627,9 @@ async def process_chat_stream(  # type: ignore[return]
 
     chat_id = str(chat.id)
     session_container: dict[str, Any] = {"session_id": session_id}
-    events: list[StreamEvent] = []
+    events: list[EncodedEvent] = []
 
-    redis_client = await _prepare_stream(chat_id, task)
+    redis_client = await _prepare_stream(chat_id, task, assistant_message_id)
     task.update_state(state="PROGRESS", meta={"status": "Starting AI processing"})
 
     try:
@@ -547,79 +686,116 @@ async def process_chat_stream(  # type: ignore[return]
                 return outcome.final_content
 
     finally:
-        await _cleanup_task_resources(chat_id, redis_client)
+        await _cleanup_task_resources(chat_id, str(user.id), redis_client)
+
+
+async def _release_unstarted_turn(
+    chat_id: str, user_id: str, assistant_message_id: str | None, error: str
+) -> None:
+    logger.error("Chat %s failed before streaming started: %s", chat_id, error)
+    redis_client: "Redis[str] | None" = None
+    try:
+        redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    except Exception as exc:
+        logger.error("Failed to connect to Redis: %s", exc)
+    await _publish_stream_entry(
+        redis_client,
+        chat_id,
+        "error",
+        {"error": error},
+        status=MessageStreamStatus.FAILED.value,
+    )
+    await _update_message_status(assistant_message_id or "", MessageStreamStatus.FAILED)
+    await _cleanup_task_resources(chat_id, user_id, redis_client)
 
 
 async def _initialize_and_process_chat(
     task: Any,
-    prompt: str,
-    system_prompt: str,
-    custom_instructions: str | None,
-    user_data: dict[str, Any],
-    chat_data: dict[str, Any],
+    context_hash: str,
+    chat_id: str | None,
+    user_id: str | None,
     model_id: str,
     permission_mode: str,
     session_id: str | None,
     assistant_message_id: str | None,
     thinking_mode: str | None,
-    attachments: list[dict[str, Any]] | None,
 ) -> str:
-    async with get_celery_session() as (SessionFactory, engine):
-        async with SessionFactory() as db:
-            user_id = uuid.UUID(user_data["id"])
+    # process_chat_stream releases the turn once it starts; anything that fails
+    # before then must not hold the user's slot or leave the chat queued until
+    # the task TTL. Clients following the stream get an error entry, e.g. when
+    # the task context expired before a worker picked the task up.
+    stream_started = False
+    setup_error = "Chat task stopped before it started"
+    try:
+        context = await task_context_store.load(context_hash)
+        user_data = context["user_data"]
+        chat_data = context["chat_data"]
+        await _wait_for_checkpoints(chat_data)
 
-            user_service = UserService(session_factory=SessionFactory)
+        async with get_celery_session() as (SessionFactory, engine):
+            async with SessionFactory() as db:
+                user_service = UserService(session_factory=SessionFactory)
 
-            try:
-                user_settings = await user_service.get_user_settings(user_id, db=db)
-            except UserException:
-                raise UserException("User settings not found")
+                try:
+                    user_settings = await user_service.get_user_settings(
+                        uuid.UUID(user_data["id"]), db=db
+                    )
+                except UserException:
+                    raise UserException("User settings not found")
 
-            provider_type = (
-                chat_data.get("sandbox_provider") or user_settings.sandbox_provider
-            )
-            provider = create_sandbox_provider(
-                provider_type=provider_type,
-                api_key=user_settings.e2b_api_key,
-            )
+                provider_type = (
+                    chat_data.get("sandbox_provider") or user_settings.sandbox_provider
+                )
+                provider = create_sandbox_provider(
+                    provider_type=provider_type,
+                    api_key=user_settings.e2b_api_key,
+                )
 
-        sandbox_service = SandboxService(
-            provider=provider, session_factory=SessionFactory
-        )
-        try:
-            return await process_chat_stream(
-                task,
-                prompt=prompt,
-                system_prompt=system_prompt,
-                custom_instructions=custom_instructions,
-                user_data=user_data,
-                chat_data=chat_data,
-                model_id=model_id,
-                permission_mode=permission_mode,
-                session_id=session_id,
-                assistant_message_id=assistant_message_id,
-                thinking_mode=thinking_mode,
-                attachments=attachments,
-                sandbox_service=sandbox_service,
+            sandbox_service = SandboxService(
+                provider=provider, session_factory=SessionFactory
+            )
+            stream_started = True
+            try:
+                return await process_chat_stream(
+                    task,
+                    prompt=context["prompt"],
+                    system_prompt=context["system_prompt"],
+                    custom_instructions=context["custom_instructions"],
+                    user_data=user_data,
+                    chat_data=chat_data,
+                    model_id=model_id,
+                    permission_mode=permission_mode,
+                    session_id=session_id,
+                    assistant_message_id=assistant_message_id,
+                    thinking_mode=thinking_mode,
+                    attachments=cast(
+                        list[dict[str, Any]] | None, context["attachments"]
+                    ),
+                    sandbox_service=sandbox_service,
+                )
+            finally:
+                await sandbox_service.cleanup()
+    except Exception as exc:
+        setup_error = str(exc)
+        raise
+    finally:
+        if not stream_started and chat_id and user_id:
+            await _release_unstarted_turn(
+                chat_id, user_id, assistant_message_id, setup_error
             )
-        finally:
-            await sandbox_service.cleanup()
 
 
 @celery_app.task(bind=True)
 def process_chat(
     self: Any,
-    prompt: str,
-    system_prompt: str,
-    custom_instructions: str | None,
-    user_data: dict[str, Any],
-    chat_data: dict[str, Any],
+    context_hash: str,
     model_id: str,
+    chat_id: str | None = None,
+    user_id: str | None = None,
     permission_mode: str = "auto",
     session_id: str | None = None,
     assistant_message_id: str | None = None,
     thinking_mode: str | None = None,
-    attachments: list[dict[str, Any]] | None = None,
 ) -> str:
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
@@ -628,17 +804,14 @@ def process_chat(
         return loop.run_until_complete(
             _initialize_and_process_chat(
                 task=self,
-                prompt=prompt,
-                system_prompt=system_prompt,
-                custom_instructions=custom_instructions,
-                user_data=user_data,
-                chat_data=chat_data,
+                context_hash=context_hash,
+                chat_id=chat_id,
+                user_id=user_id,
                 model_id=model_id,
                 permission_mode=permission_mode,
                 session_id=session_id,
                 assistant_message_id=assistant_message_id,
                 thinking_mode=thinking_mode,
-                attachments=attachments,
             )
         )
     finally:
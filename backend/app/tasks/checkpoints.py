@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any
+
+from sqlalchemy import select
+
+from app.core.celery import celery_app
+from app.core.config import get_settings
+from app.db.session import get_celery_session
+from app.models.db_models import Message
+from app.services.checkpoint_queue import PendingCheckpoint, checkpoint_queue
+from app.services.sandbox import SandboxService
+from app.services.sandbox_providers import create_sandbox_provider
+from app.services.user import UserService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="create_chat_checkpoints")
+def create_chat_checkpoints(chat_id: str) -> dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(drain_chat_checkpoints(chat_id))
+    finally:
+        loop.close()
+
+
+@celery_app.task(name="sweep_pending_checkpoints")
+def sweep_pending_checkpoints() -> dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_sweep_pending_checkpoints())
+    finally:
+        loop.close()
+
+
+async def create_message_checkpoint(
+    sandbox_service: SandboxService,
+    sandbox_id: str,
+    message_id: str,
+    session_factory: Any,
+) -> bool:
+    try:
+        checkpoint_id = await sandbox_service.create_checkpoint(sandbox_id, message_id)
+        if not checkpoint_id:
+            return False
+
+        async with session_factory() as db:
+            query = select(Message).filter(Message.id == uuid.UUID(message_id))
+            result = await db.execute(query)
+            message = result.scalar_one_or_none()
+            if message:
+                message.checkpoint_id = checkpoint_id
+                db.add(message)
+                await db.commit()
+        return True
+    except Exception as exc:
+        logger.warning("Failed to create checkpoint: %s", exc)
+        return False
+
+
+async def _create_sandbox_service(
+    checkpoint: PendingCheckpoint, session_factory: Any
+) -> SandboxService:
+    async with session_factory() as db:
+        user_settings = await UserService(
+            session_factory=session_factory
+        ).get_user_settings(uuid.UUID(checkpoint.user_id), db=db)
+    provider = create_sandbox_provider(
+        provider_type=checkpoint.sandbox_provider or user_settings.sandbox_provider,
+        api_key=user_settings.e2b_api_key,
+    )
+    return SandboxService(provider=provider, session_factory=session_factory)
+
+
+async def _drain_checkpoints(chat_id: str, session_factory: Any) -> tuple[int, float]:
+    created = 0
+    max_lag = 0.0
+    sandbox_service: SandboxService | None = None
+    try:
+        while checkpoint := await checkpoint_queue.peek(chat_id):
+            max_lag = max(max_lag, time.time() - checkpoint.enqueued_at)
+            try:
+                if sandbox_service is None:
+                    sandbox_service = await _create_sandbox_service(
+                        checkpoint, session_factory
+                    )
+                if await create_message_checkpoint(
+                    sandbox_service,
+                    checkpoint.sandbox_id,
+                    checkpoint.message_id,
+                    session_factory,
+                ):
+                    created += 1
+            except Exception as e:
+                logger.warning(
+                    "Failed to create checkpoint for chat %s: %s", chat_id, e
+                )
+            # Snapshots are best effort; a failed one must not block the rest.
+            await checkpoint_queue.complete(checkpoint)
+            await checkpoint_queue.extend(chat_id)
+    finally:
+        if sandbox_service is not None:
+            await sandbox_service.cleanup()
+    return created, max_lag
+
+
+async def drain_chat_checkpoints(chat_id: str) -> dict[str, Any]:
+    created = 0
+    max_lag = 0.0
+    async with get_celery_session() as (session_factory, engine):
+        # A task that finds the lock taken leaves its entry to the holder, so
+        # the holder looks again after releasing in case it missed one.
+        while token := await checkpoint_queue.acquire(chat_id):
+            try:
+                drained, lag = await _drain_checkpoints(chat_id, session_factory)
+            finally:
+                await checkpoint_queue.release(chat_id, token)
+            created += drained
+            max_lag = max(max_lag, lag)
+            if not await checkpoint_queue.pending_count(chat_id):
+                break
+
+    if created:
+        logger.info(
+            "Created %s checkpoints for chat %s (max lag %.1fs)",
+            created,
+            chat_id,
+            max_lag,
+        )
+    return {"created": created, "max_lag_seconds": max_lag}
+
+
+async def _sweep_pending_checkpoints() -> dict[str, Any]:
+    try:
+        chat_ids = await checkpoint_queue.stale_chats(
+            settings.CHECKPOINT_QUEUE_STALE_SECONDS
+        )
+    except Exception as e:
+        logger.error("Error sweeping pending checkpoints: %s", e)
+        return {"error": str(e)}
+
+    for chat_id in chat_ids:
+        create_chat_checkpoints.delay(chat_id)
+    if chat_ids:
+        logger.warning("Re-dispatched checkpoints for %s stale chats", len(chat_ids))
+    return {"redispatched": len(chat_ids)}
@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from typing import Any
+
+from app.core.celery import celery_app
+from app.services.redis_retention import redis_retention
+from app.utils.redis import redis_connection
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="sweep_redis_retention")
+def sweep_redis_retention() -> dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_sweep_redis_retention())
+    finally:
+        loop.close()
+
+
+async def _sweep_redis_retention() -> dict[str, Any]:
+    try:
+        async with redis_connection() as redis:
+            result = await redis_retention.sweep(redis)
+    except Exception as e:
+        logger.error("Error sweeping Redis retention: %s", e)
+        return {"error": str(e)}
+
+    if result["expired_streams"]:
+        logger.info("Expired %s orphaned chat streams", result["expired_streams"])
+    return result
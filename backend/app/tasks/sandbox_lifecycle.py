@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import uuid
+from typing import Any
+
+from sqlalchemy import select
+
+from app.constants import REDIS_KEY_CHAT_TASK
+from app.core.celery import celery_app
+from app.core.config import get_settings
+from app.db.session import get_celery_session
+from app.models.db_models import Chat
+from app.services.exceptions import UserException
+from app.services.sandbox import SandboxService
+from app.services.sandbox_lifecycle import sandbox_lifecycle
+from app.services.sandbox_providers import SandboxProviderType, create_sandbox_provider
+from app.services.user import UserService
+from app.utils.redis import redis_connection
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@celery_app.task(name="reap_idle_sandboxes")
+def reap_idle_sandboxes() -> dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_reap_idle_sandboxes())
+    finally:
+        loop.close()
+
+
+async def _load_docker_chats(sandbox_ids: list[str]) -> dict[str, str]:
+    async with get_celery_session() as (session_factory, engine):
+        async with session_factory() as db:
+            result = await db.execute(
+                select(Chat.sandbox_id, Chat.id).where(
+                    Chat.sandbox_id.in_(sandbox_ids),
+                    Chat.sandbox_provider == SandboxProviderType.DOCKER.value,
+                    Chat.deleted_at.is_(None),
+                )
+            )
+            return {row[0]: str(row[1]) for row in result.fetchall()}
+
+
+async def _reap_idle_sandboxes() -> dict[str, Any]:
+    try:
+        idle_ids = await sandbox_lifecycle.get_idle_sandboxes(
+            settings.SANDBOX_IDLE_TIMEOUT_SECONDS
+        )
+        if not idle_ids:
+            return {"suspended": 0}
+
+        docker_chats = await _load_docker_chats(idle_ids)
+    except Exception as e:
+        logger.error("Error loading idle sandboxes: %s", e)
+        return {"error": str(e)}
+
+    suspended = 0
+    provider = create_sandbox_provider(SandboxProviderType.DOCKER)
+    try:
+        for sandbox_id in idle_ids:
+            chat_id = docker_chats.get(sandbox_id)
+            if not chat_id:
+                await sandbox_lifecycle.forget(sandbox_id)
+                continue
+
+            async with redis_connection() as redis:
+                has_active_task = await redis.exists(
+                    REDIS_KEY_CHAT_TASK.format(chat_id=chat_id)
+                )
+            if has_active_task:
+                await sandbox_lifecycle.record_activity(sandbox_id, force=True)
+                continue
+
+            try:
+                if await provider.suspend_sandbox(sandbox_id):
+                    suspended += 1
+            except Exception as e:
+                logger.warning("Failed to suspend sandbox %s: %s", sandbox_id, e)
+                continue
+
+            await sandbox_lifecycle.forget(sandbox_id)
+    finally:
+        await provider.cleanup()
+
+    logger.info("Suspended %s idle Docker sandboxes", suspended)
+    return {"suspended": suspended}
+
+
+async def _load_provider_defaults(user_id: str) -> tuple[str, str | None]:
+    # Users without settings get docker and no API key, like the API does.
+    async with get_celery_session() as (session_factory, engine):
+        async with session_factory() as db:
+            try:
+                user_settings = await UserService(
+                    session_factory=session_factory
+                ).get_user_settings(uuid.UUID(user_id), db=db)
+            except UserException:
+                return SandboxProviderType.DOCKER.value, None
+    return user_settings.sandbox_provider, user_settings.e2b_api_key
+
+
+@celery_app.task(bind=True, name="delete_sandboxes")
+def delete_sandboxes(
+    self: Any, user_id: str, sandboxes: list[dict[str, str | None]]
+) -> dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_delete_sandboxes(self, user_id, sandboxes))
+    finally:
+        loop.close()
+
+
+async def _delete_sandboxes(
+    task: Any, user_id: str, sandboxes: list[dict[str, str | None]]
+) -> dict[str, Any]:
+    progress = {"total": len(sandboxes), "deleted": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(settings.SANDBOX_DELETE_CONCURRENCY)
+    services: dict[str, SandboxService] = {}
+
+    async def delete(service: SandboxService, sandbox_id: str) -> None:
+        async with semaphore:
+            for attempt in range(1, settings.SANDBOX_DELETE_MAX_ATTEMPTS + 1):
+                try:
+                    await service.destroy_sandbox(sandbox_id)
+                    progress["deleted"] += 1
+                    break
+                except Exception as e:
+                    if attempt == settings.SANDBOX_DELETE_MAX_ATTEMPTS:
+                        logger.warning(
+                            "Giving up deleting sandbox %s after %s attempts: %s",
+                            sandbox_id,
+                            attempt,
+                            e,
+                        )
+                        progress["failed"] += 1
+                        break
+                    await asyncio.sleep(
+                        settings.SANDBOX_DELETE_RETRY_DELAY_SECONDS * 2 ** (attempt - 1)
+                    )
+        task.update_state(state="PROGRESS", meta=dict(progress))
+
+    try:
+        default_provider, api_key = await _load_provider_defaults(user_id)
+        targets = [
+            (
+                sandbox.get("sandbox_provider") or default_provider,
+                str(sandbox["sandbox_id"]),
+            )
+            for sandbox in sandboxes
+        ]
+        # One provider per type, shared by every deletion and closed only after
+        # all of them have finished.
+        for provider_type, _ in targets:
+            if provider_type not in services:
+                services[provider_type] = SandboxService(
+                    create_sandbox_provider(
+                        provider_type=provider_type,
+                        api_key=api_key
+                        if provider_type == SandboxProviderType.E2B.value
+                        else None,
+                    )
+                )
+
+        await asyncio.gather(
+            *(
+                delete(services[provider_type], sandbox_id)
+                for provider_type, sandbox_id in targets
+            )
+        )
+    except Exception as e:
+        logger.error("Error deleting sandboxes for user %s: %s", user_id, e)
+        return {**progress, "error": str(e)}
+    finally:
+        for service in services.values():
+            await service.cleanup()
+
+    logger.info(
+        "Deleted %s of %s sandboxes for user %s (%s failed)",
+        progress["deleted"],
+        progress["total"],
+        user_id,
+        progress["failed"],
+    )
+    return progress
@@ -0,0 +1,65 @@
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers
+
+
+def file_etag(inode: int, size: int, modified: float) -> str:
+    return f'"{inode:x}-{size:x}-{int(modified * 1_000_000_000):x}"'
+
+
+def file_cache_headers(etag: str, modified: float) -> dict[str, str]:
+    # no-cache lets browsers keep the body but revalidate it on every use,
+    # which only costs a stat in the sandbox when the file hasn't changed.
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def is_not_modified(headers: Headers, etag: str, modified: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(modified) <= since
+
+    return False
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    # Returns the inclusive (start, end) of a single "bytes=" range, or None
+    # when the whole file should be sent. Multiple ranges are answered with the
+    # full file, which RFC 9110 allows. Raises ValueError when the range can't
+    # be satisfied.
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start_text, separator, end_text = header[len("bytes=") :].strip().partition("-")
+    if not separator or not (start_text or end_text):
+        return None
+    if not all(part.isdigit() for part in (start_text, end_text) if part):
+        return None
+
+    if not start_text:
+        suffix = int(end_text)
+        if suffix == 0 or size == 0:
+            raise ValueError(f"Range {header} not satisfiable for size {size}")
+        return max(size - suffix, 0), size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size:
+        raise ValueError(f"Range {header} not satisfiable for size {size}")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
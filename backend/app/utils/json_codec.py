@@ -0,0 +1,47 @@
+import json
+import logging
+from typing import Any, Protocol
+
+import orjson
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class JSONCodec(Protocol):
+    name: str
+
+    def dumps(self, value: Any) -> str: ...
+
+    def loads(self, data: str | bytes) -> Any: ...
+
+
+class StdlibJSONCodec:
+    name = "json"
+
+    def dumps(self, value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def dumps(self, value: Any) -> str:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+
+def get_json_codec(name: str) -> JSONCodec:
+    if name == "json":
+        return StdlibJSONCodec()
+    return OrjsonCodec()
+
+
+json_codec = get_json_codec(settings.JSON_CODEC)
@@ -0,0 +1,38 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    # Builds a value with an async factory on first `get()` and reuses it for
+    # the rest of the holder's lifetime. Concurrent first calls share one build.
+    def __init__(self, factory: Callable[[], Awaitable[T]]) -> None:
+        self._factory = factory
+        self._value: T | None = None
+        self._created = False
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def ready(cls, value: T) -> "Lazy[T]":
+        lazy = cls(cls._unused_factory)
+        lazy._value = value
+        lazy._created = True
+        return lazy
+
+    @property
+    def created(self) -> bool:
+        return self._created
+
+    async def get(self) -> T:
+        if not self._created:
+            async with self._lock:
+                if not self._created:
+                    self._value = await self._factory()
+                    self._created = True
+        return self._value  # type: ignore[return-value]
+
+    @staticmethod
+    async def _unused_factory() -> T:
+        raise RuntimeError("Lazy.ready values are never rebuilt")
@@ -22,6 +22,18 @@ async def redis_connection() -> "AsyncIterator[Redis[str]]":
             logger.warning("Error closing Redis connection: %s", e)
 
 
+@asynccontextmanager
+async def redis_binary_connection() -> "AsyncIterator[Redis[bytes]]":
+    redis: "Redis[bytes]" = Redis.from_url(settings.REDIS_URL)
+    try:
+        yield redis
+    finally:
+        try:
+            await redis.close()
+        except Exception as e:
+            logger.warning("Error closing Redis connection: %s", e)
+
+
 @asynccontextmanager
 async def redis_pubsub(redis: "Redis[str]", channel: str) -> AsyncIterator[PubSub]:
     pubsub = redis.pubsub()
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    def __init__(self, max_size: int) -> None:
+        super().__init__(f"Upload exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+@dataclass
+class SpooledUpload:
+    path: Path
+    size: int
+    sha256: str
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+async def spool_upload(
+    file: UploadFile, directory: Path, max_size: int
+) -> SpooledUpload:
+    # Copies the upload to a temporary file in `directory` one chunk at a time,
+    # enforcing the size limit as bytes arrive so an oversized upload is
+    # rejected without ever being held in memory. Callers rename the spooled
+    # file into place (same filesystem) or discard it.
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(max_size)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+    return SpooledUpload(path=Path(temp_path), size=size, sha256=digest.hexdigest())
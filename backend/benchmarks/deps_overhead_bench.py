@@ -0,0 +1,103 @@
+"""Measure per-request dependency overhead of the chat service.
+
+Resolves the ChatService dependency the way a read-only chat request (list
+chats, fetch messages, rename) does and tears it down again. The user settings
+lookup is answered from memory so the numbers isolate construction and
+teardown cost.
+
+"eager" is the previous graph, which built a sandbox provider, SandboxService,
+StorageService and ClaudeAgentService for every request. "lazy" is the current
+get_chat_service, which builds none of them unless the request uses them;
+"lazy+sandbox" is a request that does reach the sandbox.
+
+    cd backend && SECRET_KEY=... python -m benchmarks.deps_overhead_bench
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any
+from uuid import UUID, uuid4
+
+from app.core.deps import _create_user_sandbox_provider, get_chat_service
+from app.db.session import SessionLocal
+from app.services.chat import ChatService
+from app.services.claude_agent import ClaudeAgentService
+from app.services.sandbox import SandboxService
+from app.services.storage import StorageService
+
+chat_service_dependency = asynccontextmanager(get_chat_service)
+
+
+class InMemoryUserService:
+    async def get_user_settings(self, user_id: UUID, db: Any = None) -> Any:
+        return SimpleNamespace(sandbox_provider="docker", e2b_api_key=None)
+
+
+async def eager_request(user: Any, user_service: Any) -> None:
+    provider = await _create_user_sandbox_provider(user.id, user_service, None)  # type: ignore[arg-type]
+    try:
+        sandbox_service = SandboxService(provider)
+        storage_service = StorageService(sandbox_service)
+        async with ClaudeAgentService(session_factory=SessionLocal) as ai_service:
+            ChatService(
+                storage_service,
+                sandbox_service,
+                ai_service,
+                user_service,
+                session_factory=SessionLocal,
+            )
+    finally:
+        await provider.cleanup()
+
+
+async def lazy_request(user: Any, user_service: Any) -> None:
+    async with chat_service_dependency(user, None, user_service):
+        pass
+
+
+async def lazy_sandbox_request(user: Any, user_service: Any) -> None:
+    async with chat_service_dependency(user, None, user_service) as chat_service:
+        await chat_service.get_sandbox_service()
+
+
+async def measure(
+    run: Callable[[Any, Any], Awaitable[None]], requests: int, repeats: int
+) -> float:
+    user = SimpleNamespace(id=uuid4())
+    user_service = InMemoryUserService()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await run(user, user_service)
+        samples.append((time.perf_counter() - start) / requests)
+    return statistics.median(samples)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"median of {args.repeats} runs of {args.requests} requests")
+    baseline = await measure(eager_request, args.requests, args.repeats)
+    print(f"{'eager':>14}: {baseline * 1_000_000:8.1f} us/request")
+    for name, run in (
+        ("lazy", lazy_request),
+        ("lazy+sandbox", lazy_sandbox_request),
+    ):
+        elapsed = await measure(run, args.requests, args.repeats)
+        print(
+            f"{name:>14}: {elapsed * 1_000_000:8.1f} us/request"
+            f"  ({baseline / elapsed:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+"""Compare BaseHTTPMiddleware and pure ASGI request-id/security-header layers.
+
+Drives the ASGI app in-process (no server, no network) so the numbers isolate
+middleware overhead. Reports plain JSON requests/sec and, for a streaming
+response, the latency between the app emitting a chunk and the chunk leaving
+the middleware stack.
+
+    cd backend && SECRET_KEY=... python -m benchmarks.middleware_bench
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message
+
+from app.core.middleware import RequestIdMiddleware, SecurityHeadersMiddleware
+
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
+}
+
+
+class LegacyRequestIdMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self, request: Request, call_next: Callable[[Request], Response]
+    ) -> Response:
+        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        request.state.request_id = request_id
+        start_time = time.perf_counter()
+        response = await call_next(request)  # type: ignore[misc]
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Process-Time"] = f"{time.perf_counter() - start_time:.4f}"
+        return response
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self, request: Request, call_next: Callable[[Request], Response]
+    ) -> Response:
+        response = await call_next(request)  # type: ignore[misc]
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+
+# Stream chunks carry the time they were produced so the receiving side can
+# measure how long each one spent inside the middleware stack.
+chunk_count = 50
+
+
+async def json_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+async def stream_endpoint(request: Request) -> StreamingResponse:
+    async def events() -> AsyncIterator[bytes]:
+        for _ in range(chunk_count):
+            yield f"data: {time.perf_counter_ns()}\n\n".encode()
+            await asyncio.sleep(0)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def build_app(legacy: bool) -> ASGIApp:
+    middleware = (
+        [
+            Middleware(LegacyRequestIdMiddleware),
+            Middleware(LegacySecurityHeadersMiddleware),
+        ]
+        if legacy
+        else [Middleware(RequestIdMiddleware), Middleware(SecurityHeadersMiddleware)]
+    )
+    return Starlette(
+        routes=[Route("/json", json_endpoint), Route("/stream", stream_endpoint)],
+        middleware=middleware,
+    )
+
+
+def make_scope(path: str) -> dict[str, object]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+def make_receive() -> Callable[[], Awaitable[Message]]:
+    # The body arrives once; after that the client stays connected until the
+    # response finishes, like a real browser holding an SSE stream open.
+    sent = False
+
+    async def receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+async def bench_json(app: ASGIApp, requests: int) -> float:
+    async def send(message: Message) -> None:
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(make_scope("/json"), make_receive(), send)
+    return requests / (time.perf_counter() - start)
+
+
+async def bench_stream(app: ASGIApp, streams: int) -> list[float]:
+    latencies_us: list[float] = []
+
+    async def send(message: Message) -> None:
+        if message["type"] != "http.response.body":
+            return
+        body = message.get("body", b"")
+        if body.startswith(b"data: "):
+            produced_ns = int(body[6:].strip())
+            latencies_us.append((time.perf_counter_ns() - produced_ns) / 1000)
+
+    for _ in range(streams):
+        await app(make_scope("/stream"), make_receive(), send)
+    return latencies_us
+
+
+async def run(requests: int, streams: int) -> None:
+    for label, legacy in (("BaseHTTPMiddleware", True), ("pure ASGI", False)):
+        app = build_app(legacy)
+        await bench_json(app, 200)
+        rps = await bench_json(app, requests)
+        latencies = sorted(await bench_stream(app, streams))
+        p50 = statistics.median(latencies)
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(
+            f"{label:<20} {rps:>10.0f} req/s   "
+            f"stream chunk latency p50={p50:.1f}us p99={p99:.1f}us"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--streams", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.streams))
+
+
+if __name__ == "__main__":
+    main()
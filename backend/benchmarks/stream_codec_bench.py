@@ -0,0 +1,144 @@
+"""Measure worker-side serialization for one chat turn's stream events.
+
+Replays a synthetic turn shaped like StreamProcessor output (text deltas,
+thinking blocks, tool start/finish pairs with inputs and results) through the
+worker's sinks: the Redis stream payload for every event, a compacted snapshot
+every CHAT_STREAM_SNAPSHOT_INTERVAL_EVENTS events and the final message
+content written to the DB. Redis and DB round trips are left out so the
+numbers isolate encoding work.
+
+"legacy" is the previous path (deepcopy plus json.dumps per sink); the other
+rows encode each event once through the given codec.
+
+    cd backend && SECRET_KEY=... python -m benchmarks.stream_codec_bench
+"""
+
+import argparse
+import json
+import statistics
+import time
+from copy import deepcopy
+from typing import Any
+
+from app.services.streaming import events as stream_events
+from app.services.streaming import snapshot as stream_snapshot
+from app.services.streaming.events import (
+    EncodedEvent,
+    StreamEvent,
+    encode_event_log,
+)
+from app.services.streaming.snapshot import StreamSnapshot
+from app.utils.json_codec import JSONCodec, StdlibJSONCodec, get_json_codec
+
+SNAPSHOT_INTERVAL = 50
+
+
+def build_turn(tool_calls: int, deltas_per_reply: int) -> list[StreamEvent]:
+    turn: list[StreamEvent] = []
+    for index in range(tool_calls):
+        for delta in range(deltas_per_reply):
+            turn.append(
+                {"type": "assistant_text", "text": f"Chunk {delta} of step {index}. "}
+            )
+        turn.append(
+            {
+                "type": "assistant_thinking",
+                "thinking": "Considering the next step. " * 8,
+            }
+        )
+        tool = {
+            "id": f"toolu_{index:04d}",
+            "name": "Bash",
+            "title": f"Run step {index}",
+            "parent_id": None,
+            "input": {"command": f"ls -la /home/user/project/src/{index}"},
+        }
+        turn.append({"type": "tool_started", "tool": {**tool, "status": "started"}})
+        turn.append(
+            {
+                "type": "tool_completed",
+                "tool": {
+                    **tool,
+                    "status": "completed",
+                    "result": "drwxr-xr-x  user  staff  file.py\n" * 40,
+                },
+            }
+        )
+    return turn
+
+
+class UnencodedEvent:
+    # Feeds StreamSnapshot's compaction without a cached encoding, matching
+    # the previous snapshot path that re-serialized the whole list.
+    def __init__(self, event: StreamEvent) -> None:
+        self.event = event
+        self.json = None
+
+
+def legacy_turn(turn: list[StreamEvent]) -> None:
+    events: list[StreamEvent] = []
+    snapshot = StreamSnapshot()
+    for count, event in enumerate(turn, start=1):
+        events.append(deepcopy(event))
+        json.dumps({"event": event}, ensure_ascii=False)
+        snapshot.add(UnencodedEvent(events[-1]))  # type: ignore[arg-type]
+        if count % SNAPSHOT_INTERVAL == 0:
+            json.dumps(snapshot.events, ensure_ascii=False)
+    # Finalize encoded the log once for the task result and again for the DB.
+    json.dumps(events, ensure_ascii=False)
+    json.dumps(events, ensure_ascii=False)
+
+
+def encoded_turn(turn: list[StreamEvent]) -> None:
+    events: list[EncodedEvent] = []
+    snapshot = StreamSnapshot()
+    for count, event in enumerate(turn, start=1):
+        encoded = EncodedEvent(event)
+        events.append(encoded)
+        _ = encoded.stream_payload
+        snapshot.add(encoded)
+        if count % SNAPSHOT_INTERVAL == 0:
+            snapshot.encode()
+    encode_event_log(events)
+
+
+def use_codec(codec: JSONCodec) -> None:
+    stream_events.json_codec = codec
+    stream_snapshot.json_codec = codec
+
+
+def measure(run: Any, turn: list[StreamEvent], repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(turn)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tool-calls", type=int, default=40)
+    parser.add_argument("--deltas", type=int, default=25)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    turn = build_turn(args.tool_calls, args.deltas)
+    print(f"{len(turn)} events per turn, median of {args.repeats} runs")
+
+    baseline = measure(legacy_turn, turn, args.repeats)
+    print(f"{'legacy':>16}: {baseline * 1000:8.2f} ms/turn")
+
+    codecs: list[JSONCodec] = [StdlibJSONCodec(), get_json_codec("orjson")]
+
+    for codec in codecs:
+        use_codec(codec)
+        elapsed = measure(encoded_turn, turn, args.repeats)
+        print(
+            f"{'encoded/' + codec.name:>16}: {elapsed * 1000:8.2f} ms/turn"
+            f"  ({baseline / elapsed:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
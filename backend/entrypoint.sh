@@ -44,7 +44,9 @@ fi
 if [ "$MODE" = "celery-worker" ]; then
     echo "Starting Celery worker..."
     CELERY_CONCURRENCY=${CELERY_CONCURRENCY:-25}
+    CELERY_QUEUES=${CELERY_QUEUES:-interactive,scheduled,maintenance}
     echo "Celery concurrency set to: $CELERY_CONCURRENCY"
+    echo "Celery queues: $CELERY_QUEUES"
 
     # Ensure storage directories exist with proper permissions
     mkdir -p /app/storage/celerybeat
@@ -54,9 +56,9 @@ if [ "$MODE" = "celery-worker" ]; then
     ensure_docker_network
     if [ -S /var/run/docker.sock ]; then
         echo "Docker socket detected, running as current user for Docker access..."
-        exec celery -A app.core.celery worker --pool=threads --concurrency=$CELERY_CONCURRENCY --loglevel=${LOG_LEVEL:-DEBUG}
+        exec celery -A app.core.celery worker --pool=threads --concurrency=$CELERY_CONCURRENCY --queues=$CELERY_QUEUES --loglevel=${LOG_LEVEL:-DEBUG}
     else
-        exec gosu appuser celery -A app.core.celery worker --pool=threads --concurrency=$CELERY_CONCURRENCY --loglevel=${LOG_LEVEL:-DEBUG}
+        exec gosu appuser celery -A app.core.celery worker --pool=threads --concurrency=$CELERY_CONCURRENCY --queues=$CELERY_QUEUES --loglevel=${LOG_LEVEL:-DEBUG}
     fi
 fi
 
@@ -4,8 +4,10 @@ import uuid
 
 import pytest
 from httpx import AsyncClient
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants import REDIS_KEY_USER_AUTH
 from app.core.security import get_password_hash
 from app.models.db_models import User
 from tests.conftest import TEST_PASSWORD
@@ -220,6 +222,38 @@ class TestLogout:
         )
         assert reuse_response.status_code == 401
 
+    async def test_logout_invalidates_cached_user(
+        self,
+        async_client: AsyncClient,
+        integration_user_fixture: User,
+        auth_headers: dict[str, str],
+        redis_client: Redis[str],
+    ) -> None:
+        cache_key = REDIS_KEY_USER_AUTH.format(user_id=integration_user_fixture.id)
+
+        me_response = await async_client.get("/api/v1/auth/me", headers=auth_headers)
+        assert me_response.status_code == 200
+        assert await redis_client.exists(cache_key)
+
+        login_response = await async_client.post(
+            "/api/v1/auth/jwt/login",
+            data={
+                "username": integration_user_fixture.email,
+                "password": TEST_PASSWORD,
+            },
+        )
+        response = await async_client.post(
+            "/api/v1/auth/jwt/logout",
+            json={"refresh_token": login_response.json()["refresh_token"]},
+        )
+
+        assert response.status_code == 204
+        assert not await redis_client.exists(cache_key)
+
+        me_response = await async_client.get("/api/v1/auth/me", headers=auth_headers)
+        assert me_response.status_code == 200
+        assert me_response.json()["id"] == str(integration_user_fixture.id)
+
 
 class TestCurrentUser:
     async def test_get_current_user(
@@ -1,12 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import uuid
+from unittest.mock import MagicMock
 
 import pytest
 from httpx import AsyncClient
-
-from app.models.db_models import Chat, User
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.services.chat as chat_module
+import app.tasks.chat_processor as chat_processor_module
+from app.constants import (
+    REDIS_KEY_CHAT_SNAPSHOT,
+    REDIS_KEY_CHAT_STATE,
+    REDIS_KEY_CHAT_STREAM,
+    REDIS_KEY_USER_ACTIVE_TURNS,
+)
+from app.models.db_models import Chat, Message, MessageRole, MessageStreamStatus, User
+from app.services.chat import ChatService
+from app.services.exceptions import ChatException
 from app.services.sandbox import SandboxService
+from app.services.streaming.state import STREAM_STATE_QUEUED, set_stream_state
+from app.services.user import UserService
 from tests.conftest import STREAMING_TEST_TIMEOUT
 
 
@@ -313,6 +330,70 @@ class TestDeleteAllChats:
         )
         assert list_response.json()["total"] == 0
 
+    async def test_soft_delete_schedules_sandbox_deletion(
+        self,
+        db_session: AsyncSession,
+        session_factory,
+        sample_user: User,
+        monkeypatch,
+    ) -> None:
+        other_user = User(
+            id=uuid.uuid4(),
+            email="other@example.com",
+            username="otheruser",
+            hashed_password="unused",
+        )
+        db_session.add(other_user)
+        chats = [
+            Chat(id=uuid.uuid4(), title="Chat", user_id=sample_user.id, **sandbox)
+            for sandbox in (
+                {"sandbox_id": "sbx-e2b", "sandbox_provider": "e2b"},
+                {"sandbox_id": "sbx-default", "sandbox_provider": None},
+                {"sandbox_id": None, "sandbox_provider": None},
+            )
+        ]
+        other_chat = Chat(
+            id=uuid.uuid4(), title="other", user_id=other_user.id, sandbox_id="sbx-x"
+        )
+        db_session.add_all([*chats, other_chat])
+        await db_session.flush()
+        message = Message(
+            id=uuid.uuid4(),
+            chat_id=chats[0].id,
+            content="hello",
+            role=MessageRole.USER,
+            stream_status=MessageStreamStatus.COMPLETED,
+        )
+        db_session.add(message)
+        await db_session.flush()
+
+        scheduled: list[tuple[str, list[dict[str, str | None]]]] = []
+        monkeypatch.setattr(
+            chat_module.delete_sandboxes,
+            "delay",
+            lambda user_id, sandboxes: scheduled.append((user_id, sandboxes)),
+        )
+        service = ChatService(
+            None, None, None, UserService(), session_factory=session_factory
+        )
+
+        assert await service.delete_all_chats(sample_user) == 2
+
+        assert scheduled == [
+            (
+                str(sample_user.id),
+                [
+                    {"sandbox_id": "sbx-e2b", "sandbox_provider": "e2b"},
+                    {"sandbox_id": "sbx-default", "sandbox_provider": None},
+                ],
+            )
+        ]
+        for row in [*chats, message, other_chat]:
+            await db_session.refresh(row)
+        assert all(chat.deleted_at is not None for chat in chats)
+        assert message.deleted_at is not None
+        assert other_chat.deleted_at is None
+
 
 class TestGetMessages:
     async def test_get_messages(
@@ -479,6 +560,114 @@ class TestChatCompletion:
         assert response.status_code == 401
 
 
+class TestActiveTurns:
+    async def test_concurrent_claims_respect_limit(
+        self, redis_client: Redis, monkeypatch
+    ) -> None:
+        monkeypatch.setattr(
+            chat_module.settings, "MAX_CONCURRENT_CHAT_TURNS_PER_USER", 2
+        )
+        service = ChatService(None, None, None, UserService())
+        user_id = uuid.uuid4()
+        chat_ids = [uuid.uuid4() for _ in range(5)]
+
+        results = await asyncio.gather(
+            *(service._claim_active_turn(user_id, chat_id) for chat_id in chat_ids),
+            return_exceptions=True,
+        )
+
+        claimed = [
+            chat_id for chat_id, r in zip(chat_ids, results, strict=True) if r is True
+        ]
+        assert len(claimed) == 2
+        assert all(isinstance(r, ChatException) for r in results if r is not True)
+        assert await service._claim_active_turn(user_id, claimed[0]) is False
+        key = REDIS_KEY_USER_ACTIVE_TURNS.format(user_id=user_id)
+        assert set(await redis_client.zrange(key, 0, -1)) == {
+            str(chat_id) for chat_id in claimed
+        }
+
+    async def test_setup_failure_releases_turn(self, redis_client: Redis) -> None:
+        chat_id = str(uuid.uuid4())
+        user_id = str(uuid.uuid4())
+        key = REDIS_KEY_USER_ACTIVE_TURNS.format(user_id=user_id)
+        await redis_client.zadd(key, {chat_id: 9_999_999_999})
+        await set_stream_state(
+            redis_client,
+            chat_id,
+            status=STREAM_STATE_QUEUED,
+            task_id="",
+            message_id="",
+            last_event_id="",
+        )
+
+        with pytest.raises(ChatException):
+            await chat_processor_module._initialize_and_process_chat(
+                task=MagicMock(),
+                context_hash="missing",
+                chat_id=chat_id,
+                user_id=user_id,
+                model_id="claude-haiku-4-5",
+                permission_mode="auto",
+                session_id=None,
+                assistant_message_id=None,
+                thinking_mode=None,
+            )
+
+        assert await redis_client.zscore(key, chat_id) is None
+        assert (
+            await redis_client.hget(
+                REDIS_KEY_CHAT_STATE.format(chat_id=chat_id), "status"
+            )
+            == MessageStreamStatus.FAILED.value
+        )
+        entries = await redis_client.xrange(
+            REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        )
+        assert [fields["kind"] for _, fields in entries] == ["error"]
+        assert "missing" in json.loads(entries[0][1]["payload"])["error"]
+
+
+class FakeResumeProvider:
+    def __init__(self) -> None:
+        self.connected: list[str] = []
+        self.cleaned_up = False
+
+    async def connect_sandbox(self, sandbox_id: str) -> bool:
+        self.connected.append(sandbox_id)
+        return True
+
+    async def cleanup(self) -> None:
+        self.cleaned_up = True
+
+
+class TestResumeSandbox:
+    async def test_resume_owns_its_provider(
+        self, redis_client: Redis, monkeypatch
+    ) -> None:
+        provider = FakeResumeProvider()
+        user_service = UserService()
+
+        async def create_sandbox_provider(*args, **kwargs) -> FakeResumeProvider:
+            return provider
+
+        async def get_chat_sandbox_id(chat_id: uuid.UUID, user: User) -> str:
+            return "sbx-resume"
+
+        monkeypatch.setattr(
+            user_service, "create_sandbox_provider", create_sandbox_provider
+        )
+        service = ChatService(None, None, None, user_service)
+        monkeypatch.setattr(service, "get_chat_sandbox_id", get_chat_sandbox_id)
+        user = MagicMock(id=uuid.uuid4())
+
+        await service._resume_sandbox(uuid.uuid4(), user)
+        await service._resume_sandbox(uuid.uuid4(), user)
+
+        assert provider.connected == ["sbx-resume"]
+        assert provider.cleaned_up
+
+
 class TestEnhancePrompt:
     @pytest.mark.timeout(STREAMING_TEST_TIMEOUT)
     async def test_enhance_prompt(
@@ -518,6 +707,53 @@ class TestEnhancePrompt:
         assert response.status_code in [400, 422]
 
 
+class TestStreamReplay:
+    async def test_reconnect_starts_from_snapshot(
+        self,
+        async_client: AsyncClient,
+        integration_chat_fixture: tuple[User, Chat, SandboxService],
+        auth_headers: dict[str, str],
+        redis_client: Redis[str],
+    ) -> None:
+        _, chat, _ = integration_chat_fixture
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat.id)
+
+        for text in ("Hel", "lo"):
+            snapshot_id = await redis_client.xadd(
+                stream_key,
+                {
+                    "kind": "content",
+                    "payload": json.dumps(
+                        {"event": {"type": "assistant_text", "text": text}}
+                    ),
+                },
+            )
+        await redis_client.hset(
+            REDIS_KEY_CHAT_SNAPSHOT.format(chat_id=chat.id),
+            mapping={
+                "id": snapshot_id,
+                "events": json.dumps([{"type": "assistant_text", "text": "Hello"}]),
+            },
+        )
+        await redis_client.xadd(stream_key, {"kind": "complete"})
+
+        async def received_events(headers: dict[str, str]) -> list[str]:
+            response = await async_client.get(
+                f"/api/v1/chat/chats/{chat.id}/stream", headers=headers
+            )
+            assert response.status_code == 200
+            return [
+                line[6:].strip()
+                for line in response.text.split("\n")
+                if line.startswith("event:")
+            ]
+
+        assert await received_events(auth_headers) == ["snapshot", "complete"]
+        assert await received_events(
+            {**auth_headers, "Last-Event-ID": snapshot_id}
+        ) == ["complete"]
+
+
 class TestStopStream:
     async def test_stop_stream(
         self,
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db_models import Chat, Message, MessageRole, MessageStreamStatus, User
+from app.services.sandbox import SandboxService
+from app.services.sandbox_providers import SandboxProvider
+
+
+class TestParseItemizedChanges:
+    def test_classifies_rsync_items(self) -> None:
+        output = "\n".join(
+            [
+                "*deleting   notes/old.txt",
+                ">f+++++++++ src/new.py",
+                "cL+++++++++ bin/tool",
+                ".f...p..... run.sh",
+                ">f.st...... README.md",
+                "cd+++++++++ src/",
+                ".d..t...... notes/",
+                "*deleting   build/",
+            ]
+        )
+
+        diff = SandboxProvider._parse_itemized_changes(output)
+
+        assert diff.removed == ["notes/old.txt"]
+        assert diff.added == ["src/new.py", "bin/tool"]
+        assert diff.changed == ["run.sh", "README.md"]
+
+    def test_ignores_blank_and_unchanged_lines(self) -> None:
+        diff = SandboxProvider._parse_itemized_changes("\n.d          ./\n")
+
+        assert (diff.added, diff.changed, diff.removed) == ([], [], [])
+
+
+@pytest.mark.docker
+class TestRestorePreview:
+    async def test_preview_lists_workspace_changes(
+        self,
+        docker_async_client: AsyncClient,
+        docker_integration_chat_fixture: tuple[User, Chat, SandboxService],
+        docker_auth_headers: dict[str, str],
+        db_session: AsyncSession,
+    ) -> None:
+        _, chat, service = docker_integration_chat_fixture
+        sandbox_id = chat.sandbox_id
+        assert sandbox_id
+        root = f"preview-{uuid.uuid4().hex[:8]}"
+        await service.execute_command(
+            sandbox_id,
+            f"mkdir -p {root} && echo one > {root}/changed.txt "
+            f"&& echo gone > {root}/deleted.txt",
+        )
+
+        message = Message(
+            id=uuid.uuid4(),
+            chat_id=chat.id,
+            content="checkpoint",
+            role=MessageRole.ASSISTANT,
+            stream_status=MessageStreamStatus.COMPLETED,
+        )
+        message.checkpoint_id = await service.create_checkpoint(
+            sandbox_id, str(message.id)
+        )
+        db_session.add(message)
+        await db_session.flush()
+
+        await service.execute_command(
+            sandbox_id,
+            f"echo two-two > {root}/changed.txt && rm {root}/deleted.txt "
+            f"&& echo new > {root}/created.txt",
+        )
+
+        response = await docker_async_client.post(
+            f"/api/v1/chat/chats/{chat.id}/restore/preview",
+            json={"message_id": str(message.id)},
+            headers=docker_auth_headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert f"{root}/deleted.txt" in data["added"]
+        assert f"{root}/changed.txt" in data["changed"]
+        assert f"{root}/created.txt" in data["removed"]
+        listing = await service.execute_command(sandbox_id, f"ls {root}")
+        assert "created.txt" in listing
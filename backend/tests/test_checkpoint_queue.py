@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from redis.asyncio import Redis
+
+import app.services.chat as chat_module
+import app.tasks.chat_processor as chat_processor_module
+import app.tasks.checkpoints as checkpoint_tasks
+from app.constants import (
+    REDIS_KEY_CHAT_CHECKPOINTS,
+    REDIS_KEY_CHAT_CHECKPOINTS_LOCK,
+    REDIS_KEY_CHECKPOINTS_PENDING,
+)
+from app.services.chat import ChatService
+from app.services.checkpoint_queue import PendingCheckpoint, checkpoint_queue
+from app.services.exceptions import ChatException, ErrorCode
+from app.services.user import UserService
+
+
+def _checkpoint(chat_id: str, message_id: str, enqueued_at: float) -> PendingCheckpoint:
+    return PendingCheckpoint(
+        chat_id=chat_id,
+        user_id=str(uuid.uuid4()),
+        sandbox_id="sbx",
+        sandbox_provider="docker",
+        message_id=message_id,
+        enqueued_at=enqueued_at,
+    )
+
+
+class TestCheckpointQueue:
+    async def test_entries_complete_in_turn_order(self, redis_client: Redis) -> None:
+        chat_id = str(uuid.uuid4())
+        first = _checkpoint(chat_id, "m1", 100.0)
+        second = _checkpoint(chat_id, "m2", 200.0)
+        await checkpoint_queue.enqueue(first)
+        await checkpoint_queue.enqueue(second)
+
+        assert await checkpoint_queue.peek(chat_id) == first
+        assert await redis_client.zscore(REDIS_KEY_CHECKPOINTS_PENDING, chat_id) == 100
+
+        # Only the head can be completed.
+        await checkpoint_queue.complete(second)
+        assert await checkpoint_queue.pending_count(chat_id) == 2
+
+        await checkpoint_queue.complete(first)
+        assert await checkpoint_queue.peek(chat_id) == second
+        assert await redis_client.zscore(REDIS_KEY_CHECKPOINTS_PENDING, chat_id) == 200
+
+        await checkpoint_queue.complete(second)
+        assert await checkpoint_queue.peek(chat_id) is None
+        assert await redis_client.zscore(REDIS_KEY_CHECKPOINTS_PENDING, chat_id) is None
+
+    async def test_lock_is_held_by_one_worker(self, redis_client: Redis) -> None:
+        chat_id = str(uuid.uuid4())
+
+        token = await checkpoint_queue.acquire(chat_id)
+        assert token
+        assert await checkpoint_queue.acquire(chat_id) is None
+
+        await checkpoint_queue.release(chat_id, "other")
+        assert await checkpoint_queue.acquire(chat_id) is None
+        await checkpoint_queue.release(chat_id, token)
+        assert await checkpoint_queue.acquire(chat_id)
+
+    async def test_wait_until_drained(self, redis_client: Redis) -> None:
+        chat_id = str(uuid.uuid4())
+        assert await checkpoint_queue.wait_until_drained(chat_id, 0)
+
+        checkpoint = _checkpoint(chat_id, "m1", time.time())
+        await checkpoint_queue.enqueue(checkpoint)
+        assert not await checkpoint_queue.wait_until_drained(chat_id, 0.3)
+
+        await checkpoint_queue.complete(checkpoint)
+        assert await checkpoint_queue.wait_until_drained(chat_id, 0)
+
+
+class TestPendingCheckpointSweep:
+    async def test_redispatches_stale_unlocked_chats(
+        self, redis_client: Redis, monkeypatch
+    ) -> None:
+        old = time.time() - 3600
+        stale, locked, fresh, orphan = (str(uuid.uuid4()) for _ in range(4))
+        await checkpoint_queue.enqueue(_checkpoint(stale, "m1", old))
+        await checkpoint_queue.enqueue(_checkpoint(locked, "m2", old))
+        await checkpoint_queue.enqueue(_checkpoint(fresh, "m3", time.time()))
+        await redis_client.set(
+            REDIS_KEY_CHAT_CHECKPOINTS_LOCK.format(chat_id=locked), "token"
+        )
+        await redis_client.zadd(REDIS_KEY_CHECKPOINTS_PENDING, {orphan: old})
+
+        dispatched: list[str] = []
+        monkeypatch.setattr(
+            checkpoint_tasks.create_chat_checkpoints, "delay", dispatched.append
+        )
+
+        result = await checkpoint_tasks._sweep_pending_checkpoints()
+
+        assert result == {"redispatched": 1}
+        assert dispatched == [stale]
+        assert await redis_client.zscore(REDIS_KEY_CHECKPOINTS_PENDING, orphan) is None
+        assert await redis_client.llen(REDIS_KEY_CHAT_CHECKPOINTS.format(chat_id=stale))
+
+
+class TestCheckpointWaits:
+    async def test_restore_answers_409_while_pending(
+        self, redis_client: Redis, monkeypatch
+    ) -> None:
+        monkeypatch.setattr(chat_module.settings, "CHECKPOINT_RESTORE_WAIT_SECONDS", 0)
+        chat_id = str(uuid.uuid4())
+        await checkpoint_queue.enqueue(_checkpoint(chat_id, "m1", time.time()))
+        service = ChatService(None, None, None, UserService())
+
+        with pytest.raises(ChatException) as exc_info:
+            await service._wait_for_checkpoints(
+                SimpleNamespace(id=chat_id, sandbox_id="sbx")  # type: ignore[arg-type]
+            )
+
+        assert exc_info.value.status_code == 409
+        assert exc_info.value.error_code == ErrorCode.CHAT_CHECKPOINT_PENDING
+
+    async def test_next_turn_drains_pending_checkpoints(
+        self, redis_client: Redis, monkeypatch
+    ) -> None:
+        monkeypatch.setattr(
+            chat_processor_module.settings, "CHECKPOINT_TURN_WAIT_SECONDS", 0
+        )
+        chat_id = str(uuid.uuid4())
+        checkpoint = _checkpoint(chat_id, "m1", time.time())
+        await checkpoint_queue.enqueue(checkpoint)
+        drained: list[str] = []
+
+        async def drain(chat_id: str) -> dict[str, Any]:
+            drained.append(chat_id)
+            await checkpoint_queue.complete(checkpoint)
+            return {"created": 1, "max_lag_seconds": 0.0}
+
+        monkeypatch.setattr(chat_processor_module, "drain_chat_checkpoints", drain)
+
+        await chat_processor_module._wait_for_checkpoints(
+            {"id": chat_id, "sandbox_id": "sbx"}
+        )
+
+        assert drained == [chat_id]
+        assert await checkpoint_queue.pending_count(chat_id) == 0
+
+    async def test_next_turn_fails_once_the_lock_would_have_expired(
+        self, redis_client: Redis, monkeypatch
+    ) -> None:
+        monkeypatch.setattr(
+            chat_processor_module.settings, "CHECKPOINT_TURN_WAIT_SECONDS", 0.2
+        )
+        monkeypatch.setattr(
+            chat_processor_module.settings, "CHECKPOINT_QUEUE_LOCK_SECONDS", 1
+        )
+        chat_id = str(uuid.uuid4())
+        await checkpoint_queue.enqueue(_checkpoint(chat_id, "m1", time.time()))
+        assert await checkpoint_queue.acquire(chat_id)
+        drained: list[str] = []
+
+        async def drain(chat_id: str) -> dict[str, Any]:
+            # Another worker holds the lock, so nothing is drained.
+            drained.append(chat_id)
+            return {"created": 0, "max_lag_seconds": 0.0}
+
+        monkeypatch.setattr(chat_processor_module, "drain_chat_checkpoints", drain)
+
+        with pytest.raises(ChatException) as exc_info:
+            await chat_processor_module._wait_for_checkpoints(
+                {"id": chat_id, "sandbox_id": "sbx"}
+            )
+
+        assert exc_info.value.error_code == ErrorCode.CHAT_CHECKPOINT_PENDING
+        assert len(drained) > 1
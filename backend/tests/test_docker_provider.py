@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from app.services.sandbox import SandboxService
+
+
+@pytest.mark.docker
+class TestDockerWriteFiles:
+    async def test_nested_write_keeps_existing_dirs(
+        self, docker_sandbox: tuple[SandboxService, str]
+    ) -> None:
+        service, sandbox_id = docker_sandbox
+        root = f"owner-{uuid.uuid4().hex[:8]}"
+        await service.execute_command(
+            sandbox_id, f"mkdir -p {root}/existing && chmod 700 {root}/existing"
+        )
+
+        await service.provider.write_files(
+            sandbox_id,
+            {
+                f"{root}/existing/file.txt": "existing",
+                f"{root}/new/deeper/file.txt": "new",
+            },
+        )
+
+        result = await service.execute_command(
+            sandbox_id,
+            f"stat -c '%U:%G %n' {root} {root}/existing {root}/existing/file.txt "
+            f"{root}/new {root}/new/deeper {root}/new/deeper/file.txt",
+        )
+        owners = [line.split()[0] for line in result.strip().splitlines()]
+        assert owners == ["user:user"] * 6
+        mode = await service.execute_command(sandbox_id, f"stat -c %a {root}/existing")
+        assert mode.strip() == "700"
+
+
+@pytest.mark.docker
+class TestDockerScanFiles:
+    async def test_scan_is_complete_despite_unreadable_dirs(
+        self, docker_sandbox: tuple[SandboxService, str]
+    ) -> None:
+        service, sandbox_id = docker_sandbox
+        root = f"scan-{uuid.uuid4().hex[:8]}"
+        await service.execute_command(
+            sandbox_id,
+            f"mkdir -p {root}/locked {root}/open && touch {root}/open/file.txt "
+            f"&& chmod 000 {root}/locked",
+        )
+
+        try:
+            scan = await service.provider.scan_files(sandbox_id, ["/home/user"])
+            assert scan.complete
+            assert f"{root}/open/file.txt" in {item.path for item in scan.files}
+
+            since = await service.provider.scan_files(
+                sandbox_id, ["/home/user"], changed_since=scan.scanned_at
+            )
+            assert since.complete
+        finally:
+            await service.execute_command(sandbox_id, f"chmod 755 {root}/locked")
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services.mcp_runtime import NPX_LAUNCHER_SCRIPT, npx_server_command
+
+
+class TestNpxServerCommand:
+    @pytest.mark.parametrize(
+        "package",
+        ["server", "server@1.2.3", "@scope/server", "@scope/server@latest"],
+    )
+    def test_registry_specs_use_the_launcher(self, package: str) -> None:
+        config = npx_server_command(package, ["--flag"])
+
+        assert config["command"] == "bash"
+        assert config["args"][-2:] == [package, "--flag"]
+
+    @pytest.mark.parametrize(
+        "package",
+        [
+            "github:owner/server",
+            "owner/server",
+            "https://example.com/server.tgz",
+            "alias@npm:server@1.0.0",
+            "./server",
+        ],
+    )
+    def test_other_specs_run_through_npx(self, package: str) -> None:
+        assert npx_server_command(package, ["--flag"]) == {
+            "command": "npx",
+            "args": ["-y", package, "--flag"],
+        }
+
+
+@pytest.mark.skipif(shutil.which("flock") is None, reason="flock not available")
+class TestNpxLauncherScript:
+    def _write_tool(self, path: Path, body: str) -> None:
+        path.write_text(f"#!/bin/bash\n{body}\n")
+        path.chmod(0o755)
+
+    def test_failed_install_is_not_retried_within_interval(
+        self, tmp_path: Path
+    ) -> None:
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        npm_log = tmp_path / "npm.log"
+        self._write_tool(bin_dir / "npm", f'echo "$*" >> {npm_log}; exit 1')
+        self._write_tool(bin_dir / "npx", 'echo "npx $*"')
+        root = tmp_path / "root"
+        prefix = root / "server"
+
+        def launch() -> str:
+            result = subprocess.run(
+                ["bash", "-c", NPX_LAUNCHER_SCRIPT, "claudex-mcp", str(root)]
+                + ["3600", "server", "--flag"],
+                env={"PATH": f"{bin_dir}:/usr/bin:/bin"},
+                capture_output=True,
+                text=True,
+                timeout=10,
+            )
+            return result.stdout.strip()
+
+        assert launch() == "npx -y server --flag"
+        deadline = time.monotonic() + 5
+        while not (prefix / "failed").exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert (prefix / "failed").exists()
+
+        assert launch() == "npx -y server --flag"
+        time.sleep(0.2)
+        installs = npm_log.read_text().splitlines()
+        assert len(installs) == 1
+        assert installs[0].endswith("--loglevel=error -- server")
+
+    def test_prune_keeps_stages_of_running_servers(self, tmp_path: Path) -> None:
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        self._write_tool(
+            bin_dir / "npm",
+            'stage=$3; mkdir -p "$stage/node_modules/.bin"; '
+            "printf '#!/bin/bash\\nexec sleep \"$1\"\\n' "
+            '> "$stage/node_modules/.bin/server"; '
+            'chmod +x "$stage/node_modules/.bin/server"',
+        )
+        self._write_tool(bin_dir / "node", "printf node_modules/.bin/server")
+        self._write_tool(bin_dir / "npx", "true")
+        root = tmp_path / "root"
+        prefix = root / "server"
+        args = ["bash", "-c", NPX_LAUNCHER_SCRIPT, "claudex-mcp", str(root), "0"]
+        env = {"PATH": f"{bin_dir}:/usr/bin:/bin"}
+
+        def wait_for_new_stage(previous: set[Path]) -> Path:
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                current = prefix / "current"
+                if current.is_symlink():
+                    stage = prefix / os.readlink(current)
+                    if stage not in previous and (stage / ".claudex-bin").exists():
+                        return stage
+                time.sleep(0.05)
+            raise AssertionError("install did not publish a new stage")
+
+        subprocess.run([*args, "server", "0"], env=env, timeout=10)
+        first = wait_for_new_stage(set())
+
+        server = subprocess.Popen([*args, "server", "30"], env=env)
+        try:
+            second = wait_for_new_stage({first})
+            subprocess.run([*args, "server", "0"], env=env, timeout=10)
+            third = wait_for_new_stage({first, second})
+            time.sleep(0.2)
+            assert first.exists()
+        finally:
+            server.kill()
+            server.wait()
+
+        subprocess.run([*args, "server", "0"], env=env, timeout=10)
+        wait_for_new_stage({first, second, third})
+        deadline = time.monotonic() + 5
+        while first.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not first.exists()
@@ -7,7 +7,7 @@ import uuid
 from httpx import AsyncClient
 from redis.asyncio import Redis
 
-from app.constants import REDIS_KEY_PERMISSION_RESPONSE
+from app.constants import REDIS_KEY_CHAT_STREAM, REDIS_KEY_PERMISSION_RESPONSE
 from app.core.security import create_chat_scoped_token
 from app.models.db_models import Chat, User
 from app.services.sandbox import SandboxService
@@ -37,6 +37,16 @@ class TestPermissionRequest:
         assert "request_id" in data
         assert uuid.UUID(data["request_id"])
 
+        entries = await redis_client.xrange(
+            REDIS_KEY_CHAT_STREAM.format(chat_id=chat.id)
+        )
+        assert len(entries) == 1
+        _, fields = entries[0]
+        assert fields["kind"] == "content"
+        event = json.loads(fields["payload"])["event"]
+        assert event["type"] == "permission_request"
+        assert event["request_id"] == data["request_id"]
+
     async def test_permission_request_requires_valid_token(
         self,
         async_client: AsyncClient,
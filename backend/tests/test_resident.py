@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+from pathlib import Path
+
+import pytest
+from claude_agent_sdk.types import ClaudeAgentOptions
+
+from app.services.sandbox_providers.types import DockerConfig
+from app.services.transports.docker import DockerSandboxTransport
+from app.services.transports.resident import (
+    ATTACH_SCRIPT,
+    SUPERVISOR_SCRIPT,
+    ResidentSession,
+)
+
+ECHO_CLI = (
+    r"""while read -r line; do printf '{"type":"result","session_id":"s1"}\n'; done"""
+)
+
+
+def _transport(
+    permission_mode: str = "auto",
+    resume: str | None = None,
+    files: dict[str, str] | None = None,
+) -> DockerSandboxTransport:
+    options = ClaudeAgentOptions(
+        resume=resume,
+        mcp_servers={
+            "permission": {
+                "command": "python3",
+                "args": ["-u", "/usr/local/bin/permission_server.py"],
+                "env": {"PERMISSION_MODE": permission_mode},
+            }
+        },
+    )
+    return DockerSandboxTransport(
+        sandbox_id="sandbox",
+        docker_config=DockerConfig(
+            preview_base_url="http://localhost", image="sandbox", network="bridge"
+        ),
+        prompt="",
+        options=options,
+        resident=ResidentSession(
+            key="chat", idle_timeout=60, max_age=600, files=files or {}
+        ),
+    )
+
+
+def _fingerprint(transport: DockerSandboxTransport) -> str:
+    envs, cwd, user = transport._prepare_environment()
+    args = shlex.split(transport._build_launch_command(envs, cwd, user))
+    return args[5]
+
+
+class TestResidentFingerprint:
+    def test_ignores_resume_and_per_turn_files(self) -> None:
+        base = _fingerprint(_transport())
+
+        assert _fingerprint(_transport(resume="session-1")) == base
+        assert _fingerprint(_transport(files={"TOKEN": "secret"})) == base
+
+    def test_changes_with_permission_mode(self) -> None:
+        assert _fingerprint(_transport(permission_mode="plan")) != _fingerprint(
+            _transport(permission_mode="auto")
+        )
+
+
+class TestResidentTransport:
+    async def test_answers_initialize_for_reused_cli(self) -> None:
+        transport = _transport()
+        transport.reused = True
+        request = {
+            "type": "control_request",
+            "request_id": "req_1",
+            "request": {"subtype": "initialize"},
+        }
+
+        assert await transport._answer_initialize(json.dumps(request))
+        response = json.loads(transport._stdout_queue.get_nowait())
+        assert response["type"] == "control_response"
+        assert response["response"]["request_id"] == "req_1"
+
+        other = {"type": "control_request", "request": {"subtype": "interrupt"}}
+        assert not await transport._answer_initialize(json.dumps(other))
+        assert not await transport._answer_initialize('{"type":"user"}')
+
+    async def test_attach_message_is_consumed(self) -> None:
+        transport = _transport()
+        transport._ready = True
+        await transport._stdout_queue.put(
+            '{"type":"claudex_attach","reused":true}\n'
+            '{"type":"assistant","message":{"content":[]}}\n'
+        )
+        await transport._stdout_queue.put('{"type":"result","session_id":"s1"}\n')
+
+        messages = [message async for message in transport._parse_cli_output()]
+
+        assert [message["type"] for message in messages] == ["assistant", "result"]
+        assert transport.reused
+        assert transport._attached.is_set()
+
+
+@pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("flock", "setsid", "mkfifo")),
+    reason="util-linux tools not available",
+)
+class TestResidentAttachScript:
+    def _attach(self, directory: Path, fingerprint: str) -> list[dict[str, object]]:
+        result = subprocess.run(
+            [
+                "bash",
+                "-c",
+                ATTACH_SCRIPT,
+                "claudex-attach",
+                str(directory),
+                fingerprint,
+                "",
+                "30",
+                "600",
+                ECHO_CLI,
+                SUPERVISOR_SCRIPT,
+            ],
+            input='{"type":"user"}\n',
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        assert result.returncode == 0, result.stderr
+        return [json.loads(line) for line in result.stdout.splitlines()]
+
+    def test_stale_pid_is_not_treated_as_supervisor(self, tmp_path: Path) -> None:
+        directory = tmp_path / "chat"
+        directory.mkdir()
+        bystander = subprocess.Popen(["sleep", "60"], start_new_session=True)
+        (directory / "pid").write_text(str(bystander.pid))
+        (directory / "fingerprint").write_text("old")
+        supervisor = None
+        try:
+            first = self._attach(directory, "fp")
+            supervisor = int((directory / "pid").read_text())
+
+            assert first[0] == {"type": "claudex_attach", "reused": False}
+            assert supervisor != bystander.pid
+            assert bystander.poll() is None
+
+            second = self._attach(directory, "fp")
+            assert second[0] == {"type": "claudex_attach", "reused": True}
+            assert second[1]["type"] == "result"
+        finally:
+            if supervisor:
+                os.killpg(supervisor, signal.SIGTERM)
+            bystander.kill()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import app.services.resource_bundle as resource_bundle_module
+from app.services.resource_bundle import ResourceBundleService
+
+
+class TestFileDigests:
+    def test_changed_file_replaces_its_entry(self, tmp_path: Path, monkeypatch) -> None:
+        monkeypatch.setattr(resource_bundle_module, "_file_digests", OrderedDict())
+        path = tmp_path / "command.md"
+        path.write_text("one")
+        assert (
+            ResourceBundleService._file_digest(path)
+            == hashlib.sha256(b"one").hexdigest()
+        )
+
+        path.write_text("two!")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert (
+            ResourceBundleService._file_digest(path)
+            == hashlib.sha256(b"two!").hexdigest()
+        )
+        assert list(resource_bundle_module._file_digests) == [str(path)]
+
+    def test_cache_is_bounded(self, tmp_path: Path, monkeypatch) -> None:
+        monkeypatch.setattr(resource_bundle_module, "_file_digests", OrderedDict())
+        monkeypatch.setattr(resource_bundle_module, "FILE_DIGEST_CACHE_SIZE", 2)
+        paths = [tmp_path / f"agent-{index}.md" for index in range(3)]
+        for path in paths:
+            path.write_text(path.name)
+            ResourceBundleService._file_digest(path)
+
+        assert list(resource_bundle_module._file_digests) == [str(p) for p in paths[1:]]
@@ -51,6 +51,38 @@ class TestSandboxFiles:
         assert "files" in data
         assert isinstance(data["files"], list)
 
+    async def test_get_files_metadata_since_version(
+        self,
+        sandbox_test_context: SandboxTestContext,
+    ) -> None:
+        ctx = sandbox_test_context
+        url = f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files/metadata"
+
+        initial = await ctx.client.get(url, headers=ctx.auth_headers)
+        assert initial.status_code == 200
+        version = initial.json()["version"]
+        assert version
+
+        filename = f"delta_{ctx.provider}.txt"
+        await ctx.client.put(
+            f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files",
+            json={"file_path": f"/home/user/{filename}", "content": "delta"},
+            headers=ctx.auth_headers,
+        )
+
+        response = await ctx.client.get(
+            url, params={"since": version}, headers=ctx.auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["full"] is False
+        assert data["files"] == []
+        assert data["version"] != version
+        changed = {c["path"]: c for c in data["changes"]}
+        assert changed[filename]["op"] == "upsert"
+        assert changed[filename]["file"]["type"] == "file"
+
     async def test_write_file(
         self,
         sandbox_test_context: SandboxTestContext,
@@ -95,6 +127,48 @@ class TestSandboxFiles:
         assert data["path"] == test_filename
         assert data["content"] == test_content
 
+    async def test_get_file_content_conditional_and_ranged(
+        self,
+        sandbox_test_context: SandboxTestContext,
+    ) -> None:
+        ctx = sandbox_test_context
+        test_filename = f"range_test_{ctx.provider}.txt"
+        test_content = "0123456789" * 10
+
+        await ctx.client.put(
+            f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files",
+            json={"file_path": f"/home/user/{test_filename}", "content": test_content},
+            headers=ctx.auth_headers,
+        )
+        url = f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files/content/{test_filename}"
+
+        first = await ctx.client.get(url, headers=ctx.auth_headers)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        revalidated = await ctx.client.get(
+            url, headers={**ctx.auth_headers, "If-None-Match": etag}
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+
+        ranged = await ctx.client.get(
+            url, params={"offset": 95, "length": 20}, headers=ctx.auth_headers
+        )
+        assert ranged.status_code == 200
+        data = ranged.json()
+        assert data["content"] == "56789"
+        assert data["offset"] == 95
+        assert data["size"] == 100
+
+        raw = await ctx.client.get(
+            f"/api/v1/sandbox/{ctx.chat.sandbox_id}/files/raw/{test_filename}",
+            headers={**ctx.auth_headers, "Range": "bytes=10-19"},
+        )
+        assert raw.status_code == 206
+        assert raw.headers["content-range"] == "bytes 10-19/100"
+        assert raw.content == b"0123456789"
+
     async def test_get_file_not_found(
         self,
         sandbox_test_context: SandboxTestContext,
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import app.services.sandbox_lifecycle as lifecycle_module
+import app.tasks.sandbox_lifecycle as lifecycle_tasks
+from app.constants import (
+    REDIS_KEY_CHAT_TASK,
+    REDIS_KEY_SANDBOX_ACTIVITY,
+    REDIS_KEY_SANDBOX_RESUME,
+)
+from app.core.config import get_settings
+from app.services.exceptions import UserException
+from app.services.sandbox import SandboxService
+from app.services.sandbox_lifecycle import SandboxLifecycleManager, sandbox_lifecycle
+
+settings = get_settings()
+
+
+class FakeSuspendProvider:
+    def __init__(self) -> None:
+        self.suspended: list[str] = []
+        self.cleaned_up = False
+
+    async def suspend_sandbox(self, sandbox_id: str) -> bool:
+        self.suspended.append(sandbox_id)
+        return True
+
+    async def cleanup(self) -> None:
+        self.cleaned_up = True
+
+
+class TestSandboxActivity:
+    async def test_record_activity_is_throttled(self, redis_client) -> None:
+        manager = SandboxLifecycleManager()
+        sandbox_id = f"sbx-{uuid.uuid4().hex[:8]}"
+
+        await manager.record_activity(sandbox_id)
+        first = await redis_client.zscore(REDIS_KEY_SANDBOX_ACTIVITY, sandbox_id)
+        assert first is not None
+
+        await redis_client.zadd(REDIS_KEY_SANDBOX_ACTIVITY, {sandbox_id: 1.0})
+        await manager.record_activity(sandbox_id)
+        assert await redis_client.zscore(REDIS_KEY_SANDBOX_ACTIVITY, sandbox_id) == 1.0
+
+        await manager.record_activity(sandbox_id, force=True)
+        forced = await redis_client.zscore(REDIS_KEY_SANDBOX_ACTIVITY, sandbox_id)
+        assert forced is not None and forced >= first
+
+    async def test_throttle_entries_expire(self, redis_client, monkeypatch) -> None:
+        manager = SandboxLifecycleManager()
+        now = time.time()
+        monkeypatch.setattr(lifecycle_module, "time", SimpleNamespace(time=lambda: now))
+        for index in range(5):
+            await manager.record_activity(f"old-{index}")
+        assert len(manager._last_recorded) == 5
+
+        later = now + settings.SANDBOX_ACTIVITY_WRITE_INTERVAL_SECONDS
+        monkeypatch.setattr(
+            lifecycle_module, "time", SimpleNamespace(time=lambda: later)
+        )
+        await manager.record_activity("new")
+
+        assert list(manager._last_recorded) == ["new"]
+
+    async def test_get_idle_sandboxes_and_forget(self, redis_client) -> None:
+        now = time.time()
+        await redis_client.zadd(
+            REDIS_KEY_SANDBOX_ACTIVITY, {"idle": now - 3600, "busy": now}
+        )
+        await redis_client.set(REDIS_KEY_SANDBOX_RESUME.format(sandbox_id="idle"), "1")
+
+        assert await sandbox_lifecycle.get_idle_sandboxes(1800) == ["idle"]
+
+        await sandbox_lifecycle.forget("idle")
+        assert await redis_client.zscore(REDIS_KEY_SANDBOX_ACTIVITY, "idle") is None
+        assert not await redis_client.exists(
+            REDIS_KEY_SANDBOX_RESUME.format(sandbox_id="idle")
+        )
+        assert await sandbox_lifecycle.get_idle_sandboxes(1800) == []
+
+
+class TestReapIdleSandboxes:
+    async def test_reap_idle_sandboxes(self, redis_client, monkeypatch) -> None:
+        idle_at = time.time() - settings.SANDBOX_IDLE_TIMEOUT_SECONDS - 60
+        active_chat_id = str(uuid.uuid4())
+        await redis_client.zadd(
+            REDIS_KEY_SANDBOX_ACTIVITY,
+            {"orphan": idle_at, "active": idle_at, "idle": idle_at},
+        )
+        await redis_client.set(
+            REDIS_KEY_CHAT_TASK.format(chat_id=active_chat_id), "task"
+        )
+
+        async def load_docker_chats(sandbox_ids: list[str]) -> dict[str, str]:
+            return {"active": active_chat_id, "idle": str(uuid.uuid4())}
+
+        provider = FakeSuspendProvider()
+        monkeypatch.setattr(lifecycle_tasks, "_load_docker_chats", load_docker_chats)
+        monkeypatch.setattr(
+            lifecycle_tasks, "create_sandbox_provider", lambda *args: provider
+        )
+
+        result = await lifecycle_tasks._reap_idle_sandboxes()
+
+        assert result == {"suspended": 1}
+        assert provider.suspended == ["idle"]
+        assert provider.cleaned_up
+        remaining = await redis_client.zrange(
+            REDIS_KEY_SANDBOX_ACTIVITY, 0, -1, withscores=True
+        )
+        assert [member for member, _ in remaining] == ["active"]
+        assert remaining[0][1] > idle_at
+
+
+class FakeDeleteProvider:
+    def __init__(self, failures: dict[str, int] | None = None) -> None:
+        self.failures = failures or {}
+        self.attempts: dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cleaned_up = False
+
+    async def delete_sandbox(self, sandbox_id: str) -> None:
+        self.attempts[sandbox_id] = self.attempts.get(sandbox_id, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.attempts[sandbox_id] <= self.failures.get(sandbox_id, 0):
+                raise RuntimeError("delete failed")
+        finally:
+            self.in_flight -= 1
+
+    async def cleanup(self) -> None:
+        self.cleaned_up = True
+
+
+class TestDeleteSandboxes:
+    @pytest.fixture
+    def provider(self, redis_client, monkeypatch) -> FakeDeleteProvider:
+        provider = FakeDeleteProvider()
+
+        async def load_provider_defaults(user_id: str) -> tuple[str, str | None]:
+            return "docker", None
+
+        monkeypatch.setattr(
+            lifecycle_tasks, "_load_provider_defaults", load_provider_defaults
+        )
+        monkeypatch.setattr(
+            lifecycle_tasks, "create_sandbox_provider", lambda **kwargs: provider
+        )
+        monkeypatch.setattr(
+            lifecycle_tasks.settings, "SANDBOX_DELETE_RETRY_DELAY_SECONDS", 0
+        )
+        return provider
+
+    async def test_deletions_are_bounded(
+        self, provider: FakeDeleteProvider, monkeypatch
+    ) -> None:
+        monkeypatch.setattr(lifecycle_tasks.settings, "SANDBOX_DELETE_CONCURRENCY", 2)
+        sandboxes: list[dict[str, str | None]] = [
+            {"sandbox_id": f"sbx-{index}", "sandbox_provider": None}
+            for index in range(6)
+        ]
+
+        result = await lifecycle_tasks._delete_sandboxes(
+            MagicMock(), str(uuid.uuid4()), sandboxes
+        )
+
+        assert result == {"total": 6, "deleted": 6, "failed": 0}
+        assert provider.max_in_flight == 2
+        assert provider.cleaned_up
+
+    async def test_failed_deletions_are_retried(
+        self, provider: FakeDeleteProvider, monkeypatch
+    ) -> None:
+        monkeypatch.setattr(lifecycle_tasks.settings, "SANDBOX_DELETE_MAX_ATTEMPTS", 3)
+        provider.failures = {"flaky": 2, "broken": 3}
+        sandboxes: list[dict[str, str | None]] = [
+            {"sandbox_id": sandbox_id, "sandbox_provider": "docker"}
+            for sandbox_id in ("flaky", "broken", "ok")
+        ]
+
+        result = await lifecycle_tasks._delete_sandboxes(
+            MagicMock(), str(uuid.uuid4()), sandboxes
+        )
+
+        assert result == {"total": 3, "deleted": 2, "failed": 1}
+        assert provider.attempts == {"flaky": 3, "broken": 3, "ok": 1}
+
+    async def test_missing_settings_fall_back_to_docker(self, monkeypatch) -> None:
+        @asynccontextmanager
+        async def session_factory():
+            yield None
+
+        @asynccontextmanager
+        async def celery_session():
+            yield session_factory, None
+
+        async def get_user_settings(self, user_id, db=None):
+            raise UserException("User settings not found")
+
+        monkeypatch.setattr(lifecycle_tasks, "get_celery_session", celery_session)
+        monkeypatch.setattr(
+            lifecycle_tasks.UserService, "get_user_settings", get_user_settings
+        )
+
+        assert await lifecycle_tasks._load_provider_defaults(str(uuid.uuid4())) == (
+            "docker",
+            None,
+        )
+
+
+@pytest.mark.docker
+class TestDockerSuspend:
+    async def test_suspend_and_resume(
+        self, docker_sandbox: tuple[SandboxService, str]
+    ) -> None:
+        service, sandbox_id = docker_sandbox
+
+        assert await service.provider.suspend_sandbox(sandbox_id)
+        assert not await service.provider.suspend_sandbox(sandbox_id)
+
+        assert await service.provider.connect_sandbox(sandbox_id)
+        result = await service.execute_command(sandbox_id, "echo resumed")
+        assert "resumed" in result
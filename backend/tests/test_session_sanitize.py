@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app.services.sandbox import SESSION_SANITIZE_CHECK_BYTES, SESSION_SANITIZE_SCRIPT
+
+pytestmark = pytest.mark.skipif(shutil.which("jq") is None, reason="jq not available")
+
+THINKING_FILTER = (
+    'if .message.content then .message.content |= [.[] | select(.type != "thinking")] '
+    "else . end"
+)
+
+
+def _line(*types: str) -> str:
+    return json.dumps({"message": {"content": [{"type": t} for t in types]}}) + "\n"
+
+
+def _sanitize(session: Path, marker: Path) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        ["bash", "-c", SESSION_SANITIZE_SCRIPT],
+        env={
+            "PATH": "/usr/bin:/bin",
+            "f": str(session),
+            "m": str(marker),
+            "tmp": f"{session}.tmp",
+            "filter": THINKING_FILTER,
+            "window": str(SESSION_SANITIZE_CHECK_BYTES),
+        },
+        capture_output=True,
+        text=True,
+    )
+
+
+class TestSessionSanitizeScript:
+    def test_incremental_pass_filters_appended_lines(self, tmp_path: Path) -> None:
+        session = tmp_path / "session.jsonl"
+        marker = tmp_path / "marker"
+        session.write_text(_line("text", "thinking"))
+
+        assert _sanitize(session, marker).stdout.strip() == "OK full"
+        assert _sanitize(session, marker).stdout.strip() == "OK unchanged"
+
+        with session.open("a") as f:
+            f.write(_line("thinking", "tool_use"))
+        assert _sanitize(session, marker).stdout.strip() == "OK incremental"
+        assert [json.loads(line) for line in session.read_text().splitlines()] == [
+            {"message": {"content": [{"type": "text"}]}},
+            {"message": {"content": [{"type": "tool_use"}]}},
+        ]
+
+    def test_failed_incremental_pass_resets_marker(self, tmp_path: Path) -> None:
+        session = tmp_path / "session.jsonl"
+        marker = tmp_path / "marker"
+        session.write_text(_line("text"))
+        assert _sanitize(session, marker).returncode == 0
+
+        partial = _line("thinking", "text")
+        with session.open("a") as f:
+            f.write(partial[:10])
+        assert _sanitize(session, marker).returncode != 0
+        assert not marker.exists()
+        assert not Path(f"{session}.tmp").exists()
+
+        with session.open("a") as f:
+            f.write(partial[10:])
+        assert _sanitize(session, marker).stdout.strip() == "OK full"
+        assert [json.loads(line) for line in session.read_text().splitlines()] == [
+            {"message": {"content": [{"type": "text"}]}}
+        ] * 2
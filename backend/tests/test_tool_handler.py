@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.sandbox import SESSION_TRANSCRIPT_PATH, SandboxService
+from app.services.tool_handler import ResultNormalizer, ToolHandlerRegistry
+
+
+class TestResultNormalizer:
+    def test_strings_share_one_budget(self) -> None:
+        normalizer = ResultNormalizer(max_chars=10, max_depth=5)
+
+        result = normalizer.normalize(["abcdef", "ghijkl", "mnop"])
+
+        assert result == ["abcdef", "ghij", ""]
+        assert normalizer.truncated_chars == 6
+
+    def test_parses_json_strings_within_budget(self) -> None:
+        normalizer = ResultNormalizer(max_chars=100, max_depth=5)
+
+        assert normalizer.normalize({"output": '{"ok": true}'}) == {
+            "output": {"ok": True}
+        }
+        assert normalizer.truncated_chars == 0
+
+    def test_values_past_max_depth_use_the_budget(self) -> None:
+        normalizer = ResultNormalizer(max_chars=20, max_depth=1)
+        inner = {"text": "x" * 50}
+        inner_json = json.dumps(inner, separators=(",", ":"))
+
+        result = normalizer.normalize({"level": {"inner": inner}})
+
+        assert result == {"level": {"inner": inner_json[:20]}}
+        assert normalizer.truncated_chars == len(inner_json) - 20
+
+    def test_strings_past_max_depth_are_not_parsed(self) -> None:
+        normalizer = ResultNormalizer(max_chars=100, max_depth=0)
+
+        assert normalizer.normalize(["[1, 2]"]) == ["[1, 2]"]
+
+
+class TestToolHandlerRegistry:
+    def _start(self, registry: ToolHandlerRegistry, tool_id: str) -> None:
+        registry.start_tool(
+            SimpleNamespace(id=tool_id, name="Bash", input={"command": "ls"})  # type: ignore[arg-type]
+        )
+
+    def test_truncated_result_carries_result_ref(self, monkeypatch) -> None:
+        import app.services.tool_handler as tool_handler_module
+
+        monkeypatch.setattr(tool_handler_module.settings, "TOOL_RESULT_MAX_CHARS", 8)
+        registry = ToolHandlerRegistry()
+        self._start(registry, "toolu_1")
+
+        event = registry.finish_tool("toolu_1", "0123456789abcdef")
+
+        assert event is not None
+        assert event["tool"]["result"] == "01234567"
+        assert event["tool"]["truncated_chars"] == 8
+        assert event["tool"]["result_ref"] == "toolu_1"
+
+    def test_complete_result_has_no_result_ref(self) -> None:
+        registry = ToolHandlerRegistry()
+        self._start(registry, "toolu_2")
+
+        event = registry.finish_tool("toolu_2", "done")
+
+        assert event is not None
+        assert event["tool"]["result"] == "done"
+        assert "result_ref" not in event["tool"]
+
+
+@pytest.mark.docker
+class TestToolResultLookup:
+    async def test_get_tool_result_reads_session_transcript(
+        self, docker_sandbox: tuple[SandboxService, str]
+    ) -> None:
+        service, sandbox_id = docker_sandbox
+        session_id = str(uuid.uuid4())
+        full_output = "line\n" * 5000
+        entries = [
+            {
+                "type": "assistant",
+                "message": {
+                    "content": [{"type": "tool_use", "id": "toolu_a", "name": "Bash"}]
+                },
+            },
+            {
+                "type": "user",
+                "message": {
+                    "content": [
+                        {
+                            "type": "tool_result",
+                            "tool_use_id": "toolu_a",
+                            "content": full_output,
+                        }
+                    ]
+                },
+            },
+        ]
+        await service.provider.write_file(
+            sandbox_id,
+            SESSION_TRANSCRIPT_PATH.format(session_id=session_id),
+            "".join(
+                json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries
+            ),
+        )
+
+        assert (
+            await service.get_tool_result(sandbox_id, session_id, "toolu_a")
+            == full_output
+        )
+        assert await service.get_tool_result(sandbox_id, session_id, "toolu_b") is None
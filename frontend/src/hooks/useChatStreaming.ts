@@ -94,6 +94,7 @@ export function useChatStreaming({
 
   const {
     onChunk,
+    onSnapshot,
     onComplete,
     onError,
     startStream,
@@ -131,6 +132,7 @@ export function useChatStreaming({
         lastConnectedStreamRef.current = existingStream.id;
         updateStreamCallbacks(chatId, existingStream.messageId, {
           onChunk,
+          onSnapshot,
           onComplete,
           onError,
         });
@@ -143,7 +145,7 @@ export function useChatStreaming({
 
     const unsubscribe = useStreamStore.subscribe(checkAndUpdateCallbacks);
     return () => unsubscribe();
-  }, [chatId, updateStreamCallbacks, onChunk, onComplete, onError]);
+  }, [chatId, updateStreamCallbacks, onChunk, onSnapshot, onComplete, onError]);
 
   useEffect(() => {
     if (prevChatIdRef.current !== chatId) {
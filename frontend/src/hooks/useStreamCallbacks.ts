@@ -26,6 +26,7 @@ interface UseStreamCallbacksParams {
 
 interface UseStreamCallbacksResult {
   onChunk: (event: AssistantStreamEvent, messageId: string) => void;
+  onSnapshot: (events: AssistantStreamEvent[], messageId: string) => void;
   onComplete: () => void;
   onError: (error: Error, messageId?: string) => void;
   startStream: (request: StreamOptions['request']) => Promise<string>;
@@ -55,6 +56,7 @@ export function useStreamCallbacks({
   const optionsRef = useRef<{
     chatId: string;
     onChunk?: (event: AssistantStreamEvent, messageId: string) => void;
+    onSnapshot?: (events: AssistantStreamEvent[], messageId: string) => void;
     onComplete?: (messageId?: string) => void;
     onError?: (error: Error, messageId?: string) => void;
   } | null>(null);
@@ -102,6 +104,21 @@ export function useStreamCallbacks({
     [updateMessageInCache, onPermissionRequest, setMessages, pendingStopRef],
   );
 
+  const onSnapshot = useCallback(
+    (events: AssistantStreamEvent[], messageId: string) => {
+      if (pendingStopRef.current.has(messageId)) {
+        return;
+      }
+
+      const content = JSON.stringify(events);
+      setMessages((prevMessages) =>
+        prevMessages.map((msg) => (msg.id === messageId ? { ...msg, content } : msg)),
+      );
+      updateMessageInCache(messageId, (cachedMsg) => ({ ...cachedMsg, content }));
+    },
+    [updateMessageInCache, setMessages, pendingStopRef],
+  );
+
   const onComplete = useCallback(() => {
     setStreamState('idle');
     setCurrentMessageId(null);
@@ -163,8 +180,8 @@ export function useStreamCallbacks({
   );
 
   useEffect(() => {
-    optionsRef.current = chatId ? { chatId, onChunk, onComplete, onError } : null;
-  }, [chatId, onChunk, onComplete, onError]);
+    optionsRef.current = chatId ? { chatId, onChunk, onSnapshot, onComplete, onError } : null;
+  }, [chatId, onChunk, onSnapshot, onComplete, onError]);
 
   const startStream = useCallback(async (request: StreamOptions['request']): Promise<string> => {
     const currentOptions = optionsRef.current;
@@ -176,6 +193,7 @@ export function useStreamCallbacks({
       chatId: currentOptions.chatId,
       request,
       onChunk: currentOptions.onChunk,
+      onSnapshot: currentOptions.onSnapshot,
       onComplete: currentOptions.onComplete,
       onError: currentOptions.onError,
     };
@@ -193,6 +211,7 @@ export function useStreamCallbacks({
       chatId: currentOptions.chatId,
       messageId,
       onChunk: currentOptions.onChunk,
+      onSnapshot: currentOptions.onSnapshot,
       onComplete: currentOptions.onComplete,
       onError: currentOptions.onError,
     });
@@ -208,6 +227,7 @@ export function useStreamCallbacks({
 
   return {
     onChunk,
+    onSnapshot,
     onComplete,
     onError,
     startStream,
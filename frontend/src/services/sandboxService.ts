@@ -3,6 +3,7 @@ import { ensureResponse, NotFoundError, serviceCall, ValidationError } from '@/s
 import type {
   FileContent,
   FileMetadata,
+  FilesMetadataResponse,
   PortInfo,
   PreviewLinksResponse,
   Secret,
@@ -34,18 +35,48 @@ async function getPreviewLinks(sandboxId: string): Promise<PortInfo[]> {
   }
 }
 
+// Last listing per sandbox, so polls only transfer what changed since the
+// version the server handed out with it.
+const filesMetadataCache = new Map<string, { version: string; files: Map<string, FileMetadata> }>();
+
 async function getSandboxFilesMetadata(sandboxId: string): Promise<FileMetadata[]> {
   validateRequired(sandboxId, 'Sandbox ID');
 
   return serviceCall(async () => {
-    const url = `/sandbox/${sandboxId}/files/metadata`;
-    const response = await apiClient.get<{ files: FileMetadata[] }>(url);
+    const cached = filesMetadataCache.get(sandboxId);
+    const params = new URLSearchParams();
+    if (cached) {
+      params.append('since', cached.version);
+    }
+    const query = params.toString();
+    const url = `/sandbox/${sandboxId}/files/metadata${query ? `?${query}` : ''}`;
+    const response = await apiClient.get<FilesMetadataResponse>(url);
 
-    if (!response || !response.files) {
+    if (!response) {
       return [];
     }
 
-    return response.files;
+    let files: Map<string, FileMetadata>;
+    if (response.full || !cached) {
+      files = new Map((response.files ?? []).map((file) => [file.path, file]));
+    } else {
+      files = new Map(cached.files);
+      for (const change of response.changes) {
+        if (change.op === 'delete') {
+          files.delete(change.path);
+        } else if (change.file) {
+          files.set(change.path, change.file);
+        }
+      }
+    }
+
+    if (response.version) {
+      filesMetadataCache.set(sandboxId, { version: response.version, files });
+    } else {
+      filesMetadataCache.delete(sandboxId);
+    }
+
+    return Array.from(files.values());
   });
 }
 
@@ -10,6 +10,7 @@ export interface StreamOptions {
   chatId: string;
   request: ChatRequest;
   onChunk?: (event: AssistantStreamEvent, messageId: string) => void;
+  onSnapshot?: (events: AssistantStreamEvent[], messageId: string) => void;
   onComplete?: (messageId?: string) => void;
   onError?: (error: Error, messageId?: string) => void;
 }
@@ -18,6 +19,7 @@ interface StreamReconnectOptions {
   chatId: string;
   messageId: string;
   onChunk?: (event: AssistantStreamEvent, messageId: string) => void;
+  onSnapshot?: (events: AssistantStreamEvent[], messageId: string) => void;
   onComplete?: (messageId?: string) => void;
   onError?: (error: Error, messageId?: string) => void;
 }
@@ -79,6 +81,28 @@ class StreamService {
     }
   }
 
+  // A snapshot is the compacted event log of the message so far; it replaces
+  // whatever content the client has instead of being appended to it.
+  private handleSnapshotEvent(
+    event: MessageEvent,
+    streamId: string,
+    messageId: string,
+    chatId: string,
+  ): void {
+    if (event.lastEventId) {
+      chatStorage.setEventId(chatId, event.lastEventId);
+    }
+
+    if (!event.data) return;
+
+    const callbacks = this.store.getStream(streamId)?.callbacks;
+    const parsed = this.parseStreamEvent<{ events?: AssistantStreamEvent[] }>(event.data);
+
+    if (parsed?.events && callbacks?.onSnapshot) {
+      callbacks.onSnapshot(parsed.events, messageId);
+    }
+  }
+
   private handleErrorEvent(
     event: MessageEvent,
     streamId: string,
@@ -161,6 +185,10 @@ class StreamService {
       this.handleContentEvent(event as MessageEvent, streamId, messageId, chatId),
     );
 
+    register('snapshot', (event: Event) =>
+      this.handleSnapshotEvent(event as MessageEvent, streamId, messageId, chatId),
+    );
+
     register('error', (event: Event) =>
       this.handleErrorEvent(event as MessageEvent, streamId, messageId, chatId),
     );
@@ -190,6 +218,7 @@ class StreamService {
         listeners: [],
         callbacks: {
           onChunk: options.onChunk,
+          onSnapshot: options.onSnapshot,
           onComplete: options.onComplete,
           onError: options.onError,
         },
@@ -262,6 +291,7 @@ class StreamService {
         listeners: [],
         callbacks: {
           onChunk: options.onChunk,
+          onSnapshot: options.onSnapshot,
           onComplete: options.onComplete,
           onError: options.onError,
         },
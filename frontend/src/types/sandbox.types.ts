@@ -26,6 +26,19 @@ export interface FileMetadata {
   modified: number;
 }
 
+export interface FileChange {
+  op: 'upsert' | 'delete';
+  path: string;
+  file: FileMetadata | null;
+}
+
+export interface FilesMetadataResponse {
+  files: FileMetadata[];
+  version: string | null;
+  full: boolean;
+  changes: FileChange[];
+}
+
 export interface FileContent {
   path: string;
   content: string;
@@ -17,6 +17,7 @@ export interface ActiveStream {
   listeners: Array<{ type: string; handler: EventListener }>;
   callbacks?: {
     onChunk?: (event: AssistantStreamEvent, messageId: string) => void;
+    onSnapshot?: (events: AssistantStreamEvent[], messageId: string) => void;
     onComplete?: (messageId?: string) => void;
     onError?: (error: Error, messageId?: string) => void;
   };
@@ -15,12 +15,24 @@ server = Server("permission")
 PERMISSION_MODE = os.environ.get("PERMISSION_MODE", "plan")
 API_BASE_URL = os.environ.get("API_BASE_URL")
 CHAT_TOKEN = os.environ.get("CHAT_TOKEN")
+# Long-lived agent processes get a fresh token written here on every turn.
+CHAT_TOKEN_FILE = os.environ.get("CHAT_TOKEN_FILE")
 CHAT_ID = os.environ.get("CHAT_ID")
 PLAN_MODE_TOOLS = ("EnterPlanMode", "ExitPlanMode")
 USER_INTERACTION_TOOLS = ("AskUserQuestion",)
 AUTO_APPROVE_MODES = ("plan", "auto")
 
 
+def get_chat_token() -> str | None:
+    if CHAT_TOKEN_FILE:
+        try:
+            with open(CHAT_TOKEN_FILE) as token_file:
+                return token_file.read().strip() or CHAT_TOKEN
+        except OSError:
+            pass
+    return CHAT_TOKEN
+
+
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     description = (
@@ -77,7 +89,8 @@ async def handle_call_tool(
     # Ask mode or tools requiring user interaction: Request user approval via API
     should_request_approval = PERMISSION_MODE == "ask" or requires_user_interaction
     if should_request_approval:
-        if not API_BASE_URL or not CHAT_TOKEN or not CHAT_ID:
+        chat_token = get_chat_token()
+        if not API_BASE_URL or not chat_token or not CHAT_ID:
             response = {
                 "behavior": "deny",
                 "message": "Permission server not properly configured for ask mode",
@@ -88,7 +101,7 @@ async def handle_call_tool(
             async with httpx.AsyncClient(timeout=310.0) as client:
                 # Create permission request
                 headers = {
-                    "Authorization": f"Bearer {CHAT_TOKEN}",
+                    "Authorization": f"Bearer {chat_token}",
                     "Content-Type": "application/json",
                 }
 